@@ -0,0 +1,69 @@
+"""Peak RSS and runtime: in-memory run_detection vs run_detection_chunked at a few memory budgets.
+
+    python -m benchmarks.chunked_detection [--events 2000000] [--budgets 64,256]
+
+Each variant runs in a fresh process so its max RSS is its own. Once
+features spill, the chunked IsolationForest is fitted on a reservoir sample,
+so incidents_match may be false; top_ip_overlap is the share of the
+in-memory incident IPs it also reports.
+"""
+import os, json, argparse, resource, tempfile
+import multiprocessing as mp
+from time import perf_counter
+
+def _peak_rss_mb() -> float:
+    # VmHWM is per address space; ru_maxrss would carry over the parent's peak through spawn's exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _run(kind: str, path: str, budget, q):
+    import detector
+    start = perf_counter()
+    if kind == "in_memory":
+        _, _, incidents = detector.run_detection(path)
+    else:
+        _, incidents = detector.run_detection_chunked(path, memory_budget_mb=budget)
+    q.put({"seconds": perf_counter() - start,
+           "max_rss_mb": _peak_rss_mb(),
+           "incidents": incidents.assign(src_ip=incidents["src_ip"].astype(str))[["src_ip", "risk"]].to_dict("records")})
+
+def _in_process(kind, path, budget=None) -> dict:
+    ctx = mp.get_context("spawn")
+    q = ctx.Queue()
+    p = ctx.Process(target=_run, args=(kind, path, budget, q))
+    p.start()
+    out = q.get()
+    p.join()
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=2_000_000)
+    ap.add_argument("--ips", type=int, default=5000)
+    ap.add_argument("--budgets", default="64,256")
+    args = ap.parse_args()
+    from synth import write_csv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ssh.csv")
+        write_csv(path, "ssh", args.events, n_ips=args.ips)
+        report = {"events": args.events, "csv_mb": os.path.getsize(path) / 2**20}
+        base = _in_process("in_memory", path)
+        report["in_memory"] = {k: v for k, v in base.items() if k != "incidents"}
+        for b in (float(x) for x in args.budgets.split(",")):
+            r = _in_process("chunked", path, b)
+            report[f"chunked_{b:g}mb"] = {"seconds": r["seconds"], "max_rss_mb": r["max_rss_mb"],
+                                          "incidents_match": r["incidents"] == base["incidents"],
+                                          "top_ip_overlap": len({i["src_ip"] for i in r["incidents"]}
+                                                                & {i["src_ip"] for i in base["incidents"]})
+                                                            / max(1, len(base["incidents"]))}
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Memory per million events and groupby speed: plain vs compact (schema.LOG_SCHEMAS) frames.
+
+    python -m benchmarks.compact_frames [--events 1000000] [--ips 5000] [--log-type ssh]
+"""
+import os, json, argparse, tempfile
+from time import perf_counter
+import pandas as pd
+import detector
+from schema import bytes_per_million, ip_ints
+from synth import write_csv
+
+def _timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return best
+
+def measure(df: pd.DataFrame, log_type: str) -> dict:
+    minute = df["timestamp"].dt.floor("1min")
+    out = {
+        "bytes_per_million": bytes_per_million(df),
+        "dtypes": {c: str(t) if not isinstance(t, pd.CategoricalDtype) else "category" for c, t in df.dtypes.items()},
+        "groupby_src_ip_s": _timed(lambda: df.groupby("src_ip", observed=True).size()),
+        "groupby_src_ip_minute_s": _timed(lambda: df.groupby([df["src_ip"], minute], observed=True).size()),
+        "ip_ints_s": _timed(lambda: ip_ints(df["src_ip"])),
+    }
+    if log_type == "ssh":
+        out["sliding_window_features_s"] = _timed(lambda: detector.sliding_window_features(df, 5), repeat=1)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=1_000_000)
+    ap.add_argument("--ips", type=int, default=5000)
+    ap.add_argument("--log-type", default="ssh", choices=["ssh", "firewall", "cowrie"])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "logs.csv")
+        write_csv(path, args.log_type, args.events, n_ips=args.ips)
+        report = {"events": args.events, "ips": args.ips, "log_type": args.log_type}
+        for name, compact in [("plain", False), ("compact", True)]:
+            start = perf_counter()
+            df = detector.load_logs(path, log_type=args.log_type, compact=compact)
+            report[name] = {"load_s": perf_counter() - start, **measure(df, args.log_type)}
+            del df
+    report["memory_ratio"] = report["plain"]["bytes_per_million"] / report["compact"]["bytes_per_million"]
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""HyperLogLog window features (detector.firewall_window_features) vs exact nunique.
+
+    python -m benchmarks.firewall_sketch [--events 2000000] [--ips 5000] [--window 5] [--precision 7]
+
+The exact baseline expands every event into the window_minutes buckets
+whose rolling window contains it and counts distinct dst_ip / port values
+per bucket with nunique. Reports runtime, tracemalloc peak and the
+relative error of the sketch estimates, as JSON.
+"""
+import os, json, argparse, tempfile, tracemalloc
+from time import perf_counter
+import numpy as np
+import pandas as pd
+import detector
+from synth import write_csv
+
+def exact_window_distinct(df: pd.DataFrame, window_minutes: int) -> pd.DataFrame:
+    ts = pd.to_datetime(df["timestamp"], utc=True).dt.floor("1min")
+    keys = pd.DataFrame({"src_ip": df["src_ip"].values, "timestamp": ts.array})
+    grouped = keys.groupby(["src_ip", "timestamp"], observed=True, sort=True)
+    bucket = grouped.ngroup().to_numpy()
+    buckets = grouped.size().reset_index()[["src_ip", "timestamp"]]
+    starts = detector._group_starts(buckets["src_ip"].to_numpy())
+    ev = pd.DataFrame({"bucket": bucket, "dst_ip": df["dst_ip"].astype(str).to_numpy(),
+                       "port": df["port"].to_numpy()})
+    parts = []
+    for k in range(window_minutes):
+        target = ev["bucket"].to_numpy() + k
+        ok = target < len(buckets)
+        ok[ok] = starts[target[ok]] == starts[ev["bucket"].to_numpy()[ok]]
+        parts.append(ev.loc[ok].assign(bucket=target[ok]))
+    rolled = pd.concat(parts, ignore_index=True).groupby("bucket").agg(dst_ips=("dst_ip", "nunique"),
+                                                                        ports=("port", "nunique"))
+    return buckets.join(rolled)
+
+def _measure(fn):
+    start = perf_counter()
+    out = fn()
+    seconds = perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return out, {"seconds": seconds, "peak_mb": peak}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=2_000_000)
+    ap.add_argument("--ips", type=int, default=5000)
+    ap.add_argument("--window", type=int, default=5)
+    ap.add_argument("--precision", type=int, default=7)
+    args = ap.parse_args()
+    w = args.window
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fw.csv")
+        write_csv(path, "firewall", args.events, n_ips=args.ips)
+        logs = detector.load_logs(path, log_type="firewall")
+    sketch, s_stat = _measure(lambda: detector.firewall_window_features(logs, w, precision=args.precision))
+    exact, e_stat = _measure(lambda: exact_window_distinct(logs, w))
+    report = {"events": args.events, "buckets": len(sketch), "precision": args.precision,
+              "sketch": s_stat, "exact": e_stat}
+    for col in ("dst_ips", "ports"):
+        est, true = sketch[f"r{w}m_{col}"].to_numpy(), exact[col].to_numpy()
+        rel = np.abs(est - true) / np.maximum(true, 1)
+        report[f"rel_error_{col}"] = {"mean": float(rel.mean()), "p99": float(np.quantile(rel, 0.99)),
+                                      "max": float(rel.max())}
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Holt forecaster backtest on synthetic per-IP fails/min: error and runtime per series count.
+
+    python -m benchmarks.forecast_backtest [--minutes 2880] [--series 10,100,1000,5000] [--horizon 60]
+"""
+import argparse, json
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from forecast import backtest, simple_linear_forecast
+
+def synthetic_counts(n_series: int, minutes: int, seed: int = 0) -> pd.DataFrame:
+    """Poisson fails/min per IP with a daily cycle, random trend and ~40% empty minutes."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(minutes)
+    rate = (rng.uniform(0.2, 6, (n_series, 1)) * (1 + 0.5 * np.sin(2 * np.pi * t / 1440 + rng.uniform(0, 6, (n_series, 1))))
+            + rng.normal(0, 0.5, (n_series, 1)) * t / minutes).clip(min=0)
+    y = rng.poisson(rate) * (rng.random((n_series, minutes)) > 0.4)
+    i, j = np.nonzero(y)
+    return pd.DataFrame({"src_ip": [f"10.{k // 65536}.{k // 256 % 256}.{k % 256}" for k in i],
+                         "minute": pd.Timestamp("2025-01-01", tz="UTC") + pd.to_timedelta(j, unit="min"),
+                         "fails": y[i, j]})
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--minutes", type=int, default=2880)
+    ap.add_argument("--series", default="10,100,1000,5000")
+    ap.add_argument("--horizon", type=int, default=60)
+    args = ap.parse_args()
+    counts = [int(x) for x in args.series.split(",")]
+
+    df = synthetic_counts(max(counts), args.minutes)
+    out = {"minutes": args.minutes, "horizon": args.horizon}
+    for name, params in [("holt", {}), ("holt_daily", {"season_minutes": 1440})]:
+        out[name] = backtest(df, args.horizon, counts, **params).to_dict("records")
+
+    # old path: one polyfit over the global series, refit on every render
+    total = df.groupby("minute")["fails"].sum().reset_index().rename(columns={"fails": "fails_per_min"})
+    start = perf_counter()
+    simple_linear_forecast(total.iloc[:-args.horizon], args.horizon)
+    out["global_polyfit_seconds"] = perf_counter() - start
+    print(json.dumps(out, indent=2))
+
+if __name__ == "__main__":
+    main()
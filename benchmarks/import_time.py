@@ -0,0 +1,59 @@
+"""Import-time budget for the core modules, measured with `python -X importtime`.
+
+    python -m benchmarks.import_time [--repeat 5] [--budget-ms 50] [--modules detector,daemon]
+
+Each module is imported in a fresh interpreter right after numpy and
+pandas, so its top-level importtime entry is what it adds on top of them;
+the best of `repeat` runs is compared with the budget. Fails (exit 1) when
+a module exceeds the budget or pulls in a heavy backend (sklearn, the
+Gemini client, dotenv, altair, streamlit) at import time. Prints JSON.
+"""
+import os, sys, json, argparse, subprocess
+
+CORE = ["schema", "storage", "cache", "logstore", "tracing", "sessions", "sketches", "models", "detector",
+        "forecast", "correlate", "rollups", "ingest", "daemon", "chat"]
+HEAVY = {"sklearn", "scipy", "joblib", "google", "dotenv", "altair", "streamlit"}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def importtime(mod: str) -> tuple:
+    """({top-level import: cumulative microseconds}, packages imported by `mod`) for one fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import numpy, pandas; import {mod}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    top, names, base_done = {}, set(), False
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        if base_done:
+            names.add(name.strip().split(".")[0])
+        if not name.startswith("  "):          # top level of the import tree
+            top[name.strip()] = int(cumulative)
+            base_done = base_done or name.strip() == "pandas"
+    return top, names
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=50)
+    ap.add_argument("--modules", default=",".join(CORE))
+    args = ap.parse_args(argv)
+
+    report = {"budget_ms": args.budget_ms, "numpy_pandas_ms": None, "modules": {}}
+    failed = []
+    for mod in args.modules.split(","):
+        runs = [importtime(mod) for _ in range(args.repeat)]
+        base_ms = min(t.get("numpy", 0) + t.get("pandas", 0) for t, _ in runs) / 1000
+        report["numpy_pandas_ms"] = min(report["numpy_pandas_ms"] or base_ms, base_ms)
+        own_ms = min(t[mod] for t, _ in runs) / 1000
+        heavy = sorted(runs[0][1] & HEAVY)
+        report["modules"][mod] = {"ms": own_ms, "heavy": heavy}
+        if heavy or own_ms > args.budget_ms:
+            failed.append(mod)
+    report["failed"] = failed
+    print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Batch intent resolution: sequential sync calls vs asyncio with bounded concurrency, against a stub model.
+
+    python -m benchmarks.intent_batch [--n 64] [--llm-ms 300] [--concurrency 8] [--deadline 1] [--slow-every 10]
+
+Every query is forced through the LLM tier (min_confidence=1.0); every
+`--slow-every`-th call hangs past the deadline and must fall back locally.
+"""
+import sys, argparse, json, time, contextlib
+import chat
+from benchmarks.intent_latency import QUERIES
+from benchmarks.stub_model import StubModel
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=64)
+    ap.add_argument("--llm-ms", type=float, default=300.0)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--deadline", type=float, default=1.0)
+    ap.add_argument("--slow-every", type=int, default=10)
+    args = ap.parse_args()
+
+    items = [{"query": f"{q} #{i}", "log_type": lt} for i, (q, lt) in
+             zip(range(args.n), (QUERIES[i % len(QUERIES)] for i in range(args.n)))]
+    results = {}
+    try:
+        stack = contextlib.ExitStack()
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        stub = StubModel(args.llm_ms, slow_every=args.slow_every, slow_ms=args.deadline * 5000)
+        chat.use_model(stub)
+        chat._LLM_DEADLINE_SEC = args.deadline
+        chat.INTENT_CACHE.clear()
+        t0 = time.perf_counter()
+        for it in items:
+            chat.intent_to_query(it["query"], it["log_type"], min_confidence=1.0)
+        results["sequential"] = {"seconds": time.perf_counter() - t0, "llm_calls": stub.calls}
+
+        stub = StubModel(args.llm_ms, slow_every=args.slow_every, slow_ms=args.deadline * 5000)
+        chat.use_model(stub)
+        chat.INTENT_CACHE.clear()
+        t0 = time.perf_counter()
+        intents = chat.resolve_batch(items, concurrency=args.concurrency, deadline_sec=args.deadline,
+                                     min_confidence=1.0)
+        results["async_batch"] = {"seconds": time.perf_counter() - t0, "llm_calls": stub.calls,
+                                  "max_in_flight": stub.max_in_flight, "cancelled": stub.cancelled,
+                                  "resolved": len(intents)}
+    finally:
+        stack.close()
+        chat.use_model(None)
+    results["speedup"] = results["sequential"]["seconds"] / results["async_batch"]["seconds"]
+    print(json.dumps({"n": args.n, "llm_ms": args.llm_ms, "concurrency": args.concurrency,
+                      "deadline_s": args.deadline, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
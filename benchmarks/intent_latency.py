@@ -0,0 +1,68 @@
+"""p50/p99 intent latency: LLM-only vs local-first tiers, against a stub model.
+
+    python -m benchmarks.intent_latency [--llm-ms 400] [--rounds 20] [--deadline 2]
+"""
+import sys, argparse, json, time, contextlib
+import numpy as np
+import chat
+from benchmarks.stub_model import StubModel
+
+QUERIES = [
+    ("заблокируй IP 123.45.67.89 за сегодня", "ssh"),
+    ("разблокируй 123.45.67.89", "ssh"),
+    ("топ 10 IP по deny за день", "firewall"),
+    ("самый частый юзер который неудачно логинился за час", "ssh"),
+    ("топ 5 ip с неудачными входами за 5 минут", "ssh"),
+    ("сколько неудачных логинов за день", "ssh"),
+    ("покажи deny за час", "firewall"),
+    ("самые частые пароли за день", "cowrie"),
+    ("топ юзеров за 5 минут", "cowrie"),
+    ("что там с ssh вообще происходит?", "ssh"),
+]
+
+def _measure(fn, rounds: int) -> dict:
+    lat = []
+    for _ in range(rounds):
+        for q, lt in QUERIES:
+            t0 = time.perf_counter()
+            fn(q, lt)
+            lat.append((time.perf_counter() - t0) * 1000)
+    lat = np.asarray(lat)
+    return {"n": int(lat.size), "p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99)),
+            "mean_ms": float(lat.mean())}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--llm-ms", type=float, default=400.0)
+    ap.add_argument("--jitter-ms", type=float, default=100.0)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--deadline", type=float, default=2.0)
+    args = ap.parse_args()
+
+    stub = StubModel(args.llm_ms, args.jitter_ms)
+    chat.use_model(stub)
+    chat._LLM_DEADLINE_SEC = args.deadline
+    results = {}
+    try:
+        stack = contextlib.ExitStack()
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        results["llm_only"] = _measure(lambda q, lt: chat.intent_to_filter(q, lt, cache=None), args.rounds)
+
+        def tiered_cold(q, lt):
+            chat.INTENT_CACHE.clear()
+            return chat.intent_to_query(q, lt)
+        calls = stub.calls
+        results["tiered_cold"] = _measure(tiered_cold, args.rounds)
+        results["tiered_cold"]["llm_calls"] = stub.calls - calls
+
+        calls = stub.calls
+        results["tiered_warm"] = _measure(chat.intent_to_query, args.rounds)
+        results["tiered_warm"]["llm_calls"] = stub.calls - calls
+        results["local_parse"] = _measure(chat.parse_local, args.rounds)
+    finally:
+        stack.close()
+        chat.use_model(None)
+    print(json.dumps({"llm_ms": args.llm_ms, "deadline_s": args.deadline, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
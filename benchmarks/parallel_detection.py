@@ -0,0 +1,62 @@
+"""Speedup of sharded feature building (detector.sharded_features) over sliding_window_features.
+
+    python -m benchmarks.parallel_detection [--events 5000000] [--workers 1,2,4,8,16] [--repeat 3]
+
+Times feature building + rule flags on one synthetic SSH log for each worker
+count (best of --repeat, after a warm-up call that starts the pool), checks
+the result equals the single-process path, and reports speedup and
+efficiency against the one-worker run (scaling) and against
+sliding_window_features (vs_serial). The full run_detection, including the
+global IsolationForest fit, is timed once per worker count as well.
+"""
+import os, json, argparse, tempfile
+from time import perf_counter
+import pandas as pd
+import detector
+from synth import write_csv
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=5_000_000)
+    ap.add_argument("--ips", type=int, default=20000)
+    ap.add_argument("--workers", default="1,2,4,8,16")
+    ap.add_argument("--window", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    w = args.window
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ssh.csv")
+        write_csv(path, "ssh", args.events, n_ips=args.ips)
+        logs = detector.load_logs(path)
+        ref = detector.rule_based_flags(detector.sliding_window_features(logs, w), window_minutes=w)
+        serial = _best(lambda: detector.rule_based_flags(detector.sliding_window_features(logs, w), window_minutes=w),
+                       args.repeat)
+        report = {"events": args.events, "cpu_count": os.cpu_count(), "serial_seconds": serial, "workers": {}}
+        detector.sharded_features(logs, w, workers=1)
+        one = _best(lambda: detector.sharded_features(logs, w, workers=1), args.repeat)
+        for n in (int(x) for x in args.workers.split(",")):
+            out = detector.sharded_features(logs, w, workers=n)
+            try:
+                pd.testing.assert_frame_equal(out, ref, check_dtype=False)
+                match = True
+            except AssertionError:
+                match = False
+            secs = _best(lambda: detector.sharded_features(logs, w, workers=n), args.repeat)
+            start = perf_counter()
+            detector.run_detection(path, window_minutes=w, workers=n)
+            report["workers"][n] = {"seconds": secs, "speedup": one / secs, "efficiency": one / secs / n,
+                                    "vs_serial": serial / secs,
+                                    "run_detection_seconds": perf_counter() - start, "matches_serial": match}
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""End-to-end detection benchmark on synthetic logs: time and peak memory per stage, as JSON.
+
+    python -m benchmarks.pipeline --events 100000,1000000 [--ips 5000] [--out bench.json] [--compare old.json]
+
+Each stage is timed once, then (unless --no-memory) rerun under tracemalloc
+for its peak allocation. --compare adds per-stage time ratios against a
+previous result file, e.g. one produced on the parent commit.
+"""
+import os, sys, json, time, argparse, platform, resource, subprocess, tempfile, tracemalloc
+from time import perf_counter
+import numpy as np
+import pandas as pd
+import detector
+from forecast import build_series
+from synth import write_csv
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+def _stage(name: str, fn, memory: bool, results: dict):
+    start = perf_counter()
+    value = fn()
+    stat = {"seconds": perf_counter() - start, "rows_out": _rows(value)}
+    if memory:
+        tracemalloc.start()
+        fn()
+        stat["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    stat["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results[name] = stat
+    print(f"[bench] {name}: {stat['seconds']:.3f}s", file=sys.stderr)
+    return value
+
+def run_pipeline(csv_path: str, log_type: str, window_minutes: int, fail_threshold: int,
+                 contamination: float, memory: bool = True) -> dict:
+    stages = {}
+    logs = _stage("load_logs", lambda: detector.load_logs(csv_path, log_type=log_type), memory, stages)
+    if log_type == "ssh":
+        feats = _stage("sliding_window_features",
+                       lambda: detector.sliding_window_features(logs, window_minutes), memory, stages)
+        flags = _stage("rule_based_flags",
+                       lambda: detector.rule_based_flags(feats, fail_threshold, window_minutes), memory, stages)
+        scored = _stage("isolation_forest_scores",
+                        lambda: detector.isolation_forest_scores(flags, contamination), memory, stages)
+        merged = _stage("merge_findings", lambda: detector.merge_findings(scored), memory, stages)
+        _stage("summarize_incidents", lambda: detector.summarize_incidents(merged, top_k=50), memory, stages)
+        _stage("build_series", lambda: build_series(merged, window_minutes), memory, stages)
+    elif log_type == "firewall":
+        _stage("summarize_firewall_incidents",
+               lambda: detector.summarize_firewall_incidents(logs, top_k=50), memory, stages)
+    return stages
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", default="100000,1000000")
+    ap.add_argument("--log-type", default="ssh", choices=["ssh", "firewall"])
+    ap.add_argument("--ips", type=int, default=5000)
+    ap.add_argument("--attack-share", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--window", type=int, default=5)
+    ap.add_argument("--fail-threshold", type=int, default=10)
+    ap.add_argument("--contamination", type=float, default=0.02)
+    ap.add_argument("--no-memory", action="store_true")
+    ap.add_argument("--out")
+    ap.add_argument("--compare")
+    args = ap.parse_args()
+
+    report = {
+        "commit": _commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(x) for x in args.events.split(",")):
+            csv_path = os.path.join(tmp, f"{args.log_type}-{n}.csv")
+            start = perf_counter()
+            write_csv(csv_path, args.log_type, n, n_ips=args.ips, attack_share=args.attack_share, seed=args.seed)
+            print(f"[bench] generated {n} events in {perf_counter() - start:.1f}s", file=sys.stderr)
+            stages = run_pipeline(csv_path, args.log_type, args.window, args.fail_threshold,
+                                  args.contamination, memory=not args.no_memory)
+            report["runs"].append({"events": n, "csv_bytes": os.path.getsize(csv_path), "stages": stages,
+                                   "total_seconds": sum(s["seconds"] for s in stages.values())})
+            os.remove(csv_path)
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = {r["events"]: r for r in json.load(f)["runs"]}
+        for run in report["runs"]:
+            old = base.get(run["events"])
+            if old:
+                run["vs_baseline"] = {name: s["seconds"] / old["stages"][name]["seconds"]
+                                      for name, s in run["stages"].items()
+                                      if name in old["stages"] and old["stages"][name]["seconds"] > 0}
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
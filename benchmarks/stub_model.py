@@ -0,0 +1,51 @@
+"""Local stand-in for the Gemini GenerativeModel, for benchmarks and offline runs (see chat.use_model)."""
+import json, time, random, asyncio
+import chat
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubModel:
+    """Answers with the local parse after `latency_ms` (+-jitter); `slow_every` makes every n-th call take `slow_ms`."""
+
+    def __init__(self, latency_ms: float = 400.0, jitter_ms: float = 0.0, slow_every: int = 0,
+                 slow_ms: float = 10_000.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_every = slow_every
+        self.slow_ms = slow_ms
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    def _delay(self) -> float:
+        self.calls += 1
+        if self.slow_every and self.calls % self.slow_every == 0:
+            return self.slow_ms / 1000
+        return max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    @staticmethod
+    def _answer(content) -> StubResponse:
+        query = content[-1].split('"""')[1]
+        intent, _ = chat.parse_local(query)
+        return StubResponse(json.dumps({k: (chat._iso_utc(v) if k in ("start", "end") else v)
+                                        for k, v in intent.items()}))
+
+    def generate_content(self, content):
+        time.sleep(self._delay())
+        return self._answer(content)
+
+    async def generate_content_async(self, content):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self._delay())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return self._answer(content)
@@ -0,0 +1,134 @@
+import os, pickle, hashlib, threading
+from collections import OrderedDict
+from pathlib import Path
+import pandas as pd
+
+_HASH_MEMO = OrderedDict()   # path -> (size, mtime_ns, digest), latest version only
+_HASH_MEMO_PATHS = 4096
+_HASH_LOCK = threading.Lock()
+
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    with _HASH_LOCK:
+        hit = _HASH_MEMO.get(path)
+        if hit is not None and hit[:2] == (size, mtime_ns):
+            _HASH_MEMO.move_to_end(path)
+            return hit[2]
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    with _HASH_LOCK:
+        _HASH_MEMO[path] = (size, mtime_ns, h.hexdigest())
+        _HASH_MEMO.move_to_end(path)
+        while len(_HASH_MEMO) > _HASH_MEMO_PATHS:
+            _HASH_MEMO.popitem(last=False)
+    return h.hexdigest()
+
+def file_fingerprint(path) -> tuple:
+    """(size, mtime_ns, content hash) of a file, or of every file under a directory.
+
+    The content hash is only recomputed when size or mtime change.
+    """
+    path = str(path)
+    if os.path.isdir(path):
+        parts = []
+        for p in sorted(Path(path).rglob("*")):
+            if p.is_file() and not p.name.startswith("."):
+                st = p.stat()
+                parts.append((str(p.relative_to(path)), st.st_size, st.st_mtime_ns,
+                              _file_digest(str(p), st.st_size, st.st_mtime_ns)))
+        return (path, hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest())
+    st = os.stat(path)
+    return (path, st.st_size, st.st_mtime_ns, _file_digest(path, st.st_size, st.st_mtime_ns))
+
+def _nbytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 64
+
+class ResultCache:
+    """LRU cache for pipeline stage results with an optional pickle-on-disk tier."""
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 1 << 30, disk_dir=None, max_disk_entries: int = 256):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_entries = max_disk_entries
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _digest(key) -> str:
+        return hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def get(self, key, default=None):
+        k = self._digest(key)
+        with self._lock:
+            if k in self._items:
+                self._items.move_to_end(k)
+                self.hits += 1
+                return self._items[k][0]
+        if self.disk_dir is not None:
+            p = self.disk_dir / f"{k}.pkl"
+            try:
+                with open(p, "rb") as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                value = None
+            else:
+                self.disk_hits += 1
+                self._put_memory(k, value)
+                return value
+        self.misses += 1
+        return default
+
+    def _put_memory(self, k: str, value):
+        size = _nbytes(value)
+        with self._lock:
+            if k in self._items:
+                self._bytes -= self._items.pop(k)[1]
+            self._items[k] = (value, size)
+            self._bytes += size
+            while self._items and (len(self._items) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, sz) = self._items.popitem(last=False)
+                self._bytes -= sz
+
+    def put(self, key, value):
+        k = self._digest(key)
+        self._put_memory(k, value)
+        if self.disk_dir is not None:
+            tmp = self.disk_dir / f".{k}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.disk_dir / f"{k}.pkl")
+            files = sorted(self.disk_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime_ns)
+            for p in files[:max(0, len(files) - self.max_disk_entries)]:
+                p.unlink(missing_ok=True)
+
+    _MISSING = object()
+
+    def get_or_compute(self, key, fn):
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = fn()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._items), "bytes": self._bytes,
+                "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
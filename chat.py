@@ -1,11 +1,19 @@
-import os, re, json
+import os, re, sys, json, asyncio, threading, contextlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timezone, timedelta
-from dotenv import load_dotenv
-load_dotenv()
+from tracing import span, traced
 
-import google.generativeai as genai
+# dotenv and the Gemini client are imported on the first LLM call, so parsing
+# with the local grammar (and importing this module) never pays for them.
+_env_loaded = False
 
-_GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 
 def _first_scalar(x):
@@ -80,50 +88,85 @@ def _extract_int(q: str, default: int) -> int:
     return default
 
 
-def intent_to_filter(query: str, log_type: str = "ssh"):
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY is not set")
-
-    genai.configure(api_key=api_key)
-
-    response_schema = {
-        "type": "object",
-        "properties": {
-            "start":   {"type": "string", "format": "date-time", "nullable": True},
-            "end":     {"type": "string", "format": "date-time", "nullable": True},
-
-            "event":   {"type": "string", "enum": ["auth","firewall","cowrie"], "nullable": True},
-            "status":  {"type": "string", "enum": ["fail","success"], "nullable": True},
-            "action":  {"type": "string", "enum": ["deny","allow"], "nullable": True},
-
-            "eventid": {"type": "string", "nullable": True},
-            "username":{"type": "string", "nullable": True},
-            "password":{"type": "string", "nullable": True},
-
-            "op":      {"type": "string", "enum": [
-                "top_ips","top_users","top_passwords","count",
-                "timeline","report","block_ip","unblock_ip",
-                "incident","list"
-            ]},
-
-            "limit":   {"type": "integer"},
-            "context": {"type": "string", "enum": ["executive","analyst","technical"]},
-            "target":  {"type": "string", "nullable": True},
-        },
-        "required": ["op"],
-        "additionalProperties": False
-    }
-
-    generation_config = {
-        "temperature": 0.2,
-        "response_mime_type": "application/json",
-        #"response_schema": response_schema,
-    }
-
-    system_instruction = f"""
+class IntentCache:
+    """Parsed intents keyed by normalized query text and log type.
+
+    start/end are kept as offsets from the time the intent was parsed, so a
+    cached "за час" still means the last hour when it is reused later.
+    Entries expire after `ttl_sec`; the least recently used are evicted past
+    `max_entries`. With `path` set the cache is persisted as JSON.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_sec: float = 24 * 3600, path: str = None):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.path = path
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._items = OrderedDict((tuple(k), v) for k, v in json.load(f))
+            except (OSError, ValueError, TypeError):
+                self._items = OrderedDict()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return re.sub(r"\s+", " ", query.strip().lower()).strip(" .,!?")
+
+    def get(self, query: str, log_type: str, now: datetime = None):
+        key = (self.normalize(query), log_type)
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item["expires"] < now.timestamp():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        intent = dict(item["intent"])
+        for k in ("start", "end"):
+            off = intent.pop(f"{k}_offset_sec", None)
+            if off is not None:
+                intent[k] = now + timedelta(seconds=off)
+        return intent
+
+    def put(self, query: str, log_type: str, intent: dict, now: datetime = None):
+        now = now or datetime.now(timezone.utc)
+        stored = {}
+        for k, v in intent.items():
+            if k in ("start", "end") and isinstance(v, datetime):
+                stored[f"{k}_offset_sec"] = (v - now).total_seconds()
+            else:
+                stored[k] = v
+        with self._lock:
+            self._items[(self.normalize(query), log_type)] = {"intent": stored, "expires": now.timestamp() + self.ttl_sec}
+            self._items.move_to_end((self.normalize(query), log_type))
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+            items = list(self._items.items())
+        if self.path:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump([[list(k), v] for k, v in items], f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+INTENT_CACHE = IntentCache(path=os.environ.get("INTENT_CACHE_PATH"))
+
+_SYSTEM_INSTRUCTION = """
 Ты SecOps-ассистент. Верни СТРОГИЙ JSON по схеме. Никаких комментариев.
-Текущее UTC: "{_iso_utc(datetime.now(timezone.utc))}"
+Текущее UTC указано в первой строке запроса.
 Правила времени:
 - "за час" -> [now-1h, now]
 - "за день" -> [now-24h, now]
@@ -138,33 +181,94 @@ def intent_to_filter(query: str, log_type: str = "ssh"):
 - Иначе -> op="list"
 """
 
-    now = datetime.now(timezone.utc)
-
-    few_shots = [
-        f'Запрос: "заблокируй IP 123.45.67.89 за сегодня"',
-        '{ "op":"block_ip", "target":"123.45.67.89", "start":"%NOW-24H%", "end":"%NOW%", "context":"analyst" }',
-        f'Запрос: "разблокируй 123.45.67.89"',
-        '{ "op":"unblock_ip", "target":"123.45.67.89", "start":"%NOW-1H%", "end":"%NOW%", "context":"analyst" }',
-        f'Запрос: "топ 10 IP по deny за день"',
-        '{ "op":"top_ips", "limit":10, "action":"deny", "start":"%NOW-24H%", "end":"%NOW%", "context":"analyst" }'
-    ]
+_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "start":   {"type": "string", "format": "date-time", "nullable": True},
+        "end":     {"type": "string", "format": "date-time", "nullable": True},
+
+        "event":   {"type": "string", "enum": ["auth","firewall","cowrie"], "nullable": True},
+        "status":  {"type": "string", "enum": ["fail","success"], "nullable": True},
+        "action":  {"type": "string", "enum": ["deny","allow"], "nullable": True},
+
+        "eventid": {"type": "string", "nullable": True},
+        "username":{"type": "string", "nullable": True},
+        "password":{"type": "string", "nullable": True},
+
+        "op":      {"type": "string", "enum": [
+            "top_ips","top_users","top_passwords","count",
+            "timeline","report","block_ip","unblock_ip",
+            "incident","list"
+        ]},
+
+        "limit":   {"type": "integer"},
+        "context": {"type": "string", "enum": ["executive","analyst","technical"]},
+        "target":  {"type": "string", "nullable": True},
+    },
+    "required": ["op"],
+    "additionalProperties": False
+}
+
+_GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "response_mime_type": "application/json",
+    #"response_schema": _RESPONSE_SCHEMA,
+}
+
+_MODELS = {}
+_model_lock = threading.Lock()
+_model_override = None
+_LLM_DEADLINE_SEC = float(os.environ.get("INTENT_LLM_DEADLINE_SEC", "4"))
+_llm_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gemini")
+
+def use_model(model):
+    """Route LLM calls to `model` (anything with generate_content), e.g. a local stub; None restores Gemini."""
+    global _model_override
+    _model_override = model
+
+def _get_model(api_key: str):
+    """Configure the client once per key and reuse the GenerativeModel across calls."""
+    name = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+    with _model_lock:
+        key = (api_key, name)
+        if key not in _MODELS:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _MODELS[key] = genai.GenerativeModel(
+                name,
+                system_instruction=_SYSTEM_INSTRUCTION,
+                generation_config=_GENERATION_CONFIG,
+            )
+        return _MODELS[key]
+
+_FEW_SHOTS = [
+    'Запрос: "заблокируй IP 123.45.67.89 за сегодня"',
+    '{ "op":"block_ip", "target":"123.45.67.89", "start":"%NOW-24H%", "end":"%NOW%", "context":"analyst" }',
+    'Запрос: "разблокируй 123.45.67.89"',
+    '{ "op":"unblock_ip", "target":"123.45.67.89", "start":"%NOW-1H%", "end":"%NOW%", "context":"analyst" }',
+    'Запрос: "топ 10 IP по deny за день"',
+    '{ "op":"top_ips", "limit":10, "action":"deny", "start":"%NOW-24H%", "end":"%NOW%", "context":"analyst" }'
+]
+
+def _resolve_model():
+    if _model_override is not None:
+        return _model_override
+    _load_env()
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_API_KEY is not set")
+    return _get_model(api_key)
 
+def _build_content(query: str, now: datetime) -> list:
     def sub_time(s):
         return (s.replace("%NOW%", _iso_utc(now))
                  .replace("%NOW-1H%", _iso_utc(now - timedelta(hours=1)))
                  .replace("%NOW-24H%", _iso_utc(now - timedelta(days=1)))
                  .replace("%NOW-5M%", _iso_utc(now - timedelta(minutes=5))))
 
-    content = [sub_time(x) for x in few_shots] + [f'Запрос: """{query}"""']
-
-    model = genai.GenerativeModel(
-        _GEMINI_MODEL,
-        system_instruction=system_instruction,
-        generation_config=generation_config,
-    )
-
-    resp = model.generate_content(content)
+    return [f'Текущее UTC: "{_iso_utc(now)}"'] + [sub_time(x) for x in _FEW_SHOTS] + [f'Запрос: """{query}"""']
 
+def _parse_response(resp, query: str, now: datetime) -> dict:
     text = (getattr(resp, "text", None) or "").strip()
     if not text:
         try:
@@ -213,29 +317,229 @@ def intent_to_filter(query: str, log_type: str = "ssh"):
     print("[Gemini]", text, parsed)
     return parsed
 
+def intent_to_filter(query: str, log_type: str = "ssh", cache: IntentCache = INTENT_CACHE,
+                     deadline_sec: float = None):
+    if cache is not None:
+        cached = cache.get(query, log_type)
+        if cached is not None:
+            return cached
+
+    model = _resolve_model()
+    now = datetime.now(timezone.utc)
+    content = _build_content(query, now)
 
-def intent_to_query(query: str, log_type: str = "ssh"):
+    deadline_sec = _LLM_DEADLINE_SEC if deadline_sec is None else deadline_sec
+    try:
+        with span("llm", log_type=log_type):
+            resp = _llm_pool.submit(model.generate_content, content).result(timeout=deadline_sec)
+    except FutureTimeout:
+        raise TimeoutError(f"Gemini did not answer within {deadline_sec:.1f}s")
+
+    parsed = _parse_response(resp, query, now)
+    if cache is not None:
+        cache.put(query, log_type, parsed, now=now)
+    return parsed
+
+_IP_RE = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}(?:/\d{1,2})?\b")
+_UNBLOCK_RE = re.compile(r"разблок|\bunblock|\bunban")
+_BLOCK_RE = re.compile(r"заблок|блокир|забан|\bblock|\bban\b")
+# "не блокируй 1.2.3.4" / "don't ban ..." must never be read as the action itself
+_NEGATED_ACTION_RE = re.compile(
+    r"(?:\bне\b|\bнельзя\b|\bdon['’]?t\b|\bdo not\b|\bnever\b|\bnot\b)\s+(?:\S+\s+){0,2}?"
+    r"(?:разблок|заблок|блокир|забан|бан|unblock|unban|block|ban)")
+_TOP_RE = re.compile(r"\bтоп\b|\btop\b|сам\w* част|most (?:common|frequent)")
+_MOST_RE = re.compile(r"сам(?:ый|ая|ое|ого)\s+част|(?:the )?most (?:common|frequent) (?:ip|user|password)\b")
+_COUNT_RE = re.compile(r"сколько|колич|\bcount\b|how many")
+_LIMIT_RE = re.compile(r"(?:\bтоп|\btop)\s*-?\s*(\d{1,4})\b")
+_PASSWORD_RE = re.compile(r"парол|password")
+_USER_RE = re.compile(r"юзер|пользоват|\busers?\b|username")
+_IPWORD_RE = re.compile(r"\bips?\b|айпи|адрес")
+_LOGIN_RE = re.compile(r"логин")   # a target only when no user/ip word is present ("топ логинов"); else an auth qualifier
+_NUM_WORDS = {"одн": 1, "две": 2, "два": 2, "три": 3, "пят": 5, "десят": 10, "пятнадцат": 15, "тридцат": 30}
+_WINDOW_RE = re.compile(
+    r"(?:\bза|последн\w*|\blast|\bpast|\bin the last)\s+"
+    r"(?:(\d+|[а-я]+)\s+)?"
+    r"(минут\w*|мин\b|час\w*|ч\b|дн\w*|день|сутки|недел\w*|minutes?|mins?\b|hours?|days?|weeks?)"
+)
+_UNIT = [("мин", "minutes"), ("min", "minutes"), ("ч", "hours"), ("hour", "hours"),
+         ("д", "days"), ("сут", "days"), ("day", "days"), ("недел", "weeks"), ("week", "weeks")]
+
+LOCAL_CONFIDENCE = float(os.environ.get("INTENT_LOCAL_CONFIDENCE", "0.7"))
+
+def _parse_window(q: str, now: datetime):
+    """(start, end, explicit) for 'за час' / 'за 5 минут' / 'последние 2 дня' / 'сегодня' / 'last 3 hours'."""
+    m = _WINDOW_RE.search(q)
+    if m:
+        n_txt, unit_txt = m.group(1), m.group(2)
+        n = 1
+        if n_txt and n_txt.isdigit():
+            n = int(n_txt)
+        elif n_txt:
+            n = next((v for k, v in _NUM_WORDS.items() if n_txt.startswith(k)), 1)
+        unit = next(u for prefix, u in _UNIT if unit_txt.startswith(prefix))
+        return now - timedelta(**{unit: max(1, n)}), now, m
+    if "сегодня" in q or "today" in q:
+        return now - timedelta(days=1), now, None
+    if "полчаса" in q:
+        return now - timedelta(minutes=30), now, None
+    return now - timedelta(hours=1), now, False
+
+def parse_local(query: str, log_type: str = "ssh", now: datetime = None):
+    """Rule-based intent parser for the common query shapes; returns (intent, confidence 0..1)."""
+    now = now or datetime.now(timezone.utc)
+    q = query.lower()
+    start, end, window = _parse_window(q, now)
+    ip = _IP_RE.search(query)
+    rest = _IP_RE.sub(" ", q)
+    if window:
+        rest = rest.replace(window.group(0), " ")
+
+    intent = {"start": start, "end": end, "op": "list", "limit": 10, "context": "analyst"}
+    confidence = 0.3
+
+    if _UNBLOCK_RE.search(q) or (_BLOCK_RE.search(q) and ip and not _TOP_RE.search(q) and not _COUNT_RE.search(q)):
+        if _NEGATED_ACTION_RE.search(q):
+            # leave it to the model; falling back to this parse changes nothing
+            return intent, 0.3
+        intent["op"] = "unblock_ip" if _UNBLOCK_RE.search(q) else "block_ip"
+        if ip:
+            intent["target"] = ip.group(0)
+            return intent, 0.95
+        return intent, 0.3
+
+    if _TOP_RE.search(q):
+        if _PASSWORD_RE.search(q):
+            intent["op"] = "top_passwords"
+        elif _USER_RE.search(q):
+            intent["op"] = "top_users"
+        elif _IPWORD_RE.search(rest) or log_type == "firewall":
+            intent["op"] = "top_ips"
+        elif _LOGIN_RE.search(q):
+            intent["op"] = "top_users"
+        m = _LIMIT_RE.search(rest)
+        if m:
+            intent["limit"] = max(1, min(1000, int(m.group(1))))
+        elif _MOST_RE.search(q):
+            intent["limit"] = 1
+        else:
+            intent["limit"] = _extract_int(rest, 10)
+        confidence = 0.8 if intent["op"] != "list" else 0.4
+    elif _COUNT_RE.search(q):
+        intent["op"] = "count"
+        confidence = 0.8
+    elif ip:
+        intent["target"] = ip.group(0)
+
+    if log_type == "ssh":
+        if any(w in q for w in ["вход", "логин", "auth", "авториз", "login"]): intent["event"] = "auth"
+        if any(w in q for w in ["неудач", "fail", "ошиб", "провал"]): intent["status"] = "fail"
+        elif any(w in q for w in ["успеш", "success"]): intent["status"] = "success"
+    elif log_type == "firewall":
+        if any(w in q for w in ["deny", "заблок", "блок", "отклон", "drop"]): intent["action"] = "deny"
+        elif any(w in q for w in ["allow", "разреш"]): intent["action"] = "allow"
+    elif log_type == "cowrie":
+        if any(w in q for w in ["неудач", "fail"]): intent["eventid"] = "login.failed"
+        elif any(w in q for w in ["успеш", "success"]): intent["eventid"] = "login.success"
+
+    if window is not False:
+        confidence += 0.15
+    if intent["op"] == "list" and len(intent) > 5:
+        confidence += 0.3
+    return intent, min(confidence, 0.99)
+
+@traced("intent_parse")
+def intent_to_query(query: str, log_type: str = "ssh", min_confidence: float = None):
+    """Local grammar first; only low-confidence queries go to the LLM, and never past its deadline."""
+    intent, confidence = parse_local(query, log_type)
+    if confidence >= (LOCAL_CONFIDENCE if min_confidence is None else min_confidence):
+        return intent
     try:
         return intent_to_filter(query, log_type=log_type)
     except Exception as e:
-        print(f"[intent_to_query] Gemini failed, fallback: {e}")
-        start, end = parse_time_window(query)
-        q = query.lower()
-        op = "list"
-        limit = _extract_int(q, 10)
-        if "топ" in q or "top" in q or "самый частый" in q:
-            if "ip" in q: op = "top_ips"
-            elif "юзер" in q or "username" in q: op = "top_users"
-            elif "парол" in q: op = "top_passwords"
-        elif "сколько" in q or "колич" in q or "count" in q:
-            op = "count"
-
-        base = {"start": start, "end": end, "op": op, "limit": limit, "context":"analyst"}
-        if log_type == "ssh":
-            if any(w in q for w in ["вход","логин","auth"]): base["event"] = "auth"
-            if any(w in q for w in ["неудач","fail","ошиб"]): base["status"] = "fail"
-        elif log_type == "firewall":
-            if any(w in q for w in ["deny","заблок","блок"]): base["action"] = "deny"
-        elif log_type == "cowrie":
-            pass
-        return base
+        print(f"[intent_to_query] Gemini failed, using local parse ({confidence:.2f}): {e}")
+        return intent
+
+
+async def _agenerate(model, content):
+    """Native async call when the client has one (genai does), else a worker thread."""
+    agen = getattr(model, "generate_content_async", None)
+    if agen is not None:
+        return await agen(content)
+    return await asyncio.to_thread(model.generate_content, content)
+
+async def aintent_to_filter(query: str, log_type: str = "ssh", cache: IntentCache = INTENT_CACHE,
+                            deadline_sec: float = None):
+    """Async intent_to_filter; the LLM call is cancelled and TimeoutError raised once the deadline passes."""
+    if cache is not None:
+        cached = cache.get(query, log_type)
+        if cached is not None:
+            return cached
+    model = _resolve_model()
+    now = datetime.now(timezone.utc)
+    deadline_sec = _LLM_DEADLINE_SEC if deadline_sec is None else deadline_sec
+    try:
+        resp = await asyncio.wait_for(_agenerate(model, _build_content(query, now)), deadline_sec)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Gemini did not answer within {deadline_sec:.1f}s")
+    parsed = _parse_response(resp, query, now)
+    if cache is not None:
+        cache.put(query, log_type, parsed, now=now)
+    return parsed
+
+async def aintent_to_query(query: str, log_type: str = "ssh", min_confidence: float = None,
+                           deadline_sec: float = None):
+    intent, confidence = parse_local(query, log_type)
+    if confidence >= (LOCAL_CONFIDENCE if min_confidence is None else min_confidence):
+        return intent
+    try:
+        return await aintent_to_filter(query, log_type=log_type, deadline_sec=deadline_sec)
+    except Exception as e:
+        print(f"[aintent_to_query] Gemini failed, using local parse ({confidence:.2f}): {e}")
+        return intent
+
+async def aresolve_batch(queries, log_type: str = "ssh", concurrency: int = 8,
+                         deadline_sec: float = None, min_confidence: float = None) -> list:
+    """Resolve many queries concurrently, at most `concurrency` LLM calls in flight; results keep input order.
+
+    Items are query strings or dicts with "query" and optional "log_type".
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(item):
+        if isinstance(item, dict):
+            q, lt = item["query"], item.get("log_type", log_type)
+        else:
+            q, lt = item, log_type
+        async with sem:
+            return await aintent_to_query(q, lt, min_confidence=min_confidence, deadline_sec=deadline_sec)
+
+    return await asyncio.gather(*(one(item) for item in queries))
+
+def resolve_batch(queries, log_type: str = "ssh", concurrency: int = 8, deadline_sec: float = None,
+                  min_confidence: float = None) -> list:
+    return asyncio.run(aresolve_batch(list(queries), log_type, concurrency, deadline_sec, min_confidence))
+
+def read_queries(path: str) -> list:
+    """JSONL of analyst questions: one {"query": ..., "log_type": ...} object or bare JSON string per line."""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                items.append(json.loads(line))
+    return items
+
+def _intent_json(query, intent: dict) -> str:
+    out = {k: (_iso_utc(v) if isinstance(v, datetime) else v) for k, v in intent.items()}
+    return json.dumps({"query": query["query"] if isinstance(query, dict) else query, "intent": out},
+                      ensure_ascii=False)
+
+if __name__ == "__main__":
+    # python chat.py questions.jsonl [log_type] [concurrency] > intents.jsonl
+    items = read_queries(sys.argv[1])
+    log_type = sys.argv[2] if len(sys.argv) > 2 else "ssh"
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    with contextlib.redirect_stdout(sys.stderr):
+        intents = resolve_batch(items, log_type, concurrency)
+    for item, intent in zip(items, intents):
+        print(_intent_json(item, intent))
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from schema import parse_timestamps
+
+_SHIFT = 34                      # seconds since the index's first event fit in the low 34 bits (~540 years)
+_SEC_MASK = (1 << _SHIFT) - 1
+
+def _seconds(ts: pd.Series) -> np.ndarray:
+    return parse_timestamps(ts).to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+def _codes(ips: pd.Series):
+    """(int codes, sorted str table) for a src_ip column; categoricals reuse their category table."""
+    if isinstance(ips.dtype, pd.CategoricalDtype):
+        table = ips.cat.categories.astype(str).to_numpy()
+        if (table[1:] >= table[:-1]).all():
+            return ips.cat.codes.to_numpy().astype(np.int64), table
+    codes, table = pd.factorize(ips.astype(str), sort=True)
+    return codes.astype(np.int64), np.asarray(table, dtype=object)
+
+class SourceIndex:
+    """Events of one log source sorted by (src_ip, timestamp) as a single int64 key.
+
+    Each key packs the IP's position in a sorted address table with the
+    event's second offset, so the events of any number of (ip, start, end)
+    intervals are found with two np.searchsorted calls, no per-row loop.
+    """
+
+    def __init__(self, events: pd.DataFrame):
+        events = events[events["src_ip"].notna() & events["timestamp"].notna()]
+        codes, self.ips = _codes(events["src_ip"])
+        sec = _seconds(events["timestamp"])
+        self.origin = int(sec.min()) if len(sec) else 0
+        keys = (codes << _SHIFT) | (sec - self.origin)
+        self.keys = np.sort(keys[codes >= 0], kind="stable")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _lookup(self, ips) -> tuple:
+        ips = np.asarray(pd.Series(ips).astype(str), dtype=object)
+        pos = np.searchsorted(self.ips, ips) if len(self.ips) else np.zeros(len(ips), dtype=np.int64)
+        pos = np.minimum(pos, max(len(self.ips) - 1, 0))
+        found = (self.ips[pos] == ips) if len(self.ips) else np.zeros(len(ips), dtype=bool)
+        return found, pos.astype(np.int64)
+
+    def window(self, ips, start, end) -> tuple:
+        """(count, last event time) per interval [start[i], end[i]] of ips[i]; last is NaT when count is 0."""
+        found, group = self._lookup(ips)
+        lo = np.clip(_seconds(pd.Series(start)) - self.origin, 0, _SEC_MASK)
+        hi = np.clip(_seconds(pd.Series(end)) - self.origin, -1, _SEC_MASK)
+        i = np.searchsorted(self.keys, (group << _SHIFT) | lo, side="left")
+        j = np.searchsorted(self.keys, (group << _SHIFT) | np.maximum(hi, 0), side="right")
+        j = np.where(hi < 0, i, j)
+        count = np.where(found, j - i, 0)
+        last_sec = self.keys[np.maximum(j - 1, 0)] & _SEC_MASK if len(self.keys) else np.zeros(len(count), dtype=np.int64)
+        last = pd.to_datetime(np.where(count > 0, last_sec + self.origin, 0), unit="s", utc=True)
+        return count, last.where(count > 0)
+
+def incident_spans(findings: pd.DataFrame) -> pd.DataFrame:
+    """First and last suspicious minute per src_ip of merged SSH findings."""
+    if findings.empty or "is_suspicious" not in findings.columns:
+        return pd.DataFrame(columns=["src_ip", "first_seen", "last_seen"])
+    sus = findings[findings["is_suspicious"]]
+    return (sus.groupby("src_ip", observed=True)["timestamp"]
+               .agg(first_seen="min", last_seen="max")
+               .reset_index()
+               .assign(src_ip=lambda d: d["src_ip"].astype(str)))
+
+class Correlator:
+    """Joins SSH incidents with firewall denies and cowrie events by src_ip and time.
+
+    An incident's span (first to last suspicious minute) is widened by
+    `before` / `after`; denies and honeypot events from the same address
+    inside that interval are counted, and Medium/High incidents seen by
+    another source are boosted to High. Build once per input version and
+    reuse across renders; correlate() cost depends on the number of
+    incidents, not on firewall volume.
+    """
+
+    def __init__(self, firewall: pd.DataFrame = None, cowrie: pd.DataFrame = None):
+        self.firewall = None
+        self.cowrie = None
+        if firewall is not None and not firewall.empty:
+            denies = firewall[firewall["action"].astype(str).str.lower() == "deny"]
+            self.firewall = SourceIndex(denies)
+        if cowrie is not None and not cowrie.empty:
+            self.cowrie = SourceIndex(cowrie)
+
+    def correlate(self, incidents: pd.DataFrame, findings: pd.DataFrame = None,
+                  before: str = "15min", after: str = "15min") -> pd.DataFrame:
+        out = incidents.copy()
+        out["src_ip"] = out["src_ip"].astype(str)
+        if findings is not None and not out.empty:
+            out = out.merge(incident_spans(findings)[["src_ip", "first_seen"]], on="src_ip", how="left")
+        if "first_seen" not in out.columns:
+            out["first_seen"] = out.get("last_seen")
+        last = parse_timestamps(out["last_seen"]) if "last_seen" in out.columns else pd.Series(pd.NaT, index=out.index)
+        first = parse_timestamps(out["first_seen"]).fillna(last)
+        start = first - pd.Timedelta(before)
+        end = last + pd.Timedelta(minutes=1) + pd.Timedelta(after)
+        valid = (start.notna() & end.notna()).to_numpy()
+        for name, index in (("fw", self.firewall), ("cowrie", self.cowrie)):
+            col = "fw_denies" if name == "fw" else "cowrie_events"
+            out[col] = 0
+            out[f"{name}_last_seen"] = pd.Series(pd.NaT, index=out.index, dtype="datetime64[s, UTC]")
+            if index is None or not valid.any():
+                continue
+            count, seen = index.window(out.loc[valid, "src_ip"], start[valid], end[valid])
+            out.loc[valid, col] = count
+            out.loc[valid, f"{name}_last_seen"] = seen.array
+        sev = out["severity"].astype(str) if "severity" in out.columns else pd.Series("Low", index=out.index)
+        seen_elsewhere = (out["fw_denies"] > 0) | (out["cowrie_events"] > 0)
+        out["corr_boosted_severity"] = np.where(sev.isin(["Medium", "High"]) & seen_elsewhere, "High", sev)
+        return out
@@ -0,0 +1,218 @@
+"""Headless detection: runs the pipeline on a schedule and writes incidents and block decisions.
+
+    python daemon.py [--interval 30] [--budget 10] [--out daemon_out] [--sources ssh,firewall,cowrie] [--once]
+
+Each tick processes the sources whose input changed since the last one.
+New incidents (an address not reported before for that source, or one with a
+later last_seen) are appended to <out>/incidents.jsonl, and the latest findings
+and incidents per source are written to <out>/{findings,incidents}-<source>.parquet. High-severity
+addresses are added to the storage blocklist, and each decision is
+appended to <out>/blocks.jsonl. The dashboard reads these files instead
+of detecting and blocking during its render.
+"""
+import os, sys, json, time, asyncio, argparse
+from pathlib import Path
+import pandas as pd
+from detector import run_detection, SlidingWindowEngine
+from cache import ResultCache, file_fingerprint
+from models import ModelRegistry
+from logstore import store_path
+from storage import block_many, blocked_mask
+from ingest import tail_cowrie, COWRIE_JSON, COWRIE_CSV, COWRIE_SESSIONS_CSV
+from sessions import load_sessions, session_incidents
+from tracing import span
+
+DAEMON_OUT = Path(os.environ.get("DAEMON_OUT", "daemon_out"))
+DEFAULT_SOURCES = {
+    "ssh": "data/sample_logs.csv",
+    "firewall": "data/firewall_logs.csv",
+    "cowrie": str(COWRIE_JSON),
+}
+
+def output_path(kind: str, log_type: str, out=DAEMON_OUT) -> Path:
+    return Path(out) / f"{kind}-{log_type}.parquet"
+
+def read_latest(log_type: str, out=DAEMON_OUT):
+    """(findings, incidents, written_at) from the daemon's latest tick, or None if it has not produced any."""
+    p = output_path("incidents", log_type, out)
+    try:
+        incidents = pd.read_parquet(p)
+        written_at = pd.Timestamp(p.stat().st_mtime, unit="s", tz="UTC")
+        fp = output_path("findings", log_type, out)
+        findings = pd.read_parquet(fp) if fp.exists() else pd.DataFrame()
+    except (OSError, ValueError):
+        return None
+    return findings, incidents, written_at
+
+def _write_parquet(df: pd.DataFrame, path: Path):
+    tmp = path.with_name(f".{path.name}.tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def _incident_key(r: dict) -> tuple:
+    return str(r.get("source")), str(r.get("src_ip"))
+
+def _load_reported(path: Path) -> dict:
+    """{(source, src_ip): last_seen} of the incidents already in incidents.jsonl."""
+    reported = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                reported[_incident_key(r)] = str(r.get("last_seen"))
+    except OSError:
+        pass
+    return reported
+
+def _append_jsonl(path: Path, records):
+    if not records:
+        return
+    with open(path, "a") as f:
+        for r in records:
+            f.write(json.dumps(r, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+class DetectionDaemon:
+    """Runs run_detection per source every `interval_sec`, spending at most `budget_sec` per tick.
+
+    Sources are processed in turn, each in a worker thread so the event loop
+    stays responsive. The budget is checked between sources: a source that
+    has started runs to completion, so a tick can overrun by one source's
+    detection time (reported as over_budget). Once a tick has used its
+    budget, the remaining sources move to the front of the next tick; at
+    least one source runs per tick. SSH keeps a SlidingWindowEngine, so a
+    tick only aggregates rows appended since the last one. Every source
+    shares a ResultCache and ModelRegistry, and unchanged inputs are skipped
+    by fingerprint.
+    """
+
+    def __init__(self, sources: dict = None, out=DAEMON_OUT, interval_sec: float = 30, budget_sec: float = 10,
+                 window_minutes: int = 5, fail_threshold: int = 10, contamination: float = 0.02,
+                 auto_block: bool = True):
+        self.sources = dict(sources or DEFAULT_SOURCES)
+        self.out = Path(out)
+        self.out.mkdir(parents=True, exist_ok=True)
+        self.interval_sec = interval_sec
+        self.budget_sec = budget_sec
+        self.params = {"window_minutes": window_minutes, "fail_threshold": fail_threshold,
+                       "contamination": contamination}
+        self.auto_block = auto_block
+        self.cache = ResultCache(max_entries=32)
+        self.registry = ModelRegistry()
+        self.engines = {}
+        self._seen = {}
+        self._queue = list(self.sources)
+        self._reported = _load_reported(self.out / "incidents.jsonl")
+        self.ticks = 0
+
+    def _input(self, log_type: str) -> str:
+        if log_type != "cowrie" and store_path(log_type).is_dir():
+            return str(store_path(log_type))
+        return self.sources[log_type]
+
+    def process(self, log_type: str):
+        """Detect on one source if its input changed; returns (findings, incidents) or None when skipped."""
+        path = self._input(log_type)
+        if not os.path.exists(path):
+            return None
+        if log_type == "cowrie":
+            # tail_cowrie itself only reads the bytes appended since its checkpoint
+            store = store_path("cowrie")
+            if not tail_cowrie(path, COWRIE_CSV, store=store if store.is_dir() else None,
+                               sessions_csv=COWRIE_SESSIONS_CSV)["sessions"] \
+                    and output_path("incidents", log_type, self.out).exists():
+                return None
+            return pd.DataFrame(), session_incidents(load_sessions(COWRIE_SESSIONS_CSV), top_k=50)
+        fp = file_fingerprint(path)
+        if self._seen.get(log_type) == fp:
+            return None
+        engine = None
+        if log_type == "ssh":
+            engine = self.engines.setdefault(path, SlidingWindowEngine())
+        _, findings, incidents = run_detection(path, log_type=log_type, engine=engine, cache=self.cache,
+                                        registry=self.registry if log_type == "ssh" else None, **self.params)
+        self._seen[log_type] = fp
+        return findings, incidents
+
+    def emit(self, log_type: str, findings: pd.DataFrame, incidents: pd.DataFrame) -> dict:
+        now = pd.Timestamp.now(tz="UTC")
+        _write_parquet(findings, output_path("findings", log_type, self.out))
+        _write_parquet(incidents, output_path("incidents", log_type, self.out))
+        incidents = incidents.assign(src_ip=incidents["src_ip"].astype(str))
+        # the snapshot is the full top-k every tick; the log only gets what changed
+        new = []
+        for r in incidents.to_dict("records"):
+            r = dict(r, source=log_type, detected_at=now)
+            key, seen = _incident_key(r), str(r.get("last_seen"))
+            if self._reported.get(key) != seen:
+                self._reported[key] = seen
+                new.append(r)
+        _append_jsonl(self.out / "incidents.jsonl", new)
+        blocked = []
+        if self.auto_block and "severity" in incidents.columns:
+            high = incidents[incidents["severity"].astype(str) == "High"]
+            high = high[~blocked_mask(high["src_ip"])]
+            if len(high):
+                block_many(high["src_ip"].tolist())
+                blocked = [{"src_ip": r["src_ip"], "action": "block", "source": log_type, "decided_at": now,
+                            "severity": "High", "risk": r.get("risk"), "reason": "auto: High severity"}
+                           for r in high.to_dict("records")]
+                _append_jsonl(self.out / "blocks.jsonl", blocked)
+        return {"incidents": len(incidents), "new": len(new), "blocked": len(blocked)}
+
+    async def tick(self) -> dict:
+        """One pass over due sources within budget_sec; returns per-source stats and the tick latency."""
+        t0 = time.perf_counter()
+        self.ticks += 1
+        stats, done = {"tick": self.ticks}, []
+        with span("daemon_tick"):
+            for log_type in list(self._queue):
+                if done and time.perf_counter() - t0 >= self.budget_sec:
+                    break
+                try:
+                    result = await asyncio.to_thread(self.process, log_type)
+                    stats[log_type] = "unchanged" if result is None else self.emit(log_type, *result)
+                except Exception as e:
+                    stats[log_type] = f"error: {e}"
+                done.append(log_type)
+        # deferred sources go first next time
+        self._queue = [s for s in self._queue if s not in done] + done
+        stats["seconds"] = time.perf_counter() - t0
+        stats["deferred"] = [s for s in self.sources if s not in done]
+        stats["over_budget"] = stats["seconds"] > self.budget_sec
+        return stats
+
+    async def run(self, ticks: int = None):
+        n = 0
+        while ticks is None or n < ticks:
+            started = time.monotonic()
+            stats = await self.tick()
+            print(json.dumps(stats, default=str), file=sys.stderr, flush=True)
+            n += 1
+            if ticks is not None and n >= ticks:
+                break
+            await asyncio.sleep(max(0.0, self.interval_sec - (time.monotonic() - started)))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless detection daemon")
+    ap.add_argument("--interval", type=float, default=30)
+    ap.add_argument("--budget", type=float, default=10, help="seconds of work per tick, checked between sources")
+    ap.add_argument("--out", default=str(DAEMON_OUT))
+    ap.add_argument("--sources", default="ssh,firewall,cowrie")
+    ap.add_argument("--window", type=int, default=5)
+    ap.add_argument("--fail-threshold", type=int, default=10)
+    ap.add_argument("--contamination", type=float, default=0.02)
+    ap.add_argument("--no-block", action="store_true")
+    ap.add_argument("--once", action="store_true")
+    args = ap.parse_args(argv)
+    sources = {s: DEFAULT_SOURCES[s] for s in args.sources.split(",") if s}
+    daemon = DetectionDaemon(sources, args.out, args.interval, args.budget, args.window,
+                             args.fail_threshold, args.contamination, auto_block=not args.no_block)
+    asyncio.run(daemon.run(1 if args.once else None))
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,59 @@
+import os, re, bisect, shutil, tempfile, atexit, warnings
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import get_context, shared_memory
 import pandas as pd
-from sklearn.ensemble import IsolationForest
 import numpy as np
+import pyarrow as pa
+from logstore import read_store, list_partitions
+from cache import ResultCache, file_fingerprint
+from models import ModelRegistry
+from schema import csv_dtypes, parse_timestamps, compact as compact_frame
+from tracing import span, traced
+from sketches import HLL_PRECISION, hash_values, hll_registers, hll_estimate, hll_rolling_union
 
-def load_logs(path: str, log_type: str = "ssh") -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
-    if log_type == "ssh":
-        return df[["timestamp","src_ip","user","event","status","port"]]
-    elif log_type == "firewall":
-        return df[["timestamp","src_ip","dst_ip","port","action"]]
+_LOG_COLUMNS = {
+    "ssh": ["timestamp","src_ip","user","event","status","port"],
+    "firewall": ["timestamp","src_ip","dst_ip","port","action"],
+}
+
+def load_logs(path: str, log_type: str = "ssh", start=None, end=None, compact: bool = True) -> pd.DataFrame:
+    """Load a CSV file or a logstore partition directory, optionally limited to [start, end].
+
+    With `compact` the frame follows schema.LOG_SCHEMAS: categorical IPs and
+    low-cardinality strings, uint16 ports, timestamps parsed once.
+    """
+    cols = _LOG_COLUMNS.get(log_type)
+    if os.path.isdir(path):
+        df = read_store(path, start=start, end=end, columns=cols)
+        if compact:
+            df = compact_frame(df, log_type)
     else:
-        return df
+        df = pd.read_csv(path, dtype=csv_dtypes(log_type) if compact else None)
+        if compact:
+            df = compact_frame(df, log_type)
+        else:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+        if start is not None:
+            df = df[df["timestamp"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["timestamp"] <= pd.Timestamp(end)]
+    if cols:
+        return df[cols]
+    return df
 
 def sliding_window_features(df: pd.DataFrame, window_minutes: int = 5) -> pd.DataFrame:
     window_minutes = int(max(1, window_minutes))
-    dfa = df[df["event"] == "auth"].copy()
-    dfa["timestamp"] = pd.to_datetime(dfa["timestamp"], utc=True)
+    dfa = df[df["event"] == "auth"]
+    dfa = dfa.assign(timestamp=parse_timestamps(dfa["timestamp"]),
+                     fail=(dfa["status"] == "fail").to_numpy(),
+                     success=(dfa["status"] == "success").to_numpy())
 
     per_min = (
-        dfa.groupby(["src_ip", pd.Grouper(key="timestamp", freq="1min")])
+        dfa.groupby(["src_ip", pd.Grouper(key="timestamp", freq="1min")], observed=True)
            .agg(
                total=("status", "size"),
-               fails=("status", lambda s: (s == "fail").sum()),
-               successes=("status", lambda s: (s == "success").sum()),
+               fails=("fail", "sum"),
+               successes=("success", "sum"),
                users=("user", "nunique"),
                ports=("port", "nunique"),     
            )
@@ -34,7 +65,7 @@ def sliding_window_features(df: pd.DataFrame, window_minutes: int = 5) -> pd.Dat
     cols = ["total","fails","successes","users","ports"] 
     for col in cols:
         per_min[f"r{window_minutes}m_{col}"] = (
-            per_min.groupby("src_ip")[col]
+            per_min.groupby("src_ip", observed=True)[col]
                    .rolling(window=window_minutes, min_periods=1)
                    .sum()
                    .reset_index(level=0, drop=True)
@@ -48,20 +79,272 @@ def sliding_window_features(df: pd.DataFrame, window_minutes: int = 5) -> pd.Dat
 
     return per_min.fillna(0.0)
 
+_WINDOW_COLS = ["total","fails","successes","users","ports"]
+_WINDOW_COL = re.compile(r"^r\d+m_")
+
+def _value_set(s: pd.Series) -> set:
+    return set(s.dropna())
+
+class SlidingWindowEngine:
+    """Stateful version of sliding_window_features.
+
+    Keeps the last `history_minutes` active minute buckets per src_ip and
+    recomputes rolling sums only for buckets touched by new rows, so the
+    cost of update() depends on the new data, not on the whole log.
+    Buckets and feature rows older than `retention_minutes` before the
+    watermark (newest minute seen) are evicted, as are IPs with nothing
+    left, so memory is bounded by the IPs active within that horizon.
+    frame() returns the same table sliding_window_features would build
+    from all rows fed so far, restricted to the retained minutes, with one
+    exception: sliding_window_features windows over an IP's last active
+    minutes however old they are, while an IP idle for longer than the
+    retention starts again with empty windows here. Rows arriving for
+    minutes that can no longer be computed exactly are counted in
+    late_dropped.
+    """
+
+    def __init__(self, window_minutes: int = 5, history_minutes: int = 0, retention_minutes: int = 7 * 24 * 60):
+        self.window_minutes = int(max(1, window_minutes))
+        self.history_minutes = max(2 * self.window_minutes, int(history_minutes))
+        self.retention = pd.Timedelta(minutes=max(int(retention_minutes), self.window_minutes))
+        self._buckets = {}      # src_ip -> [[minute, total, fails, successes, users, ports], ...]
+        self._evicted = set()
+        self._rows = {}         # minute -> {src_ip: feature row}
+        self._minutes = []      # sorted keys of _rows
+        self._files = set()     # logstore partitions already fed by sync()
+        self._ts_dtype = None
+        self.watermark = None
+        self.cutoff = None      # minutes before this have been evicted
+        self.rows_seen = 0
+        self.late_dropped = 0
+        self._cube = None
+
+    def _aggregate(self, df: pd.DataFrame) -> pd.DataFrame:
+        dfa = df[df["event"] == "auth"]
+        ts = parse_timestamps(dfa["timestamp"])
+        if self._ts_dtype is None and len(ts):
+            self._ts_dtype = ts.dtype
+        status = dfa["status"]
+        return (pd.DataFrame({
+                    "src_ip": dfa["src_ip"].values,
+                    "minute": ts.dt.floor("1min").values,
+                    "fail": (status == "fail").values,
+                    "success": (status == "success").values,
+                    "user": dfa["user"].to_numpy(dtype=object),
+                    "port": dfa["port"].values,
+                })
+                .groupby(["src_ip","minute"], observed=True)
+                .agg(total=("fail","size"),
+                     fails=("fail","sum"),
+                     successes=("success","sum"),
+                     users=("user", _value_set),
+                     ports=("port", _value_set)))
+
+    def sync(self, path: str, logs: pd.DataFrame) -> bool:
+        """Feed what `path` gained since the last sync; False when it cannot be followed incrementally.
+
+        A CSV is append-only, so its rows past rows_seen are the new ones
+        (False if it shrank). A logstore directory is tracked by partition
+        file instead, since new rows can land in an earlier hour.
+        """
+        if os.path.isdir(path):
+            new = [f for f in list_partitions(path) if str(f) not in self._files]
+            if new:
+                cols = _LOG_COLUMNS["ssh"]
+                self.update(compact_frame(pd.concat([pd.read_parquet(f, columns=cols) for f in new],
+                                                    ignore_index=True), "ssh"))
+                self._files.update(str(f) for f in new)
+            return True
+        if self.rows_seen > len(logs):
+            return False
+        self.update(logs.iloc[self.rows_seen:])
+        return True
+
+    def _put(self, ip, minute, row):
+        at = self._rows.get(minute)
+        if at is None:
+            at = self._rows[minute] = {}
+            bisect.insort(self._minutes, minute)
+        at[ip] = row
+
+    def _expire(self):
+        if self.watermark is None:
+            return
+        self.cutoff = self.watermark - self.retention
+        while self._minutes and self._minutes[0] < self.cutoff:
+            for ip in self._rows.pop(self._minutes.pop(0)):
+                buf = self._buckets.get(ip)
+                if buf is None:
+                    continue
+                k = 0
+                while k < len(buf) and buf[k][0] < self.cutoff:
+                    k += 1
+                if k == len(buf):
+                    del self._buckets[ip]
+                    self._evicted.discard(ip)
+                elif k:
+                    del buf[:k]
+                    self._evicted.add(ip)
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Feed new log rows; return feature rows for the minutes that changed."""
+        w = self.window_minutes
+        self.rows_seen += len(df)
+        agg = self._aggregate(df)
+        changed = []
+        # a row is exact only if every bucket in its window is still held
+        accept_from = None if self.cutoff is None else self.cutoff + pd.Timedelta(minutes=w - 1)
+        for ip, part in agg.groupby(level=0, sort=False, observed=True):
+            buf = self._buckets.setdefault(ip, [])
+            minutes = [b[0] for b in buf]
+            first = len(buf)
+            for (_, minute), total, fails, succ, users, ports in zip(
+                    part.index, part["total"], part["fails"], part["successes"], part["users"], part["ports"]):
+                idx = bisect.bisect_left(minutes, minute)
+                if (accept_from is not None and minute < accept_from) or (ip in self._evicted and idx < w - 1):
+                    self.late_dropped += int(total)
+                    continue
+                if idx < len(buf) and minutes[idx] == minute:
+                    b = buf[idx]
+                    b[1] += int(total); b[2] += int(fails); b[3] += int(succ)
+                    b[4] |= users; b[5] |= ports
+                else:
+                    buf.insert(idx, [minute, int(total), int(fails), int(succ), set(users), set(ports)])
+                    minutes.insert(idx, minute)
+                first = min(first, idx)
+            for p in range(first, len(buf)):
+                win = buf[max(0, p - w + 1):p + 1]
+                b = buf[p]
+                row = (b[1], b[2], b[3], len(b[4]), len(b[5]),
+                       float(sum(x[1] for x in win)),
+                       float(sum(x[2] for x in win)),
+                       float(sum(x[3] for x in win)),
+                       float(sum(len(x[4]) for x in win)),
+                       float(sum(len(x[5]) for x in win)))
+                self._put(ip, b[0], row)
+                changed.append((ip, b[0]) + row)
+            if len(buf) > self.history_minutes:
+                del buf[:len(buf) - self.history_minutes]
+                self._evicted.add(ip)
+            if buf and (self.watermark is None or buf[-1][0] > self.watermark):
+                self.watermark = buf[-1][0]
+        self._expire()
+        if changed:
+            self._cube = None
+            if self.cutoff is not None:
+                changed = [r for r in changed if r[1] >= self.cutoff]
+        return self._to_frame(changed)
+
+    def frame(self) -> pd.DataFrame:
+        return self._to_frame([(ip, m) + row for m, at in self._rows.items() for ip, row in at.items()])
+
+    def cube(self) -> "FeatureCube":
+        if self._cube is None:
+            self._cube = FeatureCube(self.frame())
+        return self._cube
+
+    def _to_frame(self, rows) -> pd.DataFrame:
+        w = self.window_minutes
+        cols = _WINDOW_COLS + [f"r{w}m_{c}" for c in _WINDOW_COLS]
+        out = pd.DataFrame(rows, columns=["src_ip","timestamp"] + cols)
+        out["timestamp"] = pd.to_datetime(out["timestamp"], utc=True)
+        if self._ts_dtype is not None:
+            out["timestamp"] = out["timestamp"].astype(self._ts_dtype)
+        out[_WINDOW_COLS] = out[_WINDOW_COLS].astype("int64")
+        out = out.sort_values(["src_ip","timestamp"]).reset_index(drop=True)
+        out["fail_rate"] = out[f"r{w}m_fails"] / out[f"r{w}m_total"].clip(lower=1)
+        out["avg_interval_sec"] = (w * 60) / out[f"r{w}m_total"].clip(lower=1)
+        out["minute"] = out["timestamp"].dt.floor("1min")
+        return out.fillna(0.0)
+
+def _group_starts(keys: np.ndarray) -> np.ndarray:
+    """Position of the first row of each row's run of equal keys (keys sorted)."""
+    n = len(keys)
+    if not n:
+        return np.zeros(0, dtype=np.int64)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = keys[1:] != keys[:-1]
+    return np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+
+class FeatureCube:
+    """Per-IP prefix sums over minute buckets, built once.
+
+    features(n) derives the r{n}m_* columns for any window size by
+    subtracting prefix sums, so changing the window never regroups logs.
+    """
+
+    def __init__(self, per_min: pd.DataFrame):
+        base = (per_min[["src_ip","timestamp"] + _WINDOW_COLS]
+                .sort_values(["src_ip","timestamp"])
+                .reset_index(drop=True))
+        n = len(base)
+        self.base = base
+        self._start = _group_starts(base["src_ip"].to_numpy())
+        self._pos = np.arange(n)
+        self._prefix = np.zeros((n + 1, len(_WINDOW_COLS)), dtype=np.int64)
+        np.cumsum(base[_WINDOW_COLS].to_numpy(dtype=np.int64), axis=0, out=self._prefix[1:])
+        self._cache = {}
+
+    @classmethod
+    def from_logs(cls, df: pd.DataFrame) -> "FeatureCube":
+        dfa = df[df["event"] == "auth"]
+        status = dfa["status"]
+        per_min = (pd.DataFrame({
+                       "src_ip": dfa["src_ip"].values,
+                       "timestamp": parse_timestamps(dfa["timestamp"]).dt.floor("1min").array,
+                       "fail": (status == "fail").values,
+                       "success": (status == "success").values,
+                       "user": dfa["user"].values,
+                       "port": dfa["port"].values,
+                   })
+                   .groupby(["src_ip","timestamp"], observed=True)
+                   .agg(total=("fail","size"),
+                        fails=("fail","sum"),
+                        successes=("success","sum"),
+                        users=("user","nunique"),
+                        ports=("port","nunique"))
+                   .reset_index())
+        return cls(per_min)
+
+    def rolling(self, window_minutes: int) -> np.ndarray:
+        window_minutes = int(max(1, window_minutes))
+        lo = np.maximum(self._pos + 1 - window_minutes, self._start)
+        return (self._prefix[self._pos + 1] - self._prefix[lo]).astype(float)
+
+    def features(self, window_minutes: int = 5) -> pd.DataFrame:
+        window_minutes = int(max(1, window_minutes))
+        if window_minutes not in self._cache:
+            out = self.base.copy()
+            sums = self.rolling(window_minutes)
+            for i, col in enumerate(_WINDOW_COLS):
+                out[f"r{window_minutes}m_{col}"] = sums[:, i]
+            out["fail_rate"] = out[f"r{window_minutes}m_fails"] / out[f"r{window_minutes}m_total"].clip(lower=1)
+            out["avg_interval_sec"] = (window_minutes * 60) / out[f"r{window_minutes}m_total"].clip(lower=1)
+            out["minute"] = out["timestamp"].dt.floor("1min")
+            self._cache[window_minutes] = out.fillna(0.0)
+        return self._cache[window_minutes]
+
 def rule_based_flags(features: pd.DataFrame, fail_threshold:int=10, window_minutes:int=5) -> pd.DataFrame:
     flags = features.copy()
     flags["rule_bruteforce"] = flags[f"r{window_minutes}m_fails"] >= fail_threshold
     flags["is_suspicious_rule"] = flags["rule_bruteforce"]
     return flags
 
-def isolation_forest_scores(features: pd.DataFrame, contamination: float = 0.02) -> pd.DataFrame:
-    cols = [c for c in features.columns if c.startswith("r") or c in ["fail_rate","avg_interval_sec"]]
+def _if_columns(features: pd.DataFrame) -> list:
+    return [c for c in features.columns if _WINDOW_COL.match(c) or c in ["fail_rate","avg_interval_sec","deny_rate"]]
+
+def isolation_forest_scores(features: pd.DataFrame, contamination: float = 0.02,
+                            registry: ModelRegistry = None, window_minutes: int = None) -> pd.DataFrame:
+    cols = _if_columns(features)
     X = features[cols].astype(float).fillna(0.0)
+    if registry is not None and window_minutes is not None and (len(X) >= 10 or registry.get(window_minutes, contamination)):
+        return registry.score(features, window_minutes, contamination)
     if len(X) < 10:
         features = features.copy()
         features["if_score"] = 0.0
         features["is_suspicious_if"] = False
         return features
+    from sklearn.ensemble import IsolationForest
     model = IsolationForest(contamination=contamination, random_state=42)
     model.fit(X)
     scores = -model.score_samples(X) 
@@ -84,15 +367,26 @@ def _normalize(series: pd.Series) -> pd.Series:
         return pd.Series(0.0, index=series.index)
     return (series - mn) / (mx - mn)
 
-def summarize_incidents(findings: pd.DataFrame, top_k:int=20) -> pd.DataFrame:
-    if findings.empty:
-        return pd.DataFrame(columns=["src_ip","last_seen","max_if_score","rule_hits","total_minutes","risk","severity"])
-    agg = (findings.groupby("src_ip")
+def _incident_stats(findings: pd.DataFrame) -> pd.DataFrame:
+    return (findings.groupby("src_ip", observed=True)
                     .agg(last_seen=("timestamp","max"),
                          max_if_score=("if_score","max"),
                          rule_hits=("is_suspicious_rule","sum"),
                          total_minutes=("timestamp","size"))
                     .reset_index())
+
+def _combine_incident_stats(parts) -> pd.DataFrame:
+    """Fold per-chunk _incident_stats into one row per src_ip."""
+    stats = pd.concat(parts, ignore_index=True)
+    stats["src_ip"] = stats["src_ip"].astype(str)
+    return (stats.groupby("src_ip")
+                 .agg(last_seen=("last_seen","max"),
+                      max_if_score=("max_if_score","max"),
+                      rule_hits=("rule_hits","sum"),
+                      total_minutes=("total_minutes","sum"))
+                 .reset_index())
+
+def _rank_incidents(agg: pd.DataFrame, top_k: int) -> pd.DataFrame:
     norm_if = _normalize(agg["max_if_score"].fillna(0.0))
     agg["risk"] = 2.0*agg["rule_hits"].astype(float) + 10.0*norm_if
     agg["severity"] = pd.cut(
@@ -102,31 +396,577 @@ def summarize_incidents(findings: pd.DataFrame, top_k:int=20) -> pd.DataFrame:
     )
     return agg.sort_values(["risk","last_seen"], ascending=[False, False]).head(top_k)
 
-def summarize_firewall_incidents(logs_fw: pd.DataFrame, top_k:int=20) -> pd.DataFrame:
+def summarize_incidents(findings: pd.DataFrame, top_k:int=20) -> pd.DataFrame:
+    if findings.empty:
+        return pd.DataFrame(columns=["src_ip","last_seen","max_if_score","rule_hits","total_minutes","risk","severity"])
+    return _rank_incidents(_incident_stats(findings), top_k)
+
+_FW_COUNT_COLS = ["total", "denies"]
+_FW_DISTINCT_COLS = ["dst_ips", "ports"]
+
+def firewall_window_features(df: pd.DataFrame, window_minutes: int = 5,
+                             precision: int = HLL_PRECISION) -> pd.DataFrame:
+    """Per (src_ip, minute) firewall features, the counterpart of sliding_window_features.
+
+    Distinct dst_ip and port counts, per minute and over the rolling window,
+    are HyperLogLog estimates: each minute bucket keeps 2**precision
+    registers per column and the window is the register-wise max of its
+    buckets, so memory per IP stays fixed however many ports it touches.
+    """
+    window_minutes = int(max(1, window_minutes))
+    w = window_minutes
+    df = df[df["src_ip"].notna() & df["timestamp"].notna()]
+    ts = parse_timestamps(df["timestamp"])
+    keys = pd.DataFrame({"src_ip": df["src_ip"].values, "timestamp": ts.dt.floor("1min").array})
+    grouped = keys.groupby(["src_ip", "timestamp"], observed=True, sort=True)
+    bucket = grouped.ngroup().to_numpy()
+    per_min = (pd.DataFrame({"bucket": bucket,
+                             "deny": (df["action"].astype(str).str.lower() == "deny").to_numpy()})
+                 .groupby("bucket", sort=True)
+                 .agg(total=("deny", "size"), denies=("deny", "sum")))
+    per_min = pd.concat([grouped.size().reset_index()[["src_ip", "timestamp"]],
+                         per_min.reset_index(drop=True)], axis=1)
+    starts = _group_starts(per_min["src_ip"].to_numpy())
+
+    counts = per_min[_FW_COUNT_COLS].to_numpy(dtype=np.int64)
+    prefix = np.zeros((len(per_min) + 1, len(_FW_COUNT_COLS)), dtype=np.int64)
+    np.cumsum(counts, axis=0, out=prefix[1:])
+    pos = np.arange(len(per_min))
+    lo = np.maximum(pos + 1 - w, starts)
+    sums = (prefix[pos + 1] - prefix[lo]).astype(float)
+    for i, col in enumerate(_FW_COUNT_COLS):
+        per_min[f"r{w}m_{col}"] = sums[:, i]
+    for col, src in zip(_FW_DISTINCT_COLS, ["dst_ip", "port"]):
+        regs = hll_registers(bucket, hash_values(df[src]), len(per_min), precision)
+        per_min[col] = np.round(hll_estimate(regs)).astype(np.int64) if len(per_min) else np.zeros(0, dtype=np.int64)
+        per_min[f"r{w}m_{col}"] = np.round(hll_estimate(hll_rolling_union(regs, starts, w))) if len(per_min) else 0.0
+    per_min["deny_rate"] = per_min[f"r{w}m_denies"] / per_min[f"r{w}m_total"].clip(lower=1)
+    per_min["minute"] = per_min["timestamp"].dt.floor("1min")
+    return per_min.fillna(0.0)
+
+def firewall_rule_flags(features: pd.DataFrame, window_minutes: int = 5,
+                        port_threshold: int = 50, host_threshold: int = 100) -> pd.DataFrame:
+    flags = features.copy()
+    flags["rule_portscan"] = flags[f"r{window_minutes}m_ports"] >= port_threshold
+    flags["rule_hostscan"] = flags[f"r{window_minutes}m_dst_ips"] >= host_threshold
+    flags["is_suspicious_rule"] = flags["rule_portscan"] | flags["rule_hostscan"]
+    return flags
+
+def summarize_firewall_incidents(logs_fw: pd.DataFrame, top_k:int=20, findings: pd.DataFrame = None) -> pd.DataFrame:
     blocked = logs_fw[logs_fw["action"].astype(str).str.lower() == "deny"].copy()
     if blocked.empty:
         return pd.DataFrame(columns=["src_ip","denies","last_seen"])
-    agg = (blocked.groupby("src_ip").agg(denies=("src_ip","size"),last_seen=("timestamp","max")).reset_index())
+    agg = (blocked.groupby("src_ip", observed=True).agg(denies=("src_ip","size"),last_seen=("timestamp","max")).reset_index())
     agg["severity"] = pd.qcut(agg["denies"].rank(method="first"), q=3, labels=["Low","Medium","High"])
     agg["risk"] = agg["denies"].astype(float)
+    if findings is not None and not findings.empty:
+        # scan findings: peak window cardinalities, and any rule hit makes the source High
+        ports_col = next(c for c in findings.columns if _WINDOW_COL.match(c) and c.endswith("_ports"))
+        scans = (findings.groupby("src_ip", observed=True)
+                         .agg(max_ports=(ports_col, "max"),
+                              max_dst_ips=(ports_col[:-len("ports")] + "dst_ips", "max"),
+                              scan_minutes=("is_suspicious_rule", "sum"),
+                              max_if_score=("if_score", "max"))
+                         .reset_index())
+        agg = agg.merge(scans, on="src_ip", how="left").fillna({"max_ports": 0, "max_dst_ips": 0, "scan_minutes": 0})
+        agg["severity"] = agg["severity"].where(agg["scan_minutes"] == 0, "High")
     return agg.sort_values(["denies","last_seen"], ascending=[False, False]).head(top_k)
 
+_SHARD_COLS = ["ip", "ts", "user", "port", "fail", "success"]
+
+def _to_shm(table: pa.Table):
+    """Write `table` as an Arrow IPC stream into a new shared memory block; returns (name, size)."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    buf = sink.getvalue()
+    shm = shared_memory.SharedMemory(create=True, size=max(1, buf.size))
+    shm.buf[:buf.size] = memoryview(buf).cast("B")
+    shm.close()
+    return shm.name, buf.size
+
+def _from_shm(name: str, size: int) -> pd.DataFrame:
+    """Read and unlink a block written by _to_shm."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        with pa.ipc.open_stream(pa.py_buffer(bytes(shm.buf[:size]))) as reader:
+            return reader.read_all().to_pandas()
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _unlink_shm(name: str):
+    """Remove a block written by _to_shm if it still exists."""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+def _shard_features(name: str, size: int, window_minutes: int, fail_threshold: int):
+    """Worker: per-minute buckets, rolling sums and rule flags for one src_ip shard.
+
+    Input and output are integer-coded Arrow tables in shared memory; the
+    IP code order is the parent's sorted src_ip order, so sorting by
+    (ip, ts) here reproduces sliding_window_features' row order.
+    """
+    ev = _from_shm(name, size)
+    w = window_minutes
+    per_min = (ev.assign(ts=ev["ts"] // 60_000_000_000 * 60_000_000_000)
+                 .groupby(["ip", "ts"], sort=True)
+                 .agg(total=("fail", "size"),
+                      fails=("fail", "sum"),
+                      successes=("success", "sum"),
+                      users=("user", "nunique"),
+                      ports=("port", "nunique"))
+                 .reset_index())
+    prefix = np.zeros((len(per_min) + 1, len(_WINDOW_COLS)), dtype=np.int64)
+    np.cumsum(per_min[_WINDOW_COLS].to_numpy(dtype=np.int64), axis=0, out=prefix[1:])
+    pos = np.arange(len(per_min))
+    lo = np.maximum(pos + 1 - w, _group_starts(per_min["ip"].to_numpy()))
+    sums = (prefix[pos + 1] - prefix[lo]).astype(float)
+    for i, col in enumerate(_WINDOW_COLS):
+        per_min[f"r{w}m_{col}"] = sums[:, i]
+    per_min["fail_rate"] = per_min[f"r{w}m_fails"] / per_min[f"r{w}m_total"].clip(lower=1)
+    per_min["avg_interval_sec"] = (w * 60) / per_min[f"r{w}m_total"].clip(lower=1)
+    per_min["rule_bruteforce"] = per_min[f"r{w}m_fails"] >= fail_threshold
+    return _to_shm(pa.Table.from_pandas(per_min, preserve_index=False))
+
+_POOLS = {}
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    # Pools are kept per size: spawning workers (and importing sklearn in them) costs more than a small shard.
+    if workers not in _POOLS:
+        _POOLS[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    return _POOLS[workers]
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _POOLS.values():
+        pool.shutdown(cancel_futures=True)
+    _POOLS.clear()
+
+def sharded_features(logs: pd.DataFrame, window_minutes: int = 5, fail_threshold: int = 10,
+                     workers: int = None, shards: int = None) -> pd.DataFrame:
+    """sliding_window_features + rule flags computed per src_ip hash shard in a process pool.
+
+    Auth events are reduced to integer columns (IP/user codes, epoch ns,
+    port, fail/success) and handed to workers as Arrow buffers in shared
+    memory, so no DataFrame is pickled. Shards are merged in
+    (src_ip, timestamp) order, so the result does not depend on the number
+    of workers or shards.
+    """
+    window_minutes = int(max(1, window_minutes))
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    dfa = logs[logs["event"] == "auth"]
+    ts = parse_timestamps(dfa["timestamp"])
+    if isinstance(dfa["src_ip"].dtype, pd.CategoricalDtype) and dfa["src_ip"].cat.categories.is_monotonic_increasing:
+        ip_codes, ips = dfa["src_ip"].cat.codes.to_numpy(), dfa["src_ip"].cat.categories
+    else:
+        ip_codes, ips = pd.factorize(dfa["src_ip"], sort=True)
+    user = pd.factorize(dfa["user"])[0]
+    events = pd.DataFrame({
+        "ip": ip_codes.astype(np.int32),
+        "ts": ts.to_numpy(dtype="datetime64[ns]").view(np.int64),
+        "user": pd.Series(user, dtype="Int32").mask(user < 0).array,
+        "port": pd.to_numeric(dfa["port"], errors="coerce").to_numpy(),
+        "fail": (dfa["status"] == "fail").to_numpy(),
+        "success": (dfa["status"] == "success").to_numpy(),
+    })
+    events = events[events["ip"] >= 0]
+    shard_of_ip = (pd.util.hash_array(np.asarray(ips.astype(str))) % np.uint64(shards)).astype(np.int64)
+    shard = shard_of_ip[events["ip"].to_numpy()] if len(ips) else np.zeros(len(events), dtype=np.int64)
+
+    pool = _pool(workers)
+    futures, inputs, parts = [], [], []
+    try:
+        for k in range(shards):
+            part = events[shard == k]
+            if len(part):
+                name, size = _to_shm(pa.Table.from_pandas(part, preserve_index=False))
+                inputs.append(name)
+                futures.append(pool.submit(_shard_features, name, size, window_minutes, fail_threshold))
+        for f in futures:
+            parts.append(_from_shm(*f.result()))
+    finally:
+        # after a failure, unread inputs and the outputs of the other shards are still in /dev/shm
+        pending = futures[len(parts):]
+        for f in pending:
+            f.cancel()
+        wait(pending)
+        for f in pending:
+            if not f.cancelled() and f.exception() is None:
+                _unlink_shm(f.result()[0])
+        for name in inputs:
+            _unlink_shm(name)
+
+    w = window_minutes
+    if parts:
+        out = pd.concat(parts, ignore_index=True).sort_values(["ip", "ts"], kind="stable").reset_index(drop=True)
+    else:
+        out = pd.DataFrame(columns=["ip", "ts"] + _WINDOW_COLS + [f"r{w}m_{c}" for c in _WINDOW_COLS]
+                           + ["fail_rate", "avg_interval_sec", "rule_bruteforce"])
+    src_ip = pd.Categorical.from_codes(out.pop("ip").to_numpy(dtype=np.int64), categories=ips)
+    out.insert(0, "src_ip", src_ip if isinstance(dfa["src_ip"].dtype, pd.CategoricalDtype) else np.asarray(src_ip))
+    out.insert(1, "timestamp", pd.to_datetime(out.pop("ts").to_numpy(dtype=np.int64), utc=True).astype(ts.dtype))
+    out["minute"] = out["timestamp"].dt.floor("1min")
+    out["rule_bruteforce"] = out.pop("rule_bruteforce").astype(bool)
+    out["is_suspicious_rule"] = out["rule_bruteforce"]
+    return out.fillna(0.0)
+
+_STAGE_SPANS = {"logs": "load", "sharded_features": "features", "isolation_forest": "if", "incidents": "summarize"}
+
+@traced("run_detection")
 def run_detection(csv_path: str,
                   window_minutes:int=5,
                   fail_threshold:int=10,
                   contamination:float=0.02,
-                  log_type: str = "ssh"):
-    logs = load_logs(csv_path, log_type=log_type)
+                  log_type: str = "ssh",
+                  engine: SlidingWindowEngine = None,
+                  cube: FeatureCube = None,
+                  start=None,
+                  end=None,
+                  cache: ResultCache = None,
+                  registry: ModelRegistry = None,
+                  workers: int = None):
+    """Load logs, build features, score and summarize; returns (logs, findings, incidents).
+
+    With `workers` > 1 (and no engine/cube), SSH features and rule flags are
+    built by sharded_features in a process pool; the IsolationForest is
+    still fitted once on the merged features.
+    """
+    fingerprint = file_fingerprint(csv_path) if cache is not None else None
+
+    def stage(name, params, fn, rows_in=None):
+        # Each stage is keyed only on the parameters it depends on, so e.g. a new
+        # fail_threshold reuses cached logs, features and IsolationForest scores.
+        with span(_STAGE_SPANS.get(name, name), rows_in, log_type=log_type) as sp:
+            if cache is None:
+                return sp.output(fn())
+            return sp.output(cache.get_or_compute((name, fingerprint, log_type, str(start), str(end)) + params, fn))
+
+    logs = stage("logs", (), lambda: load_logs(csv_path, log_type=log_type, start=start, end=end))
 
     if log_type == "ssh":
-        feats = sliding_window_features(logs, window_minutes=window_minutes)
-        flagged = rule_based_flags(feats, fail_threshold=fail_threshold, window_minutes=window_minutes)
-        with_if = isolation_forest_scores(flagged, contamination=contamination)
-        merged = merge_findings(with_if)
-        incidents = summarize_incidents(merged, top_k=50)
+        shard_flags = None
+        if engine is not None and start is None and end is None and engine.sync(csv_path, logs):
+            cube = engine.cube()
+        if cube is not None:
+            with span("features", logs, log_type=log_type, source="cube") as sp:
+                feats = sp.output(cube.features(window_minutes))
+        elif workers and workers > 1:
+            shard_flags = stage("sharded_features", (window_minutes, fail_threshold),
+                                lambda: sharded_features(logs, window_minutes, fail_threshold, workers=workers), logs)
+            feats = shard_flags.drop(columns=["rule_bruteforce", "is_suspicious_rule"])
+        else:
+            feats = stage("features", (window_minutes,),
+                          lambda: sliding_window_features(logs, window_minutes=window_minutes), logs)
+        if registry is not None:
+            with span("if", feats, log_type=log_type, source="registry") as sp:
+                with_if = sp.output(isolation_forest_scores(feats, contamination=contamination,
+                                                            registry=registry, window_minutes=window_minutes))
+        else:
+            with_if = stage("isolation_forest", (window_minutes, contamination),
+                            lambda: isolation_forest_scores(feats, contamination=contamination), feats)
+        with span("rules", with_if, log_type=log_type) as sp:
+            if shard_flags is not None:
+                flagged = with_if.assign(rule_bruteforce=shard_flags["rule_bruteforce"].to_numpy(),
+                                         is_suspicious_rule=shard_flags["is_suspicious_rule"].to_numpy())
+            else:
+                flagged = rule_based_flags(with_if, fail_threshold=fail_threshold, window_minutes=window_minutes)
+            sp.output(flagged)
+        with span("merge", flagged, log_type=log_type) as sp:
+            merged = sp.output(merge_findings(flagged))
+        # a background refit rescores the same file, so registry scores key the summary by model version
+        model_version = (str(merged["model_version"].iat[0])
+                         if "model_version" in merged.columns and len(merged) else None)
+        incidents = stage("incidents", (window_minutes, contamination, fail_threshold, model_version),
+                          lambda: summarize_incidents(merged, top_k=50), merged)
         return logs, merged, incidents
 
     elif log_type == "firewall":
-        incidents = summarize_firewall_incidents(logs, top_k=50)
-        findings = pd.DataFrame()
+        feats = stage("features", (window_minutes,),
+                      lambda: firewall_window_features(logs, window_minutes=window_minutes), logs)
+        with_if = stage("isolation_forest", (window_minutes, contamination),
+                        lambda: isolation_forest_scores(feats, contamination=contamination), feats)
+        with span("rules", with_if, log_type=log_type) as sp:
+            flagged = sp.output(firewall_rule_flags(with_if, window_minutes=window_minutes))
+        with span("merge", flagged, log_type=log_type) as sp:
+            findings = sp.output(merge_findings(flagged))
+        incidents = stage("incidents", (window_minutes, contamination),
+                          lambda: summarize_firewall_incidents(logs, top_k=50, findings=findings), findings)
         return logs, findings, incidents
+
+
+def iter_log_chunks(path: str, log_type: str = "ssh", chunk_rows: int = 500_000):
+    """Compact frames of at most ~chunk_rows rows from a CSV, or one per hour from a logstore directory."""
+    cols = _LOG_COLUMNS.get(log_type)
+    if os.path.isdir(path):
+        hours = {}
+        for f in list_partitions(path):
+            hours.setdefault(f.parent, []).append(f)
+        for files in hours.values():
+            df = pd.concat([pd.read_parquet(f, columns=cols) for f in files], ignore_index=True)
+            yield compact_frame(df, log_type).sort_values("timestamp", kind="stable")
+    else:
+        for chunk in pd.read_csv(path, dtype=csv_dtypes(log_type), chunksize=chunk_rows, usecols=cols):
+            yield compact_frame(chunk, log_type)
+
+def _budget_rows(path: str, log_type: str, memory_budget_mb: float) -> int:
+    """Rows per chunk so that one compact chunk takes about a quarter of the budget."""
+    sample = next(iter_log_chunks(path, log_type, chunk_rows=10_000), None)
+    if sample is None or sample.empty:
+        return 10_000
+    per_row = sample.memory_usage(index=True, deep=True).sum() / len(sample)
+    # read_csv holds the raw text block and parsed columns at once; allow ~3x the compact size
+    return max(10_000, int(memory_budget_mb * 2**20 / 4 / (3 * per_row)))
+
+class ChunkedWindowFeatures:
+    """sliding_window_features over a stream of time-ordered chunks.
+
+    Rows of the newest minute are held back until a later minute arrives, so
+    a minute bucket split across chunks is still counted once; the last
+    window_minutes-1 buckets of each IP are carried into the next chunk for
+    the rolling sums. Memory is one chunk plus O(#IPs * window) state.
+    Rows older than an already emitted minute are counted in late_rows and
+    dropped.
+    """
+
+    def __init__(self, window_minutes: int = 5):
+        self.window_minutes = int(max(1, window_minutes))
+        self._held = None
+        self._carry = None
+        self.emitted_until = None
+        self.late_rows = 0
+
+    @staticmethod
+    def _auth_rows(df: pd.DataFrame) -> pd.DataFrame:
+        dfa = df[df["event"] == "auth"]
+        return pd.DataFrame({
+            "src_ip": dfa["src_ip"].astype(str).to_numpy(),
+            "timestamp": parse_timestamps(dfa["timestamp"]).array,
+            "user": dfa["user"].astype(str).to_numpy(),
+            "port": dfa["port"].to_numpy(),
+            "fail": (dfa["status"] == "fail").to_numpy(),
+            "success": (dfa["status"] == "success").to_numpy(),
+        })
+
+    def push(self, df: pd.DataFrame = None, final: bool = False) -> pd.DataFrame:
+        """Feed a chunk of log rows; returns feature rows for the minutes completed by it."""
+        parts = [] if self._held is None else [self._held]
+        if df is not None and len(df):
+            parts.append(self._auth_rows(df))
+        self._held = None
+        if not parts:
+            return self._empty()
+        dfa = pd.concat(parts, ignore_index=True)
+        minute = dfa["timestamp"].dt.floor("1min")
+        if self.emitted_until is not None:
+            late = (minute <= self.emitted_until).to_numpy()
+            if late.any():
+                self.late_rows += int(late.sum())
+                dfa, minute = dfa.loc[~late], minute.loc[~late]
+        if not final and len(dfa):
+            hold = (minute == minute.max()).to_numpy()
+            self._held = dfa.loc[hold].reset_index(drop=True)
+            dfa, minute = dfa.loc[~hold], minute.loc[~hold]
+        if dfa.empty:
+            return self._empty()
+        self.emitted_until = minute.max()
+
+        per_min = (dfa.assign(timestamp=minute)
+                      .groupby(["src_ip", "timestamp"])
+                      .agg(total=("fail", "size"),
+                           fails=("fail", "sum"),
+                           successes=("success", "sum"),
+                           users=("user", "nunique"),
+                           ports=("port", "nunique"))
+                      .reset_index()
+                      .assign(_new=True))
+        w = self.window_minutes
+        if self._carry is not None:
+            per_min = pd.concat([self._carry.assign(_new=False), per_min], ignore_index=True)
+        per_min = per_min.sort_values(["src_ip", "timestamp"]).reset_index(drop=True)
+
+        prefix = np.zeros((len(per_min) + 1, len(_WINDOW_COLS)), dtype=np.int64)
+        np.cumsum(per_min[_WINDOW_COLS].to_numpy(dtype=np.int64), axis=0, out=prefix[1:])
+        pos = np.arange(len(per_min))
+        lo = np.maximum(pos + 1 - w, _group_starts(per_min["src_ip"].to_numpy()))
+        sums = (prefix[pos + 1] - prefix[lo]).astype(float)
+
+        if w > 1:
+            self._carry = per_min.groupby("src_ip", sort=False).tail(w - 1).drop(columns="_new")
+        is_new = per_min.pop("_new").to_numpy(dtype=bool)
+        out = per_min.loc[is_new].reset_index(drop=True)
+        for i, col in enumerate(_WINDOW_COLS):
+            out[f"r{w}m_{col}"] = sums[is_new, i]
+        out["fail_rate"] = out[f"r{w}m_fails"] / out[f"r{w}m_total"].clip(lower=1)
+        out["avg_interval_sec"] = (w * 60) / out[f"r{w}m_total"].clip(lower=1)
+        out["minute"] = out["timestamp"].dt.floor("1min")
+        return out.fillna(0.0)
+
+    def flush(self) -> pd.DataFrame:
+        return self.push(None, final=True)
+
+    def _empty(self) -> pd.DataFrame:
+        w = self.window_minutes
+        return pd.DataFrame(columns=["src_ip", "timestamp"] + _WINDOW_COLS + [f"r{w}m_{c}" for c in _WINDOW_COLS]
+                            + ["fail_rate", "avg_interval_sec", "minute"])
+
+_IF_SAMPLE_ROWS = 200_000   # most feature rows the spilled path fits its IsolationForest on
+
+class _Reservoir:
+    """Uniform sample of at most `capacity` feature rows (algorithm R, vectorized per batch).
+
+    Keeps only the IF columns plus (src_ip, timestamp), so that rows() can
+    return them in the in-memory path's (src_ip, timestamp) order.
+    """
+
+    def __init__(self, capacity: int, cols: list, seed: int = 42):
+        self.capacity = capacity
+        self.cols = cols
+        self.X = np.empty((capacity, len(cols)))
+        self.ip = np.empty(capacity, dtype=object)
+        self.ts = np.empty(capacity, dtype=np.int64)
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, feats: pd.DataFrame):
+        pos = self.seen + np.arange(len(feats))
+        slot = np.where(pos < self.capacity, pos, self._rng.integers(0, pos + 1))
+        take = slot < self.capacity
+        slot = slot[take]
+        self.X[slot] = feats[self.cols].astype(float).fillna(0.0).to_numpy()[take]
+        self.ip[slot] = feats["src_ip"].astype(str).to_numpy()[take]
+        self.ts[slot] = feats["timestamp"].astype("int64").to_numpy()[take]
+        self.seen += len(feats)
+
+    def rows(self) -> np.ndarray:
+        n = min(self.seen, self.capacity)
+        return self.X[:n][np.lexsort((self.ts[:n], self.ip[:n].astype(str)))]
+
+def run_detection_chunked(path: str,
+                          window_minutes: int = 5,
+                          fail_threshold: int = 10,
+                          contamination: float = 0.02,
+                          memory_budget_mb: float = 512,
+                          chunk_rows: int = None,
+                          spill_dir: str = None,
+                          strict: bool = False):
+    """run_detection for SSH logs larger than RAM; returns (findings, incidents).
+
+    Input must be time-ordered: a CSV sorted by timestamp, or a logstore
+    directory (read hour by hour). Rows older than a minute already emitted
+    are dropped with a warning, or raise ValueError when `strict`.
+
+    Chunks are turned into minute-bucket features by ChunkedWindowFeatures.
+    Feature rows stay in memory until they pass half the budget, and are then
+    spilled to parquet under `spill_dir`. Without spilling, scores, flags and
+    incidents match run_detection. With spilling, the IsolationForest is
+    fitted on a reservoir sample of at most _IF_SAMPLE_ROWS feature rows (and
+    an eighth of the budget). The score threshold is the sample's quantile,
+    and each spilled part is then scored in turn, so memory stays bounded by
+    the budget. Results are exact while every row fits in the sample, and
+    approximate beyond that. In that case findings holds only the suspicious
+    rows. With `spill_dir` the scored parts are kept there and
+    findings.attrs["spill_dir"] points at the full set; a temporary spill
+    directory is removed before returning.
+    """
+    chunk_rows = chunk_rows or _budget_rows(path, "ssh", memory_budget_mb)
+    spill_limit = memory_budget_mb * 2**20 / 2
+    builder = ChunkedWindowFeatures(window_minutes)
+    w = window_minutes
+    if_cols = [f"r{w}m_{c}" for c in _WINDOW_COLS] + ["fail_rate", "avg_interval_sec"]
+    sample_rows = min(_IF_SAMPLE_ROWS, max(10_000, int(memory_budget_mb * 2**20 / 8 / (8 * (len(if_cols) + 3)))))
+    reservoir = None
+    parts, in_memory, spilled = [], 0, []
+    spill_root = None
+
+    def spill():
+        nonlocal in_memory, spill_root, reservoir
+        if spill_root is None:
+            spill_root = spill_dir or tempfile.mkdtemp(prefix="detector-spill-")
+            os.makedirs(spill_root, exist_ok=True)
+            reservoir = _Reservoir(sample_rows, if_cols)
+        df = pd.concat(parts, ignore_index=True)
+        reservoir.add(df)
+        f = os.path.join(spill_root, f"features-{len(spilled):05d}.parquet")
+        df.to_parquet(f, index=False)
+        spilled.append(f)
+        parts.clear()
+        in_memory = 0
+
+    def keep(feats):
+        nonlocal in_memory
+        if feats.empty:
+            return
+        parts.append(feats)
+        in_memory += int(feats.memory_usage(index=True, deep=True).sum())
+        if in_memory > spill_limit:
+            spill()
+
+    try:
+        for chunk in iter_log_chunks(path, "ssh", chunk_rows):
+            keep(builder.push(chunk))
+            if strict and builder.late_rows:
+                raise ValueError(f"{path}: {builder.late_rows} rows are older than minutes already processed; "
+                                 "run_detection_chunked needs time-ordered input")
+        keep(builder.flush())
+        if builder.late_rows:
+            warnings.warn(f"run_detection_chunked dropped {builder.late_rows} out-of-order rows from {path}; "
+                          "sort the input by timestamp or use run_detection", RuntimeWarning, stacklevel=2)
+
+        def sorted_features(df):
+            df = df.sort_values(["src_ip", "timestamp"]).reset_index(drop=True)
+            return df.assign(src_ip=df["src_ip"].astype("category"))
+
+        if not spilled:
+            feats = sorted_features(pd.concat(parts, ignore_index=True) if parts else builder._empty())
+            with_if = isolation_forest_scores(feats, contamination=contamination)
+            merged = merge_findings(rule_based_flags(with_if, fail_threshold=fail_threshold,
+                                                     window_minutes=window_minutes))
+            return merged, summarize_incidents(merged, top_k=50)
+        if parts:
+            spill()
+
+        X = reservoir.rows()
+        model = None
+        if len(X) >= 10:
+            from sklearn.ensemble import IsolationForest
+            model = IsolationForest(contamination=contamination, random_state=42).fit(X)
+            thresh = pd.Series(-model.score_samples(X)).quantile(1 - contamination)
+        del X, reservoir
+
+        stats, suspicious = [], []
+        for f in spilled:
+            part = pd.read_parquet(f)
+            if model is None:
+                part["if_score"] = 0.0
+                part["is_suspicious_if"] = False
+            else:
+                part["if_score"] = -model.score_samples(part[if_cols].astype(float).fillna(0.0).to_numpy())
+                part["is_suspicious_if"] = part["if_score"] >= thresh
+            part = merge_findings(rule_based_flags(part, fail_threshold=fail_threshold, window_minutes=window_minutes))
+            stats.append(_incident_stats(part))
+            suspicious.append(part[part["is_suspicious"]])
+            part.to_parquet(f, index=False)
+        findings = sorted_features(pd.concat(suspicious, ignore_index=True))
+        if spill_dir is not None:
+            findings.attrs["spill_dir"] = spill_root
+        return findings, _rank_incidents(_combine_incident_stats(stats), top_k=50)
+    finally:
+        if spill_dir is None and spill_root is not None:
+            shutil.rmtree(spill_root, ignore_errors=True)
+
+if __name__ == "__main__":
+    # python detector.py <ssh.csv|store/ssh> [memory_budget_mb]  -> top incidents as CSV, out-of-core
+    # The CSV must be sorted by timestamp; out-of-order rows are dropped with a warning.
+    import sys
+    if len(sys.argv) < 2:
+        print("usage: python detector.py <time-sorted csv_or_store_dir> [memory_budget_mb]")
+        sys.exit(1)
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 512
+    _, incidents = run_detection_chunked(sys.argv[1], memory_budget_mb=budget)
+    print(incidents.to_csv(index=False), end="")
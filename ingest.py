@@ -0,0 +1,205 @@
+import os, csv, io, json, time
+from pathlib import Path
+from datetime import datetime, timezone
+import pandas as pd
+from logstore import write_partitions, clear_partitions
+from sessions import CowrieSessionizer, SESSION_FIELDS
+
+COWRIE_JSON = Path("cowrie_logs/log/cowrie/cowrie.json")
+COWRIE_CSV = Path("data/cowrie_logs.csv")
+COWRIE_SESSIONS_CSV = Path("data/cowrie_sessions.csv")
+COWRIE_FIELDS = ["timestamp", "src_ip", "dst_port", "eventid", "username", "password",
+                 "session", "duration", "version", "hassh", "input"]
+
+def _checkpoint_path(out_csv: Path) -> Path:
+    return out_csv.with_name(out_csv.stem + ".checkpoint.json")
+
+def load_checkpoint(path: Path) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_checkpoint(path: Path, state: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _find_rotated(src: Path, inode: int):
+    for p in src.parent.glob(src.name + ".*"):
+        try:
+            if p.stat().st_ino == inode:
+                return p
+        except OSError:
+            continue
+    return None
+
+def _iter_chunks(path: Path, offset: int, chunk_bytes: int):
+    """Yield (complete_lines, new_offset); a trailing partial line is left for the next call."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        pending = b""
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                return
+            data = pending + data
+            end = data.rfind(b"\n") + 1
+            pending = data[end:]
+            if end:
+                offset += end
+                yield data[:end], offset
+
+def _encode_rows(lines: bytes, fields, sessionizer: CowrieSessionizer = None) -> tuple:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+    records, last_ts, closed = [], None, []
+    for line in lines.splitlines():
+        try:
+            ev = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(ev, dict):
+            continue
+        rec = {k: ev.get(k) for k in fields}
+        writer.writerow(rec)
+        records.append(rec)
+        last_ts = ev.get("timestamp") or last_ts
+        if sessionizer is not None:
+            closed.extend(sessionizer.feed(ev))
+    return buf.getvalue().encode("utf-8"), records, last_ts, closed
+
+def _encode_sessions(records) -> bytes:
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=SESSION_FIELDS).writerows(records)
+    return buf.getvalue().encode("utf-8")
+
+def _append(out_csv: Path, payload: bytes):
+    fd = os.open(out_csv, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, payload)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _reset_csv(out_csv: Path, fields):
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_csv.with_name(out_csv.name + ".tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        csv.DictWriter(f, fieldnames=fields).writeheader()
+    os.replace(tmp, out_csv)
+    return out_csv.stat().st_size
+
+def tail_cowrie(json_path=COWRIE_JSON, out_csv=COWRIE_CSV, checkpoint_path=None,
+                fields=COWRIE_FIELDS, chunk_bytes: int = 8 << 20, store=None,
+                sessions_csv=None, sessionizer: CowrieSessionizer = None, heavy_hitters=None) -> dict:
+    """Append only the cowrie.json lines written since the last call to out_csv.
+
+    The checkpoint stores the source inode and byte offset plus the CSV size
+    it corresponds to. Each chunk is appended and then checkpointed, and a CSV
+    longer than its checkpoint (crash between the two) is cut back first, so
+    rows are never duplicated. A changed inode means cowrie rotated the log:
+    the rest of the old file is read from its rotated name before starting the
+    new one at 0. A file shorter than the offset was truncated and is reread.
+    If `store` is a logstore directory, new rows are also written there, in
+    files named after the CSV size the chunk starts at: a chunk replayed
+    after a crash replaces its files rather than adding rows twice. When the
+    CSV is rebuilt from offset 0 (new fields, missing CSV), the store is
+    cleared with it.
+
+    With `sessions_csv`, events are also fed to a CowrieSessionizer and each
+    completed session is appended there as one SESSION_FIELDS row; the open
+    sessions are saved in the checkpoint with the offsets, so a restart
+    resumes them instead of losing or double-counting events.
+    A sketches.HeavyHitters passed as `heavy_hitters` is updated with each
+    chunk of new rows, and cleared when the CSV is rebuilt.
+    """
+    json_path, out_csv = Path(json_path), Path(out_csv)
+    checkpoint_path = Path(checkpoint_path) if checkpoint_path else _checkpoint_path(out_csv)
+    stats = {"lines": 0, "bytes": 0, "sessions": 0, "seconds": 0.0, "lines_per_sec": 0.0,
+             "bytes_behind": 0, "event_lag_sec": None, "rotated": False, "truncated": False}
+    if not json_path.exists():
+        return stats
+    t0 = time.perf_counter()
+
+    state = load_checkpoint(checkpoint_path)
+    sessions_csv = Path(sessions_csv) if sessions_csv else None
+    if (state.get("fields") != list(fields) or not out_csv.exists()
+            or (sessions_csv is not None and (not sessions_csv.exists() or "sessions_csv_size" not in state))):
+        state = {"fields": list(fields), "inode": None, "offset": 0, "csv_size": _reset_csv(out_csv, fields)}
+        if store is not None:
+            clear_partitions(store)
+        if heavy_hitters is not None:
+            heavy_hitters.clear()   # it was seeded from the old CSV; every event is fed again below
+        if sessions_csv is not None:
+            state["sessions_csv_size"] = _reset_csv(sessions_csv, SESSION_FIELDS)
+    else:
+        if out_csv.stat().st_size != state["csv_size"]:
+            with open(out_csv, "r+b") as f:
+                f.truncate(state["csv_size"])
+        if sessions_csv is not None and sessions_csv.stat().st_size != state["sessions_csv_size"]:
+            with open(sessions_csv, "r+b") as f:
+                f.truncate(state["sessions_csv_size"])
+    if sessions_csv is not None:
+        sessionizer = (sessionizer or CowrieSessionizer()).restore(state.get("sessions", {}))
+    else:
+        sessionizer = None
+
+    st_src = json_path.stat()
+    sources = []
+    if state["inode"] is not None and state["inode"] != st_src.st_ino:
+        stats["rotated"] = True
+        old = _find_rotated(json_path, state["inode"])
+        if old is not None:
+            sources.append((old, state["inode"], state["offset"]))
+        state["offset"] = 0
+    elif st_src.st_size < state["offset"]:
+        stats["truncated"] = True
+        state["offset"] = 0
+    sources.append((json_path, st_src.st_ino, state["offset"]))
+
+    last_ts = state.get("last_event_ts")
+    for src, inode, offset in sources:
+        state["inode"], state["offset"] = inode, offset
+        for lines, new_offset in _iter_chunks(src, offset, chunk_bytes):
+            csv_at = state["csv_size"]
+            payload, records, ts, closed = _encode_rows(lines, fields, sessionizer)
+            if payload:
+                _append(out_csv, payload)
+            if closed:
+                session_payload = _encode_sessions(closed)
+                _append(sessions_csv, session_payload)
+                state["sessions_csv_size"] += len(session_payload)
+                stats["sessions"] += len(closed)
+            if sessionizer is not None:
+                state["sessions"] = sessionizer.state()
+            if records and (store is not None or heavy_hitters is not None):
+                rows = pd.DataFrame.from_records(records, columns=fields)
+                if store is not None:
+                    write_partitions(rows, store, name=f"{csv_at:020d}")
+                if heavy_hitters is not None:
+                    heavy_hitters.update(rows)
+            stats["lines"] += len(records)
+            stats["bytes"] += len(lines)
+            last_ts = ts or last_ts
+            state["csv_size"] += len(payload)
+            state["offset"] = new_offset
+            state["last_event_ts"] = last_ts
+            save_checkpoint(checkpoint_path, state)
+
+    stats["seconds"] = time.perf_counter() - t0
+    stats["lines_per_sec"] = stats["lines"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    stats["bytes_behind"] = max(0, json_path.stat().st_size - state["offset"])
+    if last_ts:
+        try:
+            seen = datetime.fromisoformat(last_ts.replace("Z", "+00:00"))
+            stats["event_lag_sec"] = (datetime.now(timezone.utc) - seen).total_seconds()
+        except ValueError:
+            pass
+    state["last_run"] = {k: stats[k] for k in ("lines", "bytes", "seconds", "lines_per_sec", "bytes_behind")}
+    save_checkpoint(checkpoint_path, state)
+    return stats
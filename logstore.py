@@ -0,0 +1,91 @@
+import os, sys, time
+from pathlib import Path
+import pandas as pd
+
+STORE_ROOT = Path(os.environ.get("LOG_STORE", "store"))
+
+def store_path(log_type: str, root=STORE_ROOT) -> Path:
+    return Path(root) / log_type
+
+def _hour_dir(root: Path, hour: pd.Timestamp) -> Path:
+    return root / f"date={hour:%Y-%m-%d}" / f"hour={hour:%H}"
+
+def _as_utc(ts):
+    if ts is None:
+        return None
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def write_partitions(df: pd.DataFrame, root, name: str = None) -> int:
+    """Append rows to <root>/date=YYYY-MM-DD/hour=HH/part-*.parquet; returns files written.
+
+    With `name` the files are part-<name>.parquet, so writing the same batch
+    again replaces them instead of duplicating its rows.
+    """
+    root = Path(root)
+    df = df.assign(timestamp=pd.to_datetime(df["timestamp"], utc=True))
+    written = 0
+    for hour, part in df.groupby(df["timestamp"].dt.floor("1h"), sort=True):
+        d = _hour_dir(root, hour)
+        d.mkdir(parents=True, exist_ok=True)
+        fname = f"part-{name or f'{time.time_ns():020d}'}.parquet"
+        tmp = d / f".{fname}.tmp"
+        part.sort_values("timestamp", kind="stable").to_parquet(tmp, index=False)
+        os.replace(tmp, d / fname)
+        written += 1
+    return written
+
+def clear_partitions(root) -> int:
+    """Delete every partition file under root; returns how many were removed."""
+    files = list_partitions(root)
+    for f in files:
+        f.unlink()
+    return len(files)
+
+def list_partitions(root, start=None, end=None) -> list:
+    """Parquet files whose hour partition overlaps [start, end], in time order."""
+    root = Path(root)
+    start, end = _as_utc(start), _as_utc(end)
+    files = []
+    for date_dir in sorted(root.glob("date=*")):
+        day = pd.Timestamp(date_dir.name[5:], tz="UTC")
+        if (end is not None and day > end) or (start is not None and day + pd.Timedelta(days=1) <= start):
+            continue
+        for hour_dir in sorted(date_dir.glob("hour=*")):
+            hour = day + pd.Timedelta(hours=int(hour_dir.name[5:]))
+            if (end is not None and hour > end) or (start is not None and hour + pd.Timedelta(hours=1) <= start):
+                continue
+            files.extend(sorted(hour_dir.glob("part-*.parquet")))
+    return files
+
+def read_store(root, start=None, end=None, columns=None) -> pd.DataFrame:
+    start, end = _as_utc(start), _as_utc(end)
+    files = list_partitions(root, start, end)
+    if columns is not None and "timestamp" not in columns:
+        columns = ["timestamp"] + list(columns)
+    if not files:
+        empty = pd.DataFrame(columns=columns or ["timestamp"])
+        empty["timestamp"] = pd.to_datetime(empty["timestamp"], utc=True)
+        return empty
+    df = pd.concat([pd.read_parquet(f, columns=columns) for f in files], ignore_index=True)
+    if start is not None or end is not None:
+        ts = df["timestamp"]
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= ts >= start
+        if end is not None:
+            mask &= ts <= end
+        df = df.loc[mask].reset_index(drop=True)
+    return df
+
+def convert_csv(csv_path, log_type: str, root=STORE_ROOT) -> int:
+    df = pd.read_csv(csv_path)
+    return write_partitions(df, store_path(log_type, root))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python logstore.py <csv_path> <ssh|firewall|cowrie> [store_root]")
+        sys.exit(1)
+    root = sys.argv[3] if len(sys.argv) > 3 else STORE_ROOT
+    n = convert_csv(sys.argv[1], sys.argv[2], root)
+    print(f"{sys.argv[1]} -> {store_path(sys.argv[2], root)} ({n} partitions)")
@@ -0,0 +1,167 @@
+import os, json, time, pickle, threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = Path(os.environ.get("MODEL_DIR", "models"))
+
+def feature_columns(features: pd.DataFrame, window_minutes: int) -> list:
+    return [f"r{window_minutes}m_{c}" for c in ["total","fails","successes","users","ports"]] + ["fail_rate","avg_interval_sec"]
+
+def _matrix(features: pd.DataFrame, cols) -> np.ndarray:
+    return features[cols].astype(float).fillna(0.0).to_numpy()
+
+def fit_model(features: pd.DataFrame, window_minutes: int, contamination: float,
+              reference_minutes: int = 7 * 24 * 60) -> dict:
+    """Fit an IsolationForest on the last `reference_minutes` of feature rows."""
+    cols = feature_columns(features, window_minutes)
+    ref = features
+    if reference_minutes and len(features):
+        ref = features[features["timestamp"] >= features["timestamp"].max() - pd.Timedelta(minutes=reference_minutes)]
+    X = _matrix(ref, cols)
+    from sklearn.ensemble import IsolationForest
+    model = IsolationForest(contamination=contamination, random_state=42)
+    model.fit(X)
+    train_scores = -model.score_samples(X)
+    return {
+        "version": f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}{time.time_ns() // 1_000_000 % 1000:03d}-w{window_minutes}-c{contamination:g}",
+        "model": model,
+        "columns": cols,
+        "window_minutes": window_minutes,
+        "contamination": contamination,
+        "threshold": float(np.quantile(train_scores, 1 - contamination)),
+        "trained_at": time.time(),
+        "n_rows": int(len(X)),
+        "ref_mean": X.mean(axis=0).tolist(),
+        "ref_std": X.std(axis=0).tolist(),
+    }
+
+def drift_score(record: dict, features: pd.DataFrame) -> float:
+    """Largest shift of a feature mean from the reference window, in reference std units."""
+    if features.empty:
+        return 0.0
+    X = _matrix(features, record["columns"])
+    std = np.maximum(np.asarray(record["ref_std"]), 1e-9)
+    return float(np.max(np.abs(X.mean(axis=0) - np.asarray(record["ref_mean"])) / std))
+
+class ModelRegistry:
+    """IsolationForest models persisted per (window, contamination).
+
+    A model is fitted once and then only scores rows it has not seen before.
+    Refits run in a background thread, either every `refit_interval_sec` or
+    when the feature means drift past `drift_threshold`; the current model
+    keeps scoring until the new one is saved.
+    """
+
+    def __init__(self, root=MODEL_DIR, refit_interval_sec: float = 24 * 3600,
+                 drift_threshold: float = 3.0, reference_minutes: int = 7 * 24 * 60,
+                 keep_versions: int = 5):
+        self.root = Path(root)
+        self.keep_versions = keep_versions
+        self.refit_interval_sec = refit_interval_sec
+        self.drift_threshold = drift_threshold
+        self.reference_minutes = reference_minutes
+        self._models = {}
+        self._scored = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+
+    @staticmethod
+    def _name(window_minutes: int, contamination: float) -> str:
+        return f"if-w{window_minutes}-c{contamination:g}"
+
+    def _save(self, record: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = self._name(record["window_minutes"], record["contamination"])
+        path = self.root / f"{record['version']}.pkl"
+        tmp = self.root / f".{record['version']}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        meta = {k: v for k, v in record.items() if k != "model"}
+        tmp = self.root / f".{name}.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(dict(meta, path=path.name), f)
+        os.replace(tmp, self.root / f"{name}.json")
+        old = sorted(self.root.glob(f"*-w{record['window_minutes']}-c{record['contamination']:g}.pkl"))
+        for p in old[:max(0, len(old) - self.keep_versions)]:
+            p.unlink(missing_ok=True)
+
+    def get(self, window_minutes: int, contamination: float):
+        name = self._name(window_minutes, contamination)
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+        try:
+            with open(self.root / f"{name}.json") as f:
+                meta = json.load(f)
+            with open(self.root / meta["path"], "rb") as f:
+                record = pickle.load(f)
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+            return None
+        with self._lock:
+            self._models[name] = record
+        return record
+
+    def fit(self, features: pd.DataFrame, window_minutes: int, contamination: float) -> dict:
+        record = fit_model(features, window_minutes, contamination, self.reference_minutes)
+        self._save(record)
+        with self._lock:
+            self._models[self._name(window_minutes, contamination)] = record
+        return record
+
+    def score(self, features: pd.DataFrame, window_minutes: int, contamination: float) -> pd.DataFrame:
+        """Add if_score, is_suspicious_if and model_version; fits synchronously only if no model exists."""
+        record = self.get(window_minutes, contamination)
+        if record is None:
+            record = self.fit(features, window_minutes, contamination)
+        name = self._name(window_minutes, contamination)
+        cols = record["columns"]
+        keys = pd.util.hash_pandas_object(features[["src_ip","timestamp"] + cols], index=False).to_numpy()
+        version, known = self._scored.get(name, (None, {}))
+        if version != record["version"]:
+            known = {}
+        scores = np.fromiter((known.get(k, np.nan) for k in keys), dtype=float, count=len(keys))
+        new = np.isnan(scores)
+        if new.any():
+            scores[new] = -record["model"].score_samples(_matrix(features.loc[new], cols))
+            known = dict(zip(keys, scores))
+        self._scored[name] = (record["version"], known)
+        out = features.copy()
+        out["if_score"] = scores
+        out["is_suspicious_if"] = out["if_score"] >= record["threshold"]
+        out["model_version"] = record["version"]
+        self.observe(features, window_minutes, contamination, recent=features.loc[new])
+        return out
+
+    def observe(self, features: pd.DataFrame, window_minutes: int, contamination: float, recent=None):
+        """Queue a background refit on `features` if the model is stale or `recent` rows drifted."""
+        record = self.get(window_minutes, contamination)
+        if record is None:
+            return
+        stale = time.time() - record["trained_at"] > self.refit_interval_sec
+        recent = features if recent is None else recent
+        if stale or drift_score(record, recent) > self.drift_threshold:
+            with self._lock:
+                self._pending[(window_minutes, contamination)] = features
+            self._wake.set()
+
+    def start(self, poll_sec: float = 60.0):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, args=(poll_sec,), daemon=True)
+            self._worker.start()
+        return self
+
+    def _run(self, poll_sec: float):
+        while True:
+            self._wake.wait(poll_sec)
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for (window_minutes, contamination), features in pending.items():
+                try:
+                    self.fit(features, window_minutes, contamination)
+                except Exception as e:
+                    print(f"[ModelRegistry] refit failed: {e}")
@@ -0,0 +1,185 @@
+import os
+import pandas as pd
+from logstore import list_partitions
+
+ROLLUP_DIMS = {
+    "ssh": ["src_ip", "user", "event", "status"],
+    "firewall": ["src_ip", "action"],
+    "cowrie": ["src_ip", "eventid"],   # username/password tops come from sketches.HeavyHitters
+}
+
+TOP_COLUMN = {
+    "top_ips": "src_ip",
+    "top_users": {"ssh": "user", "cowrie": "username"},
+    "top_passwords": "password",
+}
+
+_NS = pd.Timedelta(1, unit="ns")
+_MARK_BYTES = 4096
+
+def _csv_marks(path, size: int) -> tuple:
+    """First and last few KiB of the first `size` bytes of `path`; an append leaves them unchanged."""
+    with open(path, "rb") as f:
+        head = f.read(min(size, _MARK_BYTES))
+        f.seek(max(0, size - _MARK_BYTES))
+        return head, f.read(min(size, _MARK_BYTES))
+
+def _partition_stats(root) -> dict:
+    out = {}
+    for f in list_partitions(root):
+        st = f.stat()
+        out[str(f)] = (st.st_size, st.st_mtime_ns)
+    return out
+
+def _merge_buckets(old: pd.DataFrame, new: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Add `new` counts into the bucket-sorted `old` table, regrouping only overlapping buckets."""
+    if old.empty:
+        return new.sort_values("bucket", kind="stable").reset_index(drop=True)
+    if new.empty:
+        return old
+    cut = int(old["bucket"].searchsorted(new["bucket"].min(), side="left"))
+    tail = pd.concat([old.iloc[cut:], new], ignore_index=True)
+    tail = (tail.groupby(keys, dropna=False, sort=False, observed=True)["events"].sum()
+                .reset_index()
+                .sort_values("bucket", kind="stable"))
+    return pd.concat([old.iloc[:cut], tail], ignore_index=True)
+
+class LogRollup:
+    """Event counts per (minute|hour, src_ip, user, status/action/eventid ...).
+
+    Fed incrementally with update(); answer() serves the chat's top_* and
+    count ops from hour buckets, then minute buckets, and touches raw rows
+    only for the partial minutes at the edges of [start, end].
+    """
+
+    def __init__(self, log_type: str):
+        self.log_type = log_type
+        self.dims = ROLLUP_DIMS[log_type]
+        self.reset()
+
+    def reset(self):
+        empty = pd.DataFrame(columns=["bucket"] + self.dims + ["events"])
+        self.minute = empty
+        self.hour = empty
+        self.rows_seen = 0
+        self._source = None
+
+    def _count(self, rows: pd.DataFrame, freq: str) -> pd.DataFrame:
+        dims = [d for d in self.dims if d in rows.columns]
+        df = rows[dims].assign(bucket=pd.to_datetime(rows["timestamp"], utc=True).dt.floor(freq))
+        for d in self.dims:
+            if d not in df.columns:
+                df[d] = None
+        return (df.groupby(["bucket"] + self.dims, dropna=False, sort=False, observed=True)
+                  .size()
+                  .rename("events")
+                  .reset_index())
+
+    def update(self, rows: pd.DataFrame):
+        self.rows_seen += len(rows)
+        if rows.empty:
+            return
+        keys = ["bucket"] + self.dims
+        per_min = self._count(rows, "1min")
+        per_hour = (per_min.assign(bucket=per_min["bucket"].dt.floor("1h"))
+                           .groupby(keys, dropna=False, sort=False, observed=True)["events"].sum()
+                           .reset_index())
+        self.minute = _merge_buckets(self.minute, per_min, keys)
+        self.hour = _merge_buckets(self.hour, per_hour, keys)
+
+    def sync(self, path: str, logs: pd.DataFrame) -> bool:
+        """Bring the rollup up to date with `path`, loaded as `logs`; True if it was rebuilt.
+
+        A logstore directory is followed by partition file, since new rows
+        can land in an earlier hour; a CSV by its size and the bytes at both
+        ends of what was already counted. If anything already counted
+        changed (a rewritten CSV, a replaced or removed partition), the
+        rollup is rebuilt from `logs`.
+        """
+        if os.path.isdir(path):
+            files = _partition_stats(path)
+            known = self._source if isinstance(self._source, dict) else None
+            rebuild = known is None or any(files.get(f) != sig for f, sig in known.items())
+            if not rebuild:
+                new = [f for f in files if f not in known]
+                if new:
+                    self.update(pd.concat([pd.read_parquet(f) for f in new], ignore_index=True))
+        else:
+            size = os.path.getsize(path)
+            known = self._source if isinstance(self._source, tuple) else None
+            rebuild = (known is None or size < known[0] or len(logs) < self.rows_seen
+                       or _csv_marks(path, known[0]) != known[1])
+            if not rebuild:
+                self.update(logs.iloc[self.rows_seen:])
+            files = (size, _csv_marks(path, size))
+        if rebuild:
+            self.reset()
+            self.update(logs)
+        self._source = files
+        return rebuild
+
+    @staticmethod
+    def _between(table: pd.DataFrame, lo, hi) -> pd.DataFrame:
+        if table.empty or lo >= hi:
+            return table.iloc[:0]
+        b = table["bucket"]
+        return table.iloc[b.searchsorted(lo, side="left"):b.searchsorted(hi, side="left")]
+
+    def counts(self, start, end, time_index=None) -> pd.DataFrame:
+        """Rows of (dims..., events) covering [start, end] inclusive."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        full_lo, full_hi = start.ceil("1min"), (end + _NS).floor("1min")
+        parts, raw = [], []
+        if full_lo < full_hi:
+            hour_lo, hour_hi = full_lo.ceil("1h"), full_hi.floor("1h")
+            if hour_lo < hour_hi:
+                parts += [self._between(self.hour, hour_lo, hour_hi),
+                          self._between(self.minute, full_lo, hour_lo),
+                          self._between(self.minute, hour_hi, full_hi)]
+            else:
+                parts.append(self._between(self.minute, full_lo, full_hi))
+            raw = [(start, full_lo - _NS), (full_hi, end)]
+        else:
+            raw = [(start, end)]
+        if time_index is not None:
+            for lo, hi in raw:
+                if lo <= hi:
+                    rows = time_index.slice(lo, hi)
+                    if len(rows):
+                        parts.append(self._count(rows, "1min"))
+        parts = [p[self.dims + ["events"]] for p in parts if len(p)]
+        if not parts:
+            return pd.DataFrame(columns=self.dims + ["events"])
+        return pd.concat(parts, ignore_index=True)
+
+    def answer(self, intent: dict, time_index=None):
+        """Number of events for op="count", else a (value, events) top-N frame; None if op is not served."""
+        op = intent.get("op")
+        if op not in ("count", "top_ips", "top_users", "top_passwords"):
+            return None
+        col = TOP_COLUMN.get(op)
+        if isinstance(col, dict):
+            col = col.get(self.log_type)
+        if op != "count" and col not in self.dims:
+            return None
+        if self.log_type == "cowrie" and any(intent.get(k) and k not in self.dims for k in ("username", "password")):
+            return None
+        c = self.counts(intent["start"], intent["end"], time_index)
+        if self.log_type == "ssh":
+            for k in ("event", "status"):
+                if intent.get(k):
+                    c = c[c[k] == intent[k]]
+        elif self.log_type == "firewall":
+            if intent.get("action"):
+                c = c[c["action"].astype(str).str.lower() == str(intent["action"]).lower()]
+        else:
+            for k in ("eventid", "username", "password"):
+                if intent.get(k):
+                    c = c[c[k].astype(str).str.contains(intent[k], case=False, na=False, regex=False)]
+        if op == "count":
+            return int(c["events"].sum())
+        return (c.groupby(col, observed=True)["events"].sum()
+                 .reset_index()
+                 .sort_values("events", ascending=False, kind="stable")
+                 .head(int(intent.get("limit") or 10))
+                 .reset_index(drop=True))
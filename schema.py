@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from storage import _parse_v4
+
+# Column kinds per log type: "ts" is parsed once as UTC, "ip" and "cat" become
+# categoricals (int32 codes into a sorted table of distinct values), "port"
+# becomes uint16. Columns not listed are left as they are.
+LOG_SCHEMAS = {
+    "ssh": {"timestamp": "ts", "src_ip": "ip", "user": "cat", "event": "cat", "status": "cat", "port": "port"},
+    "firewall": {"timestamp": "ts", "src_ip": "ip", "dst_ip": "ip", "port": "port", "action": "cat"},
+    "cowrie": {"timestamp": "ts", "src_ip": "ip", "dst_port": "port", "eventid": "cat",
+               "username": "cat", "password": "cat"},
+}
+
+TS_FORMAT = "ISO8601"
+
+def csv_dtypes(log_type: str) -> dict:
+    """read_csv dtypes that build the categoricals while parsing, without an object-string copy."""
+    return {c: "category" for c, kind in LOG_SCHEMAS.get(log_type, {}).items() if kind in ("ip", "cat")}
+
+def parse_timestamps(s: pd.Series) -> pd.Series:
+    """UTC datetimes from ISO-8601 strings; already-parsed UTC columns are returned as is."""
+    if isinstance(s.dtype, pd.DatetimeTZDtype) and str(s.dtype.tz) == "UTC":
+        return s
+    if isinstance(s.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(s.dtype):
+        return pd.to_datetime(s, utc=True)
+    return pd.to_datetime(s, utc=True, format=TS_FORMAT)
+
+def _port(s: pd.Series) -> pd.Series:
+    if s.dtype == np.uint16:
+        return s
+    v = pd.to_numeric(s, errors="coerce")
+    if v.notna().all() and (v.empty or (v.min() >= 0 and v.max() <= 65535)):
+        return v.astype(np.uint16)
+    return v
+
+def _category(s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        if s.cat.categories.is_monotonic_increasing:
+            return s
+        return s.cat.reorder_categories(s.cat.categories.sort_values())
+    return s.astype("category")
+
+def compact(df: pd.DataFrame, log_type: str) -> pd.DataFrame:
+    """Apply LOG_SCHEMAS[log_type] to `df`; idempotent, so frames already compacted pass through cheaply."""
+    schema = LOG_SCHEMAS.get(log_type, {})
+    out = {}
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        if kind == "ts":
+            out[col] = parse_timestamps(df[col])
+        elif kind == "port":
+            out[col] = _port(df[col])
+        else:
+            out[col] = _category(df[col])
+    return df.assign(**out) if out else df
+
+def ip_ints(s: pd.Series):
+    """(valid, uint32 address) per row; IPv4 only, other values are invalid.
+
+    Categoricals are converted through their category table, so the cost
+    depends on the number of distinct addresses, not rows.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        valid, addr, plen = _parse_v4(s.cat.categories.astype(str).to_numpy())
+        valid &= plen == 32
+        codes = s.cat.codes.to_numpy()
+        ok = codes >= 0
+        return ok & valid[codes], np.where(ok, addr[codes], 0).astype(np.uint32)
+    valid, addr, plen = _parse_v4(s.astype(str).to_numpy())
+    return valid & (plen == 32), addr.astype(np.uint32)
+
+def int_to_ip(ints) -> np.ndarray:
+    """Dotted-quad strings for uint32 addresses (reverse of ip_ints)."""
+    return np.array([f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}"
+                     for a in np.asarray(ints, dtype=np.uint32).tolist()], dtype=object)
+
+def bytes_per_million(df: pd.DataFrame) -> float:
+    return float(df.memory_usage(index=True, deep=True).sum()) / max(len(df), 1) * 1e6
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from datetime import datetime
+import pandas as pd
+
+SESSION_FIELDS = ["session", "src_ip", "dst_port", "start", "end", "duration", "attempts", "logins_ok",
+                  "distinct_usernames", "distinct_passwords", "commands", "client_version", "hassh", "close_reason"]
+
+def _epoch(ts) -> float:
+    if not ts:
+        return None
+    try:
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+class CowrieSessionizer:
+    """Rebuilds cowrie sessions from the event stream, one compact record per session.
+
+    Open sessions live in an OrderedDict ordered by last activity, so idle
+    ones are evicted from the front once `idle_timeout_sec` of event time has
+    passed without activity, and the oldest are evicted whenever more than
+    `max_open` are open. Per-session lists of distinct usernames/passwords are capped
+    at `max_distinct` values. A half-open flood therefore costs at most
+    max_open small entries; evicted sessions are still emitted, with
+    close_reason "idle" or "overflow" instead of "closed".
+    """
+
+    def __init__(self, idle_timeout_sec: float = 300, max_open: int = 10_000, max_distinct: int = 64):
+        self.idle_timeout_sec = idle_timeout_sec
+        self.max_open = max_open
+        self.max_distinct = max_distinct
+        self._open = OrderedDict()   # session -> state dict, least recently active first
+        self.clock = None            # latest event time seen (epoch seconds)
+        self.evicted = {"idle": 0, "overflow": 0}
+
+    def __len__(self):
+        return len(self._open)
+
+    def _new(self, ev: dict, t: float) -> dict:
+        return {"src_ip": ev.get("src_ip"), "dst_port": ev.get("dst_port"), "start": ev.get("timestamp"),
+                "end": ev.get("timestamp"), "t0": t, "t": t, "attempts": 0, "logins_ok": 0,
+                "users": [], "passwords": [], "commands": 0, "client_version": None, "hassh": None}
+
+    def _record(self, session: str, s: dict, reason: str, duration=None) -> dict:
+        if duration is None and s["t0"] is not None and s["t"] is not None:
+            duration = s["t"] - s["t0"]
+        return {"session": session, "src_ip": s["src_ip"], "dst_port": s["dst_port"],
+                "start": s["start"], "end": s["end"], "duration": duration,
+                "attempts": s["attempts"], "logins_ok": s["logins_ok"],
+                "distinct_usernames": len(s["users"]), "distinct_passwords": len(s["passwords"]),
+                "commands": s["commands"], "client_version": s["client_version"], "hassh": s["hassh"],
+                "close_reason": reason}
+
+    def _add_distinct(self, values: list, v):
+        if v is not None and v not in values and len(values) < self.max_distinct:
+            values.append(v)
+
+    def feed(self, ev: dict) -> list:
+        """Apply one cowrie event; returns the session records it completed or evicted."""
+        session = ev.get("session")
+        if not session:
+            return []
+        t = _epoch(ev.get("timestamp"))
+        if t is not None and (self.clock is None or t > self.clock):
+            self.clock = t
+        out = []
+        s = self._open.get(session)
+        if s is None:
+            s = self._open[session] = self._new(ev, t)
+        else:
+            self._open.move_to_end(session)
+        if t is not None:
+            s["t"] = t if s["t"] is None else max(s["t"], t)
+            s["end"] = ev.get("timestamp")
+        eventid = ev.get("eventid", "")
+        if eventid in ("cowrie.login.failed", "cowrie.login.success"):
+            s["attempts"] += 1
+            s["logins_ok"] += eventid == "cowrie.login.success"
+            self._add_distinct(s["users"], ev.get("username"))
+            self._add_distinct(s["passwords"], ev.get("password"))
+        elif eventid == "cowrie.client.version":
+            s["client_version"] = ev.get("version")
+        elif eventid == "cowrie.client.kex":
+            s["hassh"] = ev.get("hassh")
+        elif eventid == "cowrie.command.input":
+            s["commands"] += 1
+        elif eventid == "cowrie.session.connect" and s["dst_port"] is None:
+            s["dst_port"] = ev.get("dst_port")
+        if eventid == "cowrie.session.closed":
+            del self._open[session]
+            duration = ev.get("duration")
+            out.append(self._record(session, s, "closed", float(duration) if duration is not None else None))
+        out.extend(self.expire())
+        return out
+
+    def expire(self, now: float = None) -> list:
+        """Evict sessions idle for idle_timeout_sec (event time), then the oldest beyond max_open."""
+        now = self.clock if now is None else now
+        out = []
+        while self._open:
+            session, s = next(iter(self._open.items()))
+            if len(self._open) > self.max_open:
+                reason = "overflow"
+            elif now is not None and s["t"] is not None and now - s["t"] > self.idle_timeout_sec:
+                reason = "idle"
+            else:
+                break
+            del self._open[session]
+            self.evicted[reason] += 1
+            out.append(self._record(session, s, reason))
+        return out
+
+    def flush(self) -> list:
+        """Emit every open session (close_reason "open"), e.g. for a final report; state is kept."""
+        return [self._record(k, s, "open") for k, s in self._open.items()]
+
+    def state(self) -> dict:
+        return {"clock": self.clock, "open": list(self._open.items()), "evicted": dict(self.evicted)}
+
+    def restore(self, state: dict):
+        self.clock = state.get("clock")
+        self._open = OrderedDict((k, v) for k, v in state.get("open", []))
+        self.evicted.update(state.get("evicted", {}))
+        return self
+
+def sessions_frame(records) -> pd.DataFrame:
+    return _typed(pd.DataFrame.from_records(list(records), columns=SESSION_FIELDS))
+
+def load_sessions(path) -> pd.DataFrame:
+    """Session records written by ingest.tail_cowrie(sessions_csv=...)."""
+    try:
+        df = pd.read_csv(path, dtype={"src_ip": "category", "client_version": "category",
+                                      "hassh": "category", "close_reason": "category"})
+    except (OSError, pd.errors.EmptyDataError):
+        df = pd.DataFrame(columns=SESSION_FIELDS)
+    return _typed(df)
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    for col in ("start", "end"):
+        df[col] = pd.to_datetime(df[col], utc=True, format="ISO8601")
+    return df
+
+def session_incidents(sessions: pd.DataFrame, top_k: int = 50) -> pd.DataFrame:
+    """Per src_ip honeypot summary from session records, most login attempts first.
+
+    password_attempts adds up each session's distinct passwords, so a
+    password reused across sessions counts once per session.
+    """
+    if sessions.empty:
+        return pd.DataFrame(columns=["src_ip", "sessions", "attempts", "logins_ok", "password_attempts",
+                                     "commands", "last_seen"])
+    return (sessions.groupby("src_ip", observed=True)
+                    .agg(sessions=("session", "size"),
+                         attempts=("attempts", "sum"),
+                         logins_ok=("logins_ok", "sum"),
+                         password_attempts=("distinct_passwords", "sum"),
+                         commands=("commands", "sum"),
+                         last_seen=("end", "max"))
+                    .reset_index()
+                    .sort_values(["attempts", "sessions"], ascending=False, kind="stable")
+                    .head(top_k))
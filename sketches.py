@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+from schema import parse_timestamps
+
+# HyperLogLog with 2**p one-byte registers per sketch; relative error is about 1.04 / sqrt(2**p).
+HLL_PRECISION = 7
+_ESTIMATE_ROWS = 8192   # register rows expanded to float64 at a time by hll_estimate
+
+def _alpha(m: int) -> float:
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Exact bit length of uint64 values, by binary search on shifts."""
+    x = x.astype(np.uint64)
+    n = np.zeros(len(x), dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        hi = (x >> np.uint64(s)) > 0
+        n += np.where(hi, s, 0)
+        x = np.where(hi, x >> np.uint64(s), x)
+    return n + (x > 0)
+
+def _split(h: np.ndarray, p: int) -> tuple:
+    """(register index, rank) per 64-bit hash: top p bits pick the register, the rest give the rank."""
+    rest_bits = 64 - p
+    idx = (h >> np.uint64(rest_bits)).astype(np.int64)
+    rest = h & np.uint64((1 << rest_bits) - 1)
+    rank = (rest_bits - _bit_length(rest) + 1).astype(np.uint8)
+    return idx, rank
+
+def hash_values(s: pd.Series) -> np.ndarray:
+    """64-bit hashes of a column; categoricals hash their category table once and index it by code."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        table = pd.util.hash_array(s.cat.categories.astype(str).to_numpy())
+        codes = s.cat.codes.to_numpy()
+        return np.where(codes >= 0, table[np.maximum(codes, 0)], np.uint64(0))
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        return pd.util.hash_array(s.to_numpy())
+    return pd.util.hash_array(s.astype(str).to_numpy())
+
+def hll_registers(groups: np.ndarray, hashes: np.ndarray, n_groups: int, p: int = HLL_PRECISION) -> np.ndarray:
+    """One HLL sketch per group: a (n_groups, 2**p) uint8 register matrix built without a Python loop."""
+    regs = np.zeros((n_groups, 1 << p), dtype=np.uint8)
+    if len(groups):
+        idx, rank = _split(hashes, p)
+        np.maximum.at(regs, (np.asarray(groups, dtype=np.int64), idx), rank)
+    return regs
+
+def hll_estimate(regs: np.ndarray) -> np.ndarray:
+    """Cardinality estimate per register row, with linear counting for small sets."""
+    regs = np.atleast_2d(regs)
+    m = regs.shape[1]
+    inv = np.exp2(-np.arange(256, dtype=np.float64))
+    harmonic = np.empty(len(regs))
+    zeros = np.empty(len(regs), dtype=np.int64)
+    for i in range(0, len(regs), _ESTIMATE_ROWS):
+        block = regs[i:i + _ESTIMATE_ROWS]
+        harmonic[i:i + _ESTIMATE_ROWS] = inv[block].sum(axis=1)
+        zeros[i:i + _ESTIMATE_ROWS] = (block == 0).sum(axis=1)
+    raw = _alpha(m) * m * m / harmonic
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where(small, linear, raw)
+
+def hll_rolling_union(regs: np.ndarray, starts: np.ndarray, window: int) -> np.ndarray:
+    """Union (element-wise max) of each row's sketch with the window-1 rows before it in its group.
+
+    `starts` is the first row of each row's group, rows sorted by group.
+    Loops over window offsets, not rows.
+    """
+    out = regs.copy()
+    pos = np.arange(len(regs))
+    for k in range(1, int(window)):
+        ok = pos - k >= starts
+        if not ok.any():
+            break
+        rows = pos[ok]
+        out[rows] = np.maximum(out[rows], regs[rows - k])
+    return out
+
+class SpaceSaving:
+    """Mergeable top-K summary (Space-Saving / Misra-Gries style) of at most `capacity` items.
+
+    `table` holds, per retained value, a lower bound `count` on its true
+    frequency and `error`, the most it can be undercounted by; any value
+    not in the table occurred at most `floor` times. Batches are folded in
+    as exact value counts, so updates are vectorized per batch.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.table = pd.DataFrame({"count": pd.Series(dtype=np.int64), "error": pd.Series(dtype=np.int64)})
+        self.floor = 0
+        self.total = 0
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series, capacity: int = 1000) -> "SpaceSaving":
+        s = cls(capacity)
+        s.table = pd.DataFrame({"count": counts.astype(np.int64), "error": np.zeros(len(counts), dtype=np.int64)})
+        s.total = int(counts.sum())
+        s._truncate()
+        return s
+
+    def _truncate(self):
+        if len(self.table) <= self.capacity:
+            return
+        upper = self.table["count"] + self.table["error"]
+        keep = self.table["count"].nlargest(self.capacity, keep="first").index
+        dropped = upper.drop(keep)
+        self.floor = max(self.floor, int(dropped.max()))
+        self.table = self.table.loc[keep]
+
+    def update(self, values) -> "SpaceSaving":
+        counts = pd.Series(values).value_counts(dropna=True)
+        return self.merge(SpaceSaving.from_counts(counts, self.capacity))
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Fold `other` into this summary in place; bounds stay valid for the union of both streams."""
+        a, b = self.table, other.table
+        joined = a.join(b, how="outer", lsuffix="_a", rsuffix="_b")
+        in_a, in_b = joined["count_a"].notna(), joined["count_b"].notna()
+        self.table = pd.DataFrame({
+            "count": joined["count_a"].fillna(0).astype(np.int64) + joined["count_b"].fillna(0).astype(np.int64),
+            "error": (joined["error_a"].fillna(0).astype(np.int64) + joined["error_b"].fillna(0).astype(np.int64)
+                      + np.where(in_a, 0, self.floor) + np.where(in_b, 0, other.floor)),
+        })
+        self.floor += other.floor
+        self.total += other.total
+        self._truncate()
+        return self
+
+    def copy(self) -> "SpaceSaving":
+        s = SpaceSaving(self.capacity)
+        s.table, s.floor, s.total = self.table.copy(), self.floor, self.total
+        return s
+
+    def top(self, n: int = 10) -> pd.DataFrame:
+        """(value, events, error) for the n largest lower bounds; true count is in [events, events + error]."""
+        t = self.table.sort_values(["count", "error"], ascending=[False, True], kind="stable").head(n)
+        return pd.DataFrame({"value": t.index.to_numpy(), "events": t["count"].to_numpy(),
+                             "error": t["error"].to_numpy()})
+
+class HeavyHitters:
+    """Per-hour SpaceSaving summaries of the top_* columns of one log type.
+
+    Memory is capacity entries per (hour, column), for at most `max_hours`
+    hours. top() merges the summaries of the hours inside [start, end] and,
+    given a TimeIndex, counts the partial hours at the edges exactly, like
+    LogRollup.counts does for minutes.
+    """
+
+    COLUMNS = {"ssh": ["src_ip", "user"], "firewall": ["src_ip"], "cowrie": ["src_ip", "username", "password"]}
+
+    def __init__(self, log_type: str, capacity: int = 1000, max_hours: int = 7 * 24):
+        self.log_type = log_type
+        self.columns = self.COLUMNS[log_type]
+        self.capacity = capacity
+        self.max_hours = max_hours
+        self.hours = {}          # hour -> {column: SpaceSaving}
+        self.rows_seen = 0
+
+    def clear(self):
+        self.hours.clear()
+        self.rows_seen = 0
+
+    def update(self, rows: pd.DataFrame):
+        self.rows_seen += len(rows)
+        if rows.empty:
+            return
+        hour = parse_timestamps(rows["timestamp"]).dt.floor("1h")
+        for h, idx in hour.groupby(hour, sort=True).groups.items():
+            part = rows.loc[idx]
+            bucket = self.hours.setdefault(h, {})
+            for col in self.columns:
+                if col not in part.columns:
+                    continue
+                counts = _present(part[col]).value_counts()
+                summary = SpaceSaving.from_counts(counts, self.capacity)
+                if col in bucket:
+                    bucket[col].merge(summary)
+                else:
+                    bucket[col] = summary
+        for h in sorted(self.hours)[:max(0, len(self.hours) - self.max_hours)]:
+            del self.hours[h]
+
+    def top(self, column: str, start, end, n: int = 10, time_index=None) -> pd.DataFrame:
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        full_lo, full_hi = start.ceil("1h"), (end + pd.Timedelta(1, unit="ns")).floor("1h")
+        merged = SpaceSaving(self.capacity)
+        if time_index is None:
+            full_lo, full_hi = start.floor("1h"), end.floor("1h") + pd.Timedelta(hours=1)
+        for h, bucket in self.hours.items():
+            if full_lo <= h < full_hi and column in bucket:
+                merged.merge(bucket[column])
+        if time_index is not None:
+            edges = [(start, end)] if full_lo >= full_hi else [(start, full_lo - pd.Timedelta(1, unit="ns")),
+                                                               (full_hi, end)]
+            for lo, hi in edges:
+                if lo <= hi:
+                    rows = time_index.slice(lo, hi)
+                    if len(rows) and column in rows.columns:
+                        merged.merge(SpaceSaving.from_counts(_present(rows[column]).value_counts(), self.capacity))
+        out = merged.top(n).rename(columns={"value": column})
+        out.attrs["floor"] = merged.floor
+        return out
+
+    def answer(self, intent: dict, time_index=None):
+        """top_* chat ops without filters; None when the op needs another path."""
+        op = intent.get("op")
+        col = {"top_ips": "src_ip", "top_users": "user" if self.log_type == "ssh" else "username",
+               "top_passwords": "password"}.get(op)
+        if col not in self.columns or any(intent.get(k) for k in ("event", "status", "action", "eventid",
+                                                                  "username", "password")):
+            return None
+        return self.top(col, intent["start"], intent["end"], int(intent.get("limit") or 10), time_index)
+
+def _present(s: pd.Series) -> pd.Series:
+    s = s.dropna()
+    if s.dtype == object or isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(s.dtype):
+        s = s.astype(str)
+        s = s[s != ""]
+    return s
@@ -1,30 +1,428 @@
-import os, json
+import os, json, bisect, socket, sqlite3, threading, ipaddress
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked atomic renames
+    fcntl = None
+
 BLOCKLIST_PATH = os.environ.get("BLOCKLIST_PATH", "blocklist.json")
 
+@contextmanager
+def _file_lock(path: str):
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+def _v4_entry(entry) -> bytes:
+    """Packed address + prefix length for 'a.b.c.d[/n]', or 5 zero bytes with len 255 if invalid."""
+    addr, _, plen = str(entry).strip().partition("/")
+    try:
+        n = int(plen) if plen else 32
+        if 0 <= n <= 32:
+            return socket.inet_pton(socket.AF_INET, addr) + bytes((n,))
+    except (OSError, ValueError):
+        pass
+    return b"\0\0\0\0\xff"
+
+def _parse_v4(values):
+    """Dotted-quad[/len] parsing -> (valid mask, uint64 addresses, prefix lengths)."""
+    buf = np.frombuffer(b"".join(map(_v4_entry, values)), dtype=np.dtype([("addr", ">u4"), ("plen", "u1")]))
+    plen = buf["plen"].astype(np.uint64)
+    valid = plen <= 32
+    return valid, buf["addr"].astype(np.uint64), np.where(valid, plen, 32).astype(np.uint64)
+
+def _merge_ranges(starts: np.ndarray, ends: np.ndarray):
+    """Sort and merge overlapping or adjacent [start, end] ranges."""
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    new = np.ones(len(starts), dtype=bool)
+    new[1:] = starts[1:] > reach[:-1] + 1
+    group = np.cumsum(new) - 1
+    merged_ends = np.zeros(group[-1] + 1, dtype=ends.dtype)
+    np.maximum.at(merged_ends, group, ends)
+    return starts[new], merged_ends
+
+class CidrIndex:
+    """Sorted, merged address ranges for IPs and CIDRs from the blocklist.
+
+    IPv4 lookups are a vectorized searchsorted over range starts; IPv6 (rare
+    here) falls back to bisect over Python ints.
+    """
+
+    def __init__(self, entries):
+        values = pd.Series(list(entries), dtype=object).astype(str).str.strip()
+        valid, addr, plen = _parse_v4(values.to_numpy())
+        host = (np.uint64(1) << (np.uint64(32) - plen[valid])) - np.uint64(1)
+        starts = addr[valid] & ~host & np.uint64(0xFFFFFFFF)
+        self.v4_starts, self.v4_ends = _merge_ranges(starts, starts | host)
+        v6 = []
+        for entry in values[~valid]:
+            try:
+                net = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                continue
+            if net.version == 6:
+                v6.append((int(net.network_address), int(net.broadcast_address)))
+        v6.sort()
+        self.v6_starts, self.v6_ends = [], []
+        for a, b in v6:
+            if self.v6_ends and a <= self.v6_ends[-1] + 1:
+                self.v6_ends[-1] = max(self.v6_ends[-1], b)
+            else:
+                self.v6_starts.append(a)
+                self.v6_ends.append(b)
+
+    def __len__(self):
+        return len(self.v4_starts) + len(self.v6_starts)
+
+    def contains(self, ips) -> np.ndarray:
+        values = pd.Series(ips, dtype=object).astype(str)
+        valid, addr, plen = _parse_v4(values.to_numpy())
+        valid &= plen == 32
+        hit = np.zeros(len(values), dtype=bool)
+        if len(self.v4_starts):
+            idx = np.searchsorted(self.v4_starts, addr, side="right") - 1
+            hit = valid & (idx >= 0) & (addr <= self.v4_ends[np.clip(idx, 0, None)])
+        if self.v6_starts:
+            for i in np.flatnonzero(~valid):
+                try:
+                    a = ipaddress.ip_address(values.iat[i])
+                except ValueError:
+                    continue
+                if a.version == 6:
+                    j = bisect.bisect_right(self.v6_starts, int(a)) - 1
+                    hit[i] = j >= 0 and int(a) <= self.v6_ends[j]
+        return hit
+
+    def prefixes(self) -> list:
+        """Minimal list of CIDR prefixes covering exactly the indexed ranges."""
+        out = []
+        for a, b in zip(self.v4_starts.tolist(), self.v4_ends.tolist()):
+            out.extend(ipaddress.summarize_address_range(ipaddress.IPv4Address(a), ipaddress.IPv4Address(b)))
+        for a, b in zip(self.v6_starts, self.v6_ends):
+            out.extend(ipaddress.summarize_address_range(ipaddress.IPv6Address(a), ipaddress.IPv6Address(b)))
+        return [str(n.network_address) if n.prefixlen == n.max_prefixlen else str(n) for n in out]
+
+def aggregate_blocklist(entries) -> list:
+    return CidrIndex(entries).prefixes()
+
+def _entry(net) -> str:
+    return str(net.network_address) if net.prefixlen == net.max_prefixlen else str(net)
+
+def _v4_ranges(values):
+    valid, addr, plen = _parse_v4(values)
+    host = (np.uint64(1) << (np.uint64(32) - plen)) - np.uint64(1)
+    starts = addr & ~host & np.uint64(0xFFFFFFFF)
+    return valid, starts, starts | host
+
+def _is_blocked(entries, values) -> np.ndarray:
+    """Whether any address of each IP/prefix in `values` is covered by `entries`."""
+    index, entries = CidrIndex(entries), set(entries)
+    hit = np.array([v in entries for v in values], dtype=bool) | index.contains(values)
+    valid, starts, ends = _v4_ranges(np.array(values, dtype=object))
+    if len(index.v4_starts):
+        idx = np.searchsorted(index.v4_starts, ends, side="right") - 1
+        hit |= valid & (idx >= 0) & (index.v4_ends[np.clip(idx, 0, None)] >= starts)
+    return hit
+
+def subtract_blocklist(entries, remove) -> tuple:
+    """(entries with every address in `remove` carved out, how many of `remove` are no longer blocked).
+
+    A stored CIDR that covers a removed address or prefix is split into the
+    prefixes that remain; entries that don't overlap anything removed are
+    kept as they are.
+    """
+    entries = [str(e) for e in entries]
+    remove = [str(r).strip() for r in remove]
+    if not remove:
+        return set(entries), 0
+    cuts = []
+    for r in remove:
+        try:
+            cuts.append(ipaddress.ip_network(r, strict=False))
+        except ValueError:
+            pass
+    # only entries overlapping a removed IPv4 range (or that aren't IPv4) need splitting
+    values = np.array(entries, dtype=object)
+    valid, starts, ends = _v4_ranges(values)
+    cut_valid, cut_starts, cut_ends = _v4_ranges(np.array(remove, dtype=object))
+    overlap = ~valid
+    for a, b in zip(cut_starts[cut_valid], cut_ends[cut_valid]):
+        overlap |= (starts <= b) & (ends >= a)
+    drop = set(remove)
+    out = {e for e, o in zip(entries, overlap) if not o and e not in drop}
+    for entry in values[overlap]:
+        if entry in drop:
+            continue
+        try:
+            nets = [ipaddress.ip_network(entry.strip(), strict=False)]
+        except ValueError:
+            out.add(entry)
+            continue
+        changed = False
+        for cut in cuts:
+            kept = []
+            for net in nets:
+                if net.version != cut.version or not net.overlaps(cut):
+                    kept.append(net)
+                elif not net.subnet_of(cut):
+                    kept.extend(net.address_exclude(cut))
+            changed |= kept != nets
+            nets = kept
+        out.update(map(_entry, nets) if changed else [entry])
+    unblocked = int((_is_blocked(entries, remove) & ~_is_blocked(out, remove)).sum())
+    return out, unblocked
+
+class JsonBlocklist:
+    """blocklist.json with a cached set that is reloaded only when the file changes.
+
+    Writes take an exclusive lock, re-read the current file, apply the change
+    and replace the file atomically, so concurrent sessions don't lose updates.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._version = None
+        self._ips = frozenset()
+        self._lock = threading.Lock()
+
+    def _file_version(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def load(self) -> frozenset:
+        with self._lock:
+            version = self._file_version()
+            if version != self._version:
+                if version is None:
+                    self._ips = frozenset()
+                else:
+                    with open(self.path, "r") as f:
+                        self._ips = frozenset(json.load(f))
+                self._version = version
+            return self._ips
+
+    def _write(self, ips):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(sorted(ips), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        with self._lock:
+            self._ips, self._version = frozenset(ips), self._file_version()
+
+    def _update(self, add=(), remove=()) -> int:
+        """Apply the change; returns the entries added, or the addresses unblocked when removing."""
+        with _file_lock(self.path):
+            current = self.load()
+            new, unblocked = subtract_blocklist(current | set(add), remove)
+            if new != current:
+                self._write(new)
+            return unblocked if remove else len(new) - len(current)
+
+    def replace(self, ips):
+        with _file_lock(self.path):
+            self._write(set(ips))
+
+    def count(self) -> int:
+        return len(self.load())
+
+    def index(self) -> CidrIndex:
+        ips = self.load()
+        if getattr(self, "_index_for", None) is not ips:
+            self._index, self._index_for = CidrIndex(ips), ips
+        return self._index
+
+    def contains(self, ips) -> set:
+        """Addresses in `ips` covered by the blocklist, with the same CIDR matching as blocked_mask."""
+        ips = [str(ip) for ip in ips]
+        return {ip for ip, hit in zip(ips, self.index().contains(ips)) if hit}
+
+    def block_many(self, ips) -> int:
+        return self._update(add=ips)
+
+    def unblock_many(self, ips) -> int:
+        return self._update(remove=ips)
+
+class SqliteBlocklist:
+    """Blocklist in an embedded SQLite table, for lists too large to rewrite as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._version = None
+        self._ips = frozenset()
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS blocklist (ip TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    @contextmanager
+    def _connect(self):
+        """Connection for one transaction: committed (or rolled back) and closed on exit."""
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _data_version(self, con):
+        return con.execute("PRAGMA user_version").fetchone()[0]
+
+    def load(self) -> frozenset:
+        with self._lock, self._connect() as con:
+            version = self._data_version(con)
+            if version != self._version:
+                self._ips = frozenset(r[0] for r in con.execute("SELECT ip FROM blocklist"))
+                self._version = version
+            return self._ips
+
+    def _bump(self, con):
+        con.execute(f"PRAGMA user_version = {self._data_version(con) + 1}")
+
+    def block_many(self, ips) -> int:
+        with self._connect() as con:
+            n = con.executemany("INSERT OR IGNORE INTO blocklist(ip) VALUES (?)", ((str(ip),) for ip in ips)).rowcount
+            if n:
+                self._bump(con)
+        return max(n, 0)
+
+    def unblock_many(self, ips) -> int:
+        with self._connect() as con:
+            current = {r[0] for r in con.execute("SELECT ip FROM blocklist")}
+            new, unblocked = subtract_blocklist(current, ips)
+            if new != current:
+                con.executemany("DELETE FROM blocklist WHERE ip = ?", ((ip,) for ip in current - new))
+                con.executemany("INSERT OR IGNORE INTO blocklist(ip) VALUES (?)", ((ip,) for ip in new - current))
+                self._bump(con)
+        return unblocked
+
+    def index(self) -> CidrIndex:
+        ips = self.load()
+        if getattr(self, "_index_for", None) is not ips:
+            self._index, self._index_for = CidrIndex(ips), ips
+        return self._index
+
+    def count(self) -> int:
+        with self._connect() as con:
+            return con.execute("SELECT COUNT(*) FROM blocklist").fetchone()[0]
+
+    def contains(self, ips) -> set:
+        """Addresses in `ips` covered by the blocklist, with the same CIDR matching as blocked_mask."""
+        ips = [str(ip) for ip in ips]
+        return {ip for ip, hit in zip(ips, self.index().contains(ips)) if hit}
+
+    def replace(self, ips):
+        with self._connect() as con:
+            con.execute("DELETE FROM blocklist")
+            con.executemany("INSERT OR IGNORE INTO blocklist(ip) VALUES (?)", ((str(ip),) for ip in ips))
+            self._bump(con)
+
+_BACKENDS = {}
+
+def get_blocklist(path: str = None):
+    path = path or BLOCKLIST_PATH
+    if path not in _BACKENDS:
+        if path.endswith((".db", ".sqlite", ".sqlite3")):
+            _BACKENDS[path] = SqliteBlocklist(path)
+        else:
+            _BACKENDS[path] = JsonBlocklist(path)
+    return _BACKENDS[path]
+
 def load_blocklist():
-    if os.path.exists(BLOCKLIST_PATH):
-        with open(BLOCKLIST_PATH, "r") as f:
-            return set(json.load(f))
-    return set()
+    return get_blocklist().load()
 
 def save_blocklist(blocked_ips):
-    with open(BLOCKLIST_PATH, "w") as f:
-        json.dump(sorted(list(blocked_ips)), f)
+    get_blocklist().replace(blocked_ips)
 
 def block_ip(ip: str):
-    ips = load_blocklist()
-    ips.add(ip)
-    save_blocklist(list(ips))
+    get_blocklist().block_many([ip])
+
+def unblock_ip(ip: str) -> bool:
+    """Unblock one address or prefix, splitting any stored CIDR that covers it; True if it was blocked."""
+    return get_blocklist().unblock_many([ip]) > 0
+
+def block_many(ips) -> int:
+    return get_blocklist().block_many(ips)
+
+def unblock_many(ips) -> int:
+    return get_blocklist().unblock_many(ips)
+
+def compact_blocklist() -> int:
+    """Collapse stored IPs/CIDRs into the minimal covering prefixes; returns the new entry count."""
+    prefixes = aggregate_blocklist(load_blocklist())
+    save_blocklist(prefixes)
+    return len(prefixes)
+
+def blocked_mask(ips, blocked=None) -> np.ndarray:
+    """Boolean mask of addresses covered by the blocklist (exact IPs or CIDRs)."""
+    index = get_blocklist().index() if blocked is None else CidrIndex(blocked)
+    if isinstance(getattr(ips, "dtype", None), pd.CategoricalDtype):
+        # match each distinct address once, then broadcast through the codes
+        ips = pd.Series(ips)
+        codes = ips.cat.codes.to_numpy()
+        hit = index.contains(ips.cat.categories.to_numpy())
+        return (codes >= 0) & hit[codes]
+    return index.contains(ips)
+
+def filter_blocked(df: pd.DataFrame, blocked=None, column: str = "src_ip") -> pd.DataFrame:
+    if df.empty:
+        return df.copy()
+    return df.loc[~blocked_mask(df[column], blocked)].copy()
+
+def _utc_ns(ts) -> int:
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.as_unit("ns").value
+
+class TimeIndex:
+    """Log rows sorted once by timestamp; time windows are O(log n) slices.
+
+    slice() returns positional views of the sorted frame, not copies.
+    """
+
+    def __init__(self, logs: pd.DataFrame):
+        ts = pd.to_datetime(logs["timestamp"], utc=True)
+        if not ts.is_monotonic_increasing:
+            order = np.argsort(ts.to_numpy(), kind="stable")
+            logs, ts = logs.iloc[order], ts.iloc[order]
+        if logs["timestamp"].dtype != ts.dtype:
+            logs = logs.assign(timestamp=ts)
+        self.logs = logs.reset_index(drop=True)
+        self._ns = ts.dt.tz_localize(None).to_numpy().astype("datetime64[ns]").view("i8")
 
+    def __len__(self):
+        return len(self.logs)
 
-def unblock_ip(ip: str):
-    bl = load_blocklist()
-    bl = [x for x in bl if x != ip]
-    save_blocklist(bl)
+    def bounds(self, start, end) -> tuple:
+        i = int(np.searchsorted(self._ns, _utc_ns(start), side="left")) if start is not None else 0
+        j = int(np.searchsorted(self._ns, _utc_ns(end), side="right")) if end is not None else len(self._ns)
+        return i, max(i, j)
 
+    def slice(self, start, end) -> pd.DataFrame:
+        i, j = self.bounds(start, end)
+        return self.logs.iloc[i:j]
 
-def filter_by_time(df: pd.DataFrame, start, end):
-    mask = (df["timestamp"] >= start) & (df["timestamp"] <= end)
-    return df.loc[mask].copy()
+def filter_by_time(df, start, end):
+    if isinstance(df, TimeIndex):
+        return df.slice(start, end)
+    if df["timestamp"].is_monotonic_increasing:
+        ts = df["timestamp"]
+        return df.iloc[ts.searchsorted(pd.Timestamp(start), side="left"):ts.searchsorted(pd.Timestamp(end), side="right")]
+    return TimeIndex(df).slice(start, end)
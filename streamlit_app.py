@@ -2,14 +2,20 @@ import os
 import pandas as pd
 import streamlit as st
 from datetime import datetime, timezone
-from detector import run_detection
-from chat import intent_to_filter, intent_to_query
-from storage import load_blocklist, block_ip, filter_by_time, unblock_ip
-from forecast import build_series, simple_linear_forecast
-import altair as alt
-from pathlib import Path
-import json
-import csv
+from detector import run_detection, load_logs, SlidingWindowEngine
+from storage import get_blocklist, block_ip, block_many, compact_blocklist, filter_blocked, filter_by_time, unblock_ip, TimeIndex
+from forecast import build_series, HoltForecaster
+from ingest import tail_cowrie, COWRIE_JSON, COWRIE_CSV, COWRIE_SESSIONS_CSV
+from sessions import load_sessions, session_incidents
+from logstore import store_path
+from cache import ResultCache, file_fingerprint
+from models import ModelRegistry
+from rollups import LogRollup
+from sketches import HeavyHitters
+from tracing import TRACER
+import time, json
+from correlate import Correlator
+from daemon import DAEMON_OUT, output_path, read_latest
 
 
 st.set_page_config(page_title="Shai.pro DataThon", layout="wide")
@@ -30,76 +36,151 @@ else:
     DATA_PATH = "data/cowrie_logs.csv"
     log_type = "cowrie"
 
-st.sidebar.write("CSV logs path:", DATA_PATH)
+if store_path(log_type).is_dir():
+    DATA_PATH = str(store_path(log_type))
+
+st.sidebar.write("Logs path:", DATA_PATH)
+TRACER.enable(st.sidebar.checkbox("Debug: trace pipeline stages", value=TRACER.enabled))
+render_started = time.time()
 window_minutes = st.sidebar.slider("Rolling window (minutes)", 1, 15, 5)
 fail_threshold = st.sidebar.slider("Fail threshold (rule)", 3, 50, 10)
 contamination = st.sidebar.slider("IF contamination", 0.01, 0.2, 0.02, step=0.01)
 
+def still_blocked(ip: str) -> bool:
+    # unblock_ip splits a covering CIDR around the address; check nothing matches it any more
+    return bool(get_blocklist().contains([ip])) or ip in get_blocklist().load()
+
+def sidebar_unblock(ip: str):
+    unblock_ip(ip)
+    if still_blocked(ip):
+        st.sidebar.error(f"IP {ip} is still blocked.")
+    else:
+        st.sidebar.success(f"IP {ip} removed from blocklist. Refresh to update.")
+
 st.sidebar.markdown("---")
 st.sidebar.write("**Blocklist**")
-blocked = sorted(load_blocklist())
-if blocked:
+blocked_count = get_blocklist().count()
+if blocked_count > 500:
+    st.sidebar.write(f"{blocked_count} blocked addresses")
+    ip_to_unblock = st.sidebar.text_input("Unblock IP").strip()
+    if st.sidebar.button("✅ Unblock IP"):
+        if ip_to_unblock:
+            sidebar_unblock(ip_to_unblock)
+elif blocked_count:
+    blocked = sorted(get_blocklist().load())
     st.sidebar.code("\n".join(blocked))
     ip_to_unblock = st.sidebar.selectbox("Unblock IP", [""] + blocked)
     if st.sidebar.button("✅ Unblock IP"):
         if ip_to_unblock:
-            unblock_ip(ip_to_unblock)
-            st.sidebar.success(f"IP {ip_to_unblock} removed from blocklist. Refresh to update.")
+            sidebar_unblock(ip_to_unblock)
 else:
     st.sidebar.code("(empty)")
-def sync_cowrie_to_csv():
-    cowrie_json = Path("cowrie_logs/log/cowrie/cowrie.json")
-    out_csv = Path("data/cowrie_logs.csv")
-    fields = ["timestamp", "src_ip", "dst_port", "eventid", "username", "password"]
-
-    if not cowrie_json.exists():
-        return
-
-    if not out_csv.exists():
-        out_csv.parent.mkdir(parents=True, exist_ok=True)
-        with out_csv.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fields)
-            writer.writeheader()
-
-    with cowrie_json.open("r", encoding="utf-8") as f, \
-         out_csv.open("w", newline="", encoding="utf-8") as fout:
-        writer = csv.DictWriter(fout, fieldnames=fields)
-        writer.writeheader()
-        for line in f:
-            try:
-                ev = json.loads(line)
-                writer.writerow({
-                    "timestamp": ev.get("timestamp"),
-                    "src_ip": ev.get("src_ip"),
-                    "dst_port": ev.get("dst_port"),
-                    "eventid": ev.get("eventid"),
-                    "username": ev.get("username"),
-                    "password": ev.get("password"),
-                })
-            except Exception:
-                continue
+if blocked_count and st.sidebar.button("Collapse into CIDR prefixes"):
+    st.sidebar.success(f"Blocklist compacted to {compact_blocklist()} entries. Refresh to update.")
+# With daemon.py running, detection, cowrie ingest and blocking happen there;
+# the dashboard only reads its latest output.
+daemon_view = read_latest(log_type)
+daemon_ingests_cowrie = output_path("incidents", "cowrie").exists()
+# in viewer mode the summaries are rebuilt whenever the daemon has appended to the CSV
+hh_key = file_fingerprint(COWRIE_CSV) if daemon_ingests_cowrie and COWRIE_CSV.exists() else None
+
+@st.cache_resource(max_entries=1)
+def cowrie_heavy_hitters(_version=None):
+    # seeded once from the CSV; every later ingest chunk is fed by tail_cowrie
+    hh = HeavyHitters("cowrie")
+    if COWRIE_CSV.exists():
+        hh.update(load_logs(str(COWRIE_CSV), log_type="cowrie"))
+    return hh
 
-sync_cowrie_to_csv()
-if log_type == "cowrie":
-    logs = pd.read_csv("data/cowrie_logs.csv")
-    logs["timestamp"] = pd.to_datetime(logs["timestamp"], utc=True)
+def sync_cowrie_to_csv():
+    store = store_path("cowrie")
+    return tail_cowrie(COWRIE_JSON, COWRIE_CSV, store=store if store.is_dir() else None,
+                       sessions_csv=COWRIE_SESSIONS_CSV, heavy_hitters=cowrie_heavy_hitters(hh_key))
+
+ingest_stats = None if daemon_ingests_cowrie else sync_cowrie_to_csv()
+if daemon_view is not None:
+    logs = load_logs(DATA_PATH, log_type=log_type)
+    findings, incidents, written_at = daemon_view
+    if log_type == "cowrie":
+        sessions = load_sessions(COWRIE_SESSIONS_CSV)
+    st.sidebar.caption(f"Read-only view of {DAEMON_OUT}/, last detection at {written_at:%Y-%m-%d %H:%M:%S} UTC "
+                       "(detection parameters come from daemon.py, not the sliders)")
+elif log_type == "cowrie":
+    if ingest_stats and (ingest_stats["lines"] or ingest_stats["event_lag_sec"] is not None):
+        lag = ingest_stats["event_lag_sec"]
+        st.sidebar.caption(
+            f"Cowrie ingest: +{ingest_stats['lines']} events, "
+            f"{ingest_stats['lines_per_sec']:.0f} ev/s, "
+            f"{ingest_stats['bytes_behind']} B behind"
+            + (f", last event {lag:.0f}s ago" if lag is not None else "")
+        )
+    logs = load_logs(DATA_PATH, log_type="cowrie")
     findings = pd.DataFrame()
-    incidents = (logs.groupby("src_ip")
-                      .size()
-                      .reset_index(name="events")
-                      .sort_values("events", ascending=False)
-                      .head(50))
+    sessions = load_sessions(COWRIE_SESSIONS_CSV)
+    incidents = session_incidents(sessions, top_k=50)
 else:
+    @st.cache_resource
+    def feature_engine(path: str):
+        return SlidingWindowEngine()
+
+    @st.cache_resource
+    def detection_cache():
+        return ResultCache(max_entries=64, disk_dir=os.environ.get("DETECTION_CACHE_DIR"))
+
+    @st.cache_resource
+    def model_registry():
+        return ModelRegistry().start()
+
     logs, findings, incidents = run_detection(
-        DATA_PATH, window_minutes, fail_threshold, contamination, log_type=log_type
+        DATA_PATH, window_minutes, fail_threshold, contamination, log_type=log_type,
+        engine=feature_engine(DATA_PATH) if log_type == "ssh" else None,
+        cache=detection_cache(),
+        registry=model_registry()
     )
 
 
-incidents_view = incidents[~incidents["src_ip"].isin(blocked)].copy()
-if "severity" in incidents_view.columns:
+@st.cache_resource(max_entries=3)
+def time_index(_logs, path: str, fingerprint: tuple):
+    return TimeIndex(_logs)
+
+logs_ix = time_index(logs, DATA_PATH, file_fingerprint(DATA_PATH)) if os.path.exists(DATA_PATH) else TimeIndex(logs)
+
+@st.cache_resource
+def rollup_for(path: str, log_type: str):
+    return LogRollup(log_type)
+
+log_rollup = rollup_for(DATA_PATH, log_type)
+
+@st.cache_resource
+def ip_forecaster(path: str):
+    return HoltForecaster(season_minutes=1440)
+if os.path.exists(DATA_PATH):
+    log_rollup.sync(DATA_PATH, logs)
+else:
+    log_rollup.reset()
+    log_rollup.update(logs)
+
+def _source_path(log_type: str, csv_path: str) -> str:
+    return str(store_path(log_type)) if store_path(log_type).is_dir() else csv_path
+
+def correlation_inputs() -> tuple:
+    """(path, fingerprint) for firewall and cowrie; a changed file yields a new cache key."""
+    out = []
+    for lt, csv_path in (("firewall", "data/firewall_logs.csv"), ("cowrie", str(COWRIE_CSV))):
+        path = _source_path(lt, csv_path)
+        out += [path, file_fingerprint(path) if os.path.exists(path) else None]
+    return tuple(out)
+
+@st.cache_resource(max_entries=2)
+def cross_source_correlator(fw_path: str, fw_fingerprint, cw_path: str, cw_fingerprint) -> Correlator:
+    fw = load_logs(fw_path, log_type="firewall") if fw_fingerprint else None
+    cw = load_logs(cw_path, log_type="cowrie") if cw_fingerprint else None
+    return Correlator(fw, cw)
+
+incidents_view = filter_blocked(incidents)
+if daemon_view is None and "severity" in incidents_view.columns:
     high_risk_ips = incidents_view[incidents_view["severity"] == "High"]["src_ip"].unique()
-    for ip in high_risk_ips:
-        block_ip(ip)
+    block_many(high_risk_ips)
 tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "💬 Chat", "⚙️ Incidents"])
 
 with tab1:
@@ -132,9 +213,10 @@ with tab1:
                 use_container_width=True
             )
 
+            import altair as alt
             st.markdown("**Anomaly timeline (fails/min & anomalies)**")
+            series_df = build_series(findings, window_minutes).sort_values("minute")
             if not findings.empty:
-                series_df = build_series(findings, window_minutes).sort_values("minute")
                 line = (
                     alt.Chart(series_df)
                     .mark_line()
@@ -163,7 +245,8 @@ with tab1:
 
             st.markdown("**Forecast (next 60 min)**")
             if not findings.empty:
-                fdf = simple_linear_forecast(build_series(findings, window_minutes), horizon_minutes=60)
+                forecaster = ip_forecaster(DATA_PATH).update(findings[["src_ip", "minute", "fails"]])
+                fdf = forecaster.total_forecast(60)
                 if not fdf.empty:
                     forecast_chart = (
                         alt.Chart(fdf.sort_values("minute"))
@@ -176,6 +259,8 @@ with tab1:
                         .properties(height=160, width="container")
                     )
                     st.altair_chart(forecast_chart, use_container_width=True)
+                    st.caption("Top forecast attackers (fails, next 60 min)")
+                    st.dataframe(forecaster.top(5, 60), use_container_width=True)
                 else:
                     st.caption("Недостаточно данных для прогноза.")
         with col2:
@@ -187,60 +272,60 @@ with tab1:
                     st.success(f"IP {ip_to_block} added to blocklist (simulation). Refresh to update views.")
             st.caption("Blocking is simulated: the IP disappears from tables but no real firewall changes are made.")
 
-            fw_path = "data/firewall_logs.csv"
-            if os.path.exists(fw_path):
-                try:
-                    fw = pd.read_csv(fw_path)
-                    fw["timestamp"] = pd.to_datetime(fw["timestamp"], utc=True)
-                    fw_denies = fw[fw["action"].astype(str).str.lower() == "deny"]
-                    fw_counts = fw_denies.groupby("src_ip").size().reset_index(name="fw_denies")
-                    corr = incidents_view.merge(fw_counts, on="src_ip", how="left").fillna({"fw_denies":0})
-                    corr["corr_boosted_severity"] = corr.apply(
-                        lambda r: "High" if (r.get("severity","Low") in ["Medium","High"] and r["fw_denies"]>0) else r.get("severity","Low"),
-                        axis=1
-                    )
-                    st.subheader("Cross-source correlation (SSH × Firewall)")
-                    st.dataframe(corr[["src_ip","risk","severity","fw_denies","corr_boosted_severity"]], use_container_width=True)
-                except Exception as e:
-                    st.caption(f"Correlation skipped: {e}")
+            corr_window = st.slider("Correlation window (± minutes)", 1, 240, 15, key="corr_window")
+            try:
+                correlator = cross_source_correlator(*correlation_inputs())
+                if correlator.firewall is not None or correlator.cowrie is not None:
+                    corr = correlator.correlate(incidents_view, findings,
+                                                before=f"{corr_window}min", after=f"{corr_window}min")
+                    st.subheader("Cross-source correlation (SSH × Firewall × Cowrie)")
+                    st.dataframe(corr[["src_ip","risk","severity","fw_denies","cowrie_events",
+                                       "fw_last_seen","corr_boosted_severity"]], use_container_width=True)
+            except Exception as e:
+                st.caption(f"Correlation skipped: {e}")
     elif log_type == "firewall":
         st.subheader("Firewall Events Overview")
         st.dataframe(logs.head(50), use_container_width=True)
 
         blocked = logs[logs.get("action","").astype(str).str.lower() == "deny"]
         if not blocked.empty:
-            top_blocked = blocked["src_ip"].value_counts().head(5).reset_index()
+            top_blocked = blocked["src_ip"].astype(str).value_counts().head(5).reset_index()
             top_blocked.columns = ["src_ip","denies"]
             st.write("Топ IP по блокировкам:")
             st.bar_chart(top_blocked.set_index("src_ip"))
         else:
             st.info("Нет deny-событий в текущем файле.")
+
+        scans = findings[findings["is_suspicious"]] if not findings.empty else findings
+        if not scans.empty:
+            st.write(f"Scan findings (distinct ports / hosts per {window_minutes} min, HyperLogLog estimates):")
+            st.dataframe(scans.sort_values("timestamp", ascending=False)
+                              [["timestamp","src_ip",f"r{window_minutes}m_ports",f"r{window_minutes}m_dst_ips",
+                                f"r{window_minutes}m_denies","rule_portscan","rule_hostscan","if_score"]]
+                              .head(50), use_container_width=True)
     elif log_type == "cowrie":
         st.subheader("Cowrie Honeypot Overview")
-        st.dataframe(logs.head(50), use_container_width=True)
+        st.caption(f"{len(sessions)} completed sessions")
+        st.dataframe(sessions.tail(50).iloc[::-1], use_container_width=True)
 
+        hh = cowrie_heavy_hitters(hh_key)
+        span = (logs_ix.logs["timestamp"].iloc[0], logs_ix.logs["timestamp"].iloc[-1]) if len(logs_ix) else None
         col_a, col_b, col_c = st.columns(3)
         with col_a:
-            st.markdown("**Top source IPs**")
-            top_ips = logs["src_ip"].value_counts().head(10).reset_index()
-            top_ips.columns = ["src_ip","events"]
-            st.dataframe(top_ips, use_container_width=True)
-        with col_b:
-            st.markdown("**Top usernames**")
-            if "username" in logs.columns:
-                top_users = logs["username"].dropna().astype(str).value_counts().head(10).reset_index()
-                top_users.columns = ["username","events"]
-                st.dataframe(top_users, use_container_width=True)
-            else:
-                st.caption("Нет колонки username")
-        with col_c:
-            st.markdown("**Top passwords**")
-            if "password" in logs.columns:
-                top_pw = logs["password"].dropna().astype(str).value_counts().head(10).reset_index()
-                top_pw.columns = ["password","events"]
-                st.dataframe(top_pw, use_container_width=True)
-            else:
-                st.caption("Нет колонки password")
+            st.markdown("**Top source IPs (login attempts)**")
+            # a daemon snapshot written before the rename still has distinct_passwords
+            cols = [c for c in ("src_ip", "sessions", "attempts", "password_attempts") if c in incidents.columns]
+            st.dataframe(incidents[cols].head(10),
+                         use_container_width=True)
+        for col, column, title in ((col_b, "username", "Top usernames"), (col_c, "password", "Top passwords")):
+            with col:
+                st.markdown(f"**{title}**")
+                if span is None:
+                    st.caption("Нет событий")
+                    continue
+                top = hh.top(column, *span, n=10)
+                st.dataframe(top, use_container_width=True)
+                st.caption(f"Sketch counts: true value in [events, events + error]; unlisted values ≤ {top.attrs['floor']}")
 
 with tab2:
     st.subheader("Ask in natural language")
@@ -253,7 +338,7 @@ with tab2:
             if not user_q.strip():
                 st.warning("Введите запрос.")
             else:
-                from chat import intent_to_query  
+                from chat import intent_to_query
                 intent = intent_to_query(user_q, log_type="ssh")  # Gemini-first
                 st.write("Parsed intent:", {
                     "start": intent["start"].isoformat(),
@@ -266,22 +351,6 @@ with tab2:
                     "context": intent.get("context"),
                 })
 
-                logs["timestamp"] = pd.to_datetime(logs["timestamp"], utc=True)
-                sub = logs[(logs["timestamp"] >= intent["start"]) & (logs["timestamp"] <= intent["end"])].copy()
-
-                if intent.get("event") and "event" in sub.columns:
-                    sub = sub[sub["event"] == intent["event"]]
-                if intent.get("status") and "status" in sub.columns:
-                    sub = sub[sub["status"] == intent["status"]]
-
-                if sub.empty:
-                    sub = logs[(logs["timestamp"] >= intent["end"] - pd.Timedelta(days=1)) & (logs["timestamp"] <= intent["end"])].copy()
-                    if intent.get("event") and "event" in sub.columns:
-                        sub = sub[sub["event"] == intent["event"]]
-                    if intent.get("status") and "status" in sub.columns:
-                        sub = sub[sub["status"] == intent["status"]]
-                    st.caption("Ничего не нашли за выбранный период. Показаны данные за последние 24 часа.")
-                
                 if intent["op"] == "block_ip" and intent.get("target"):
                     block_ip(str(intent["target"]))
                     st.success(f"IP {intent['target']} добавлен в блоклист.")
@@ -289,24 +358,43 @@ with tab2:
 
                 if intent["op"] == "unblock_ip" and intent.get("target"):
                     unblock_ip(str(intent["target"]))
-                    st.success(f"IP {intent['target']} удалён из блоклиста.")
+                    if still_blocked(str(intent["target"])):
+                        st.error(f"IP {intent['target']} всё ещё заблокирован.")
+                    else:
+                        st.success(f"IP {intent['target']} удалён из блоклиста.")
                     st.stop()
                 op = intent["op"]; limit = intent["limit"]
-                if sub.empty:
-                    st.info("Нет событий под запрос.")
-                else:
-                    if op == "top_users":
-                        ans = (sub.groupby("user").size().reset_index(name="events")
-                               .sort_values("events", ascending=False).head(limit))
-                        st.write(f"Топ {len(ans)} пользователей:")
-                        st.dataframe(ans, use_container_width=True)
-                    elif op == "top_ips":
-                        ans = (sub.groupby("src_ip").size().reset_index(name="events")
-                               .sort_values("events", ascending=False).head(limit))
-                        st.write(f"Топ {len(ans)} IP-адресов:")
+
+                ans = log_rollup.answer(intent, logs_ix)
+                if ans is not None:
+                    if not (ans if op == "count" else len(ans)):
+                        ans = log_rollup.answer(dict(intent, start=intent["end"] - pd.Timedelta(days=1)), logs_ix)
+                        st.caption("Ничего не нашли за выбранный период. Показаны данные за последние 24 часа.")
+                    if op == "count":
+                        st.write(f"Количество событий: **{ans}**")
+                    elif ans.empty:
+                        st.info("Нет событий под запрос.")
+                    else:
+                        st.write(f"Топ {len(ans)} {'пользователей' if op == 'top_users' else 'IP-адресов'}:")
                         st.dataframe(ans, use_container_width=True)
-                    elif op == "count":
-                        st.write(f"Количество событий: **{len(sub)}**")
+                else:
+                    sub = filter_by_time(logs_ix, intent["start"], intent["end"])
+
+                    if intent.get("event") and "event" in sub.columns:
+                        sub = sub[sub["event"] == intent["event"]]
+                    if intent.get("status") and "status" in sub.columns:
+                        sub = sub[sub["status"] == intent["status"]]
+
+                    if sub.empty:
+                        sub = filter_by_time(logs_ix, intent["end"] - pd.Timedelta(days=1), intent["end"])
+                        if intent.get("event") and "event" in sub.columns:
+                            sub = sub[sub["event"] == intent["event"]]
+                        if intent.get("status") and "status" in sub.columns:
+                            sub = sub[sub["status"] == intent["status"]]
+                        st.caption("Ничего не нашли за выбранный период. Показаны данные за последние 24 часа.")
+
+                    if sub.empty:
+                        st.info("Нет событий под запрос.")
                     else:
                         st.write(f"Найдено {len(sub)} событий (первые 200):")
                         st.dataframe(sub.head(200), use_container_width=True)
@@ -319,6 +407,7 @@ with tab2:
             if not user_q_fw.strip():
                 st.warning("Введите запрос.")
             else:
+                from chat import intent_to_query
                 intent = intent_to_query(user_q_fw, log_type="firewall")
             st.write("Parsed intent:", {
                 "start": intent["start"].isoformat(),
@@ -336,27 +425,30 @@ with tab2:
             if intent["op"] == "unblock_ip" and intent.get("target"):
                 from storage import unblock_ip
                 unblock_ip(str(intent["target"]))
-                st.success(f"IP {intent['target']} удалён из блоклиста.")
+                if still_blocked(str(intent["target"])):
+                    st.error(f"IP {intent['target']} всё ещё заблокирован.")
+                else:
+                    st.success(f"IP {intent['target']} удалён из блоклиста.")
                 st.stop()
 
-            logs["timestamp"] = pd.to_datetime(logs["timestamp"], utc=True)
-            sub = logs[(logs["timestamp"] >= intent["start"]) & (logs["timestamp"] <= intent["end"])].copy()
-
             action = intent.get("action")
-            if action and "action" in sub.columns:
-                sub = sub[sub["action"].astype(str).str.lower() == action.lower()]
-
-            if sub.empty:
-                st.info("Нет событий под запрос.")
-            else:
-                op, limit = intent["op"], intent["limit"]
-                if op == "top_ips":
-                    ans = (sub.groupby("src_ip").size().reset_index(name="events")
-                           .sort_values("events", ascending=False).head(limit))
+            op, limit = intent["op"], intent["limit"]
+            ans = log_rollup.answer(intent, logs_ix)
+            if ans is not None:
+                if op == "count":
+                    st.write(f"Количество событий: **{ans}**")
+                elif ans.empty:
+                    st.info("Нет событий под запрос.")
+                else:
                     st.write(f"Топ {len(ans)} IP (фильтр action: {action or '—'}):")
                     st.dataframe(ans, use_container_width=True)
-                elif op == "count":
-                    st.write(f"Количество событий: **{len(sub)}**")
+            else:
+                sub = filter_by_time(logs_ix, intent["start"], intent["end"])
+                if action and "action" in sub.columns:
+                    sub = sub[sub["action"].astype(str).str.lower() == action.lower()]
+
+                if sub.empty:
+                    st.info("Нет событий под запрос.")
                 else:
                     st.write(f"Найдено {len(sub)} событий (первые 200):")
                     st.dataframe(sub.head(200), use_container_width=True)
@@ -368,6 +460,7 @@ with tab2:
             if not user_q_cw.strip():
                 st.warning("Введите запрос.")
             else:
+                from chat import intent_to_query
                 intent = intent_to_query(user_q_cw, log_type="cowrie")  # Gemini -> fallback
                 st.write("Parsed intent:", {
                     "start": intent["start"].isoformat(),
@@ -380,34 +473,29 @@ with tab2:
                     "context": intent.get("context"),
                 })
 
-                logs["timestamp"] = pd.to_datetime(logs["timestamp"], utc=True)
-                sub = logs[(logs["timestamp"] >= intent["start"]) & (logs["timestamp"] <= intent["end"])].copy()
+                op, limit = intent["op"], intent["limit"]
+                ans = cowrie_heavy_hitters(hh_key).answer(intent, logs_ix)
+                if ans is None:
+                    ans = log_rollup.answer(intent, logs_ix)
+                if ans is not None:
+                    if op == "count":
+                        st.write(f"Количество событий: **{ans}**")
+                    elif ans.empty:
+                        st.info("Нет событий под запрос.")
+                    else:
+                        st.dataframe(ans, use_container_width=True)
+                else:
+                    sub = filter_by_time(logs_ix, intent["start"], intent["end"])
 
-                if intent.get("eventid") and "eventid" in sub.columns:
-                    sub = sub[sub["eventid"].astype(str).str.contains(intent["eventid"], case=False, na=False)]
-                if intent.get("username") and "username" in sub.columns:
-                    sub = sub[sub["username"].astype(str).str.contains(intent["username"], case=False, na=False)]
-                if intent.get("password") and "password" in sub.columns:
-                    sub = sub[sub["password"].astype(str).str.contains(intent["password"], case=False, na=False)]
+                    if intent.get("eventid") and "eventid" in sub.columns:
+                        sub = sub[sub["eventid"].astype(str).str.contains(intent["eventid"], case=False, na=False)]
+                    if intent.get("username") and "username" in sub.columns:
+                        sub = sub[sub["username"].astype(str).str.contains(intent["username"], case=False, na=False)]
+                    if intent.get("password") and "password" in sub.columns:
+                        sub = sub[sub["password"].astype(str).str.contains(intent["password"], case=False, na=False)]
 
-                if sub.empty:
-                    st.info("Нет событий под запрос.")
-                else:
-                    op, limit = intent["op"], intent["limit"]
-                    if op == "top_ips":
-                        ans = sub["src_ip"].value_counts().head(limit).reset_index()
-                        ans.columns = ["src_ip","events"]
-                        st.dataframe(ans, use_container_width=True)
-                    elif op == "top_users" and "username" in sub.columns:
-                        ans = sub["username"].astype(str).value_counts().head(limit).reset_index()
-                        ans.columns = ["username","events"]
-                        st.dataframe(ans, use_container_width=True)
-                    elif op == "top_passwords" and "password" in sub.columns:
-                        ans = sub["password"].astype(str).value_counts().head(limit).reset_index()
-                        ans.columns = ["password","events"]
-                        st.dataframe(ans, use_container_width=True)
-                    elif op == "count":
-                        st.write(f"Количество событий: **{len(sub)}**")
+                    if sub.empty:
+                        st.info("Нет событий под запрос.")
                     else:
                         st.dataframe(sub.head(200), use_container_width=True)
 with tab3:
@@ -425,3 +513,21 @@ with tab3:
 
 st.markdown("---")
 st.caption("MVP demo: rules + Isolation Forest for anomalies, simple NL parsing instead of a full LLM. Replace 'intent_to_filter' with an LLM call for production.")
+
+if TRACER.enabled:
+    spans = [r for r in TRACER.records() if r["start"] >= render_started]
+    with st.expander("Debug: pipeline trace (this render)", expanded=False):
+        if spans:
+            st.dataframe(pd.DataFrame(spans)[["name","parent","seconds","rows_in","rows_out",
+                                              "rss_delta_mb","max_rss_mb","alloc_peak_mb"]],
+                         use_container_width=True)
+        else:
+            st.caption("No stages ran (all results came from caches).")
+        st.download_button("Spans (JSON lines)", "\n".join(json.dumps(r, default=str) for r in spans),
+                           file_name="trace.jsonl")
+        st.download_button("Metrics (Prometheus)", TRACER.prometheus(), file_name="pipeline.prom")
+    trace_dir = os.environ.get("TRACE_DIR")
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+        TRACER.export_jsonl(os.path.join(trace_dir, "trace.jsonl"))
+        TRACER.export_prometheus(os.path.join(trace_dir, "pipeline.prom"))
@@ -0,0 +1,135 @@
+import sys, argparse
+import numpy as np
+import pandas as pd
+
+SCHEMAS = {
+    "ssh": ["timestamp", "src_ip", "user", "event", "status", "port"],
+    "firewall": ["timestamp", "src_ip", "dst_ip", "port", "action"],
+    "cowrie": ["timestamp", "src_ip", "dst_port", "eventid", "username", "password"],
+}
+
+USERS = np.array(["alice", "bob", "carol", "dave", "ops", "deploy", "backup", "git", "svc-ci", "monitor"])
+ATTACK_USERS = np.array(["root", "admin", "test", "oracle", "ubuntu", "user", "pi", "postgres", "guest", "ftp"])
+PASSWORDS = np.array(["123456", "password", "admin", "root", "12345678", "qwerty", "111111", "toor",
+                      "1q2w3e4r", "changeme", "raspberry", "P@ssw0rd", "letmein", "dragon", "abc123"])
+SERVICE_PORTS = np.array([22, 25, 53, 80, 110, 143, 443, 3306, 5432, 8080])
+COWRIE_EVENTS = np.array(["cowrie.session.connect", "cowrie.client.version", "cowrie.client.kex",
+                          "cowrie.command.input", "cowrie.session.closed"])
+
+def _ip_pool(n: int, base: int, rng) -> np.ndarray:
+    """n distinct dotted-quad strings drawn from the /8 starting at `base`."""
+    ints = base + rng.choice(1 << 24, size=n, replace=False).astype(np.int64)
+    return np.array([f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}" for a in ints.tolist()])
+
+def _iso(ns: np.ndarray) -> np.ndarray:
+    return np.char.add(np.datetime_as_string(ns.astype("datetime64[ns]"), unit="s"), "Z")
+
+class LogGenerator:
+    """Seeded synthetic SSH / firewall / cowrie logs: background traffic mixed with
+    brute-force bursts and port/host scans.
+
+    `n_ips` background hosts share most of the volume; `n_attackers` public
+    addresses produce the attack share in short bursts. Rows come out in
+    timestamp order, chunk by chunk, so arbitrarily large files can be written.
+    """
+
+    def __init__(self, log_type: str = "ssh", n_ips: int = 1000, n_attackers: int = None,
+                 attack_share: float = 0.2, scan_share: float = 0.3, seed: int = 0,
+                 start: str = "2025-09-20T00:00:00Z", events_per_sec: float = 50.0):
+        self.log_type = log_type
+        self.rng = np.random.default_rng(seed)
+        self.attack_share = attack_share
+        self.scan_share = scan_share
+        self.events_per_sec = events_per_sec
+        self.t0 = pd.Timestamp(start).value
+        self.hosts = _ip_pool(n_ips, 10 << 24, self.rng)
+        self.attackers = _ip_pool(n_attackers or max(1, n_ips // 50), 185 << 24, self.rng)
+        self.targets = _ip_pool(64, 172 << 24, self.rng)
+        # heavy-tailed activity: a few hosts / attackers account for most events
+        self.host_w = self.rng.pareto(1.2, len(self.hosts)) + 1
+        self.host_w /= self.host_w.sum()
+        self.attacker_w = self.rng.pareto(1.0, len(self.attackers)) + 1
+        self.attacker_w /= self.attacker_w.sum()
+        self.emitted = 0
+
+    def _times(self, n: int, attack: np.ndarray, src: np.ndarray) -> np.ndarray:
+        span = n / self.events_per_sec * 1e9
+        t = self.rng.uniform(0, span, n)
+        # attack events cluster around a per-(chunk, attacker) burst centre
+        burst = self.rng.uniform(0, span, len(self.attackers))
+        a = np.flatnonzero(attack)
+        t[a] = (burst[src[a]] + self.rng.exponential(60e9, len(a))) % span
+        return (self.t0 + self.emitted / self.events_per_sec * 1e9 + t).astype(np.int64)
+
+    def chunk(self, n: int) -> pd.DataFrame:
+        rng = self.rng
+        attack = rng.random(n) < self.attack_share
+        scan = attack & (rng.random(n) < self.scan_share)
+        brute = attack & ~scan
+        src = rng.choice(len(self.hosts), n, p=self.host_w)
+        src[attack] = rng.choice(len(self.attackers), int(attack.sum()), p=self.attacker_w)
+        ts = self._times(n, attack, src)
+        order = np.argsort(ts, kind="stable")
+        ts, attack, scan, brute, src = ts[order], attack[order], scan[order], brute[order], src[order]
+        ip = self.hosts[np.where(attack, 0, src)]
+        ip[attack] = self.attackers[src[attack]]
+        out = {"timestamp": _iso(ts), "src_ip": ip}
+
+        if self.log_type == "ssh":
+            out["user"] = np.where(brute, ATTACK_USERS[rng.integers(0, len(ATTACK_USERS), n)],
+                                   USERS[rng.integers(0, len(USERS), n)])
+            out["event"] = np.where(scan | (rng.random(n) < 0.15), "connect", "auth")
+            fail_p = np.where(brute, 0.995, 0.08)
+            out["status"] = np.where(rng.random(n) < fail_p, "fail", "success")
+            out["port"] = rng.integers(1024, 65536, n)
+        elif self.log_type == "firewall":
+            out["dst_ip"] = self.targets[rng.integers(0, len(self.targets), n)]
+            out["port"] = np.where(scan, rng.integers(1, 65536, n),
+                                   np.where(brute, 22, SERVICE_PORTS[rng.integers(0, len(SERVICE_PORTS), n)]))
+            deny_p = np.where(scan, 0.9, np.where(brute, 0.6, 0.05))
+            out["action"] = np.where(rng.random(n) < deny_p, "deny", "allow")
+        elif self.log_type == "cowrie":
+            out["dst_port"] = np.where(rng.random(n) < 0.7, 22, 2222)
+            login = brute | (~attack & (rng.random(n) < 0.3))
+            success = login & (rng.random(n) < np.where(brute, 0.02, 0.3))
+            out["eventid"] = np.where(login, np.where(success, "cowrie.login.success", "cowrie.login.failed"),
+                                      COWRIE_EVENTS[rng.integers(0, len(COWRIE_EVENTS), n)])
+            out["username"] = np.where(login, ATTACK_USERS[rng.integers(0, len(ATTACK_USERS), n)], "")
+            out["password"] = np.where(login, PASSWORDS[rng.integers(0, len(PASSWORDS), n)], "")
+        else:
+            raise ValueError(f"unknown log type: {self.log_type}")
+        self.emitted += n
+        return pd.DataFrame(out, columns=SCHEMAS[self.log_type])
+
+    def chunks(self, n_events: int, chunk_rows: int = 1_000_000):
+        left = n_events
+        while left > 0:
+            n = min(chunk_rows, left)
+            yield self.chunk(n)
+            left -= n
+
+def generate(log_type: str, n_events: int, **kwargs) -> pd.DataFrame:
+    gen = LogGenerator(log_type, **kwargs)
+    return pd.concat(gen.chunks(n_events), ignore_index=True)
+
+def write_csv(path, log_type: str, n_events: int, chunk_rows: int = 1_000_000, **kwargs) -> int:
+    gen = LogGenerator(log_type, **kwargs)
+    written = 0
+    for i, df in enumerate(gen.chunks(n_events, chunk_rows)):
+        df.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        written += len(df)
+    return written
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write a synthetic log CSV")
+    ap.add_argument("log_type", choices=sorted(SCHEMAS))
+    ap.add_argument("n_events", type=int)
+    ap.add_argument("out_csv")
+    ap.add_argument("--ips", type=int, default=1000)
+    ap.add_argument("--attackers", type=int, default=None)
+    ap.add_argument("--attack-share", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    n = write_csv(args.out_csv, args.log_type, args.n_events, n_ips=args.ips, n_attackers=args.attackers,
+                  attack_share=args.attack_share, seed=args.seed)
+    print(f"{args.out_csv}: {n} {args.log_type} events", file=sys.stderr)
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+import pytest
+import chat
+from benchmarks.stub_model import StubModel
+
+NOW = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+@pytest.fixture
+def stub():
+    model = StubModel(latency_ms=0)
+    chat.use_model(model)
+    chat.INTENT_CACHE.clear()
+    yield model
+    chat.use_model(None)
+    chat.INTENT_CACHE.clear()
+
+@pytest.mark.parametrize("query, op, limit", [
+    ("топ 10 ip с неудачными логинами за день", "top_ips", 10),
+    ("топ 10 ip по неудачным логинам", "top_ips", 10),
+    ("топ 5 айпи по неудачным входам за час", "top_ips", 5),
+    ("топ 5 юзеров с неудачными логинами за час", "top_users", 5),
+    ("топ 3 логинов за час", "top_users", 3),
+    ("самый частый юзер который неудачно логинился за час", "top_users", 1),
+    ("самые частые пароли за день", "top_passwords", 10),
+])
+def test_top_targets(query, op, limit):
+    intent, confidence = chat.parse_local(query, "ssh", now=NOW)
+    assert intent["op"] == op
+    assert intent["limit"] == limit
+    assert confidence >= chat.LOCAL_CONFIDENCE
+
+def test_ip_query_with_login_word_is_an_auth_filter():
+    intent, _ = chat.parse_local("топ 10 ip с неудачными логинами за день", "ssh", now=NOW)
+    assert (intent["event"], intent["status"]) == ("auth", "fail")
+    assert intent["start"] == NOW - timedelta(days=1)
+
+def test_block_and_count():
+    intent, confidence = chat.parse_local("заблокируй 123.45.67.89", "ssh", now=NOW)
+    assert (intent["op"], intent["target"], confidence) == ("block_ip", "123.45.67.89", 0.95)
+    intent, _ = chat.parse_local("сколько deny за 5 минут", "firewall", now=NOW)
+    assert (intent["op"], intent["action"]) == ("count", "deny")
+    assert intent["start"] == NOW - timedelta(minutes=5)
+
+@pytest.mark.parametrize("query", [
+    "не блокируй 10.0.0.5",
+    "do not block 10.0.0.5",
+    "don't ban 1.2.3.4",
+    "не надо разблокировать 1.2.3.4",
+    "never unblock 10.0.0.0/24",
+])
+def test_negated_block_is_not_a_local_action(query):
+    intent, confidence = chat.parse_local(query, "ssh", now=NOW)
+    assert intent["op"] not in ("block_ip", "unblock_ip")
+    assert confidence < chat.LOCAL_CONFIDENCE
+
+def test_negated_block_escalates_and_never_falls_back_to_blocking(stub, monkeypatch):
+    chat.intent_to_query("не блокируй 10.0.0.5", "ssh")
+    assert stub.calls == 1
+    def boom(content):
+        raise RuntimeError("model unavailable")
+    monkeypatch.setattr(stub, "generate_content", boom)
+    assert chat.intent_to_query("don't ban 1.2.3.4", "ssh")["op"] not in ("block_ip", "unblock_ip")
+
+def test_confident_parse_does_not_call_the_model(stub):
+    intent = chat.intent_to_query("топ 10 ip с неудачными логинами за день", "ssh")
+    assert intent["op"] == "top_ips"
+    assert stub.calls == 0
+
+def test_low_confidence_query_escalates_to_the_model(stub):
+    query = "что подозрительного было ночью"
+    assert chat.parse_local(query, "ssh")[1] < chat.LOCAL_CONFIDENCE
+    intent = chat.intent_to_query(query, "ssh")
+    assert stub.calls == 1
+    assert {"op", "start", "end"} <= intent.keys()
+    chat.intent_to_query(query, "ssh")
+    assert stub.calls == 1  # answered from the intent cache
+
+def test_model_past_deadline_falls_back_to_local_parse(stub):
+    stub.latency_ms = 2000
+    query = "что было с 10.0.0.5"
+    local, _ = chat.parse_local(query, "ssh")
+    intent = asyncio.run(chat.aintent_to_query(query, "ssh", deadline_sec=0.05))
+    assert intent["op"] == local["op"] and intent.get("target") == "10.0.0.5"
+    assert stub.cancelled == 1
+
+def test_model_error_falls_back_to_local_parse(stub, monkeypatch):
+    def boom(content):
+        raise RuntimeError("model unavailable")
+    monkeypatch.setattr(stub, "generate_content", boom)
+    query = "покажи что-нибудь про 10.0.0.7"
+    assert chat.intent_to_query(query, "ssh").get("target") == "10.0.0.7"
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from detector import (load_logs, sliding_window_features, rule_based_flags, run_detection, run_detection_chunked,
+                      sharded_features, SlidingWindowEngine)
+
+WINDOWS = [1, 5, 15]
+
+def _synth(n: int = 3000, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = pd.Timestamp("2024-03-01", tz="UTC") + pd.to_timedelta(np.sort(rng.integers(0, 6 * 3600, n)), unit="s")
+    return pd.DataFrame({"timestamp": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                         "src_ip": [f"10.0.{i % 3}.{i}" for i in rng.integers(0, 40, n)],
+                         "user": rng.choice(["root", "admin", "alice", "bob"], n),
+                         "event": rng.choice(["auth", "auth", "auth", "connect"], n),
+                         "status": rng.choice(["fail", "fail", "success"], n),
+                         "port": rng.integers(1024, 65535, n)})
+
+def _norm(df: pd.DataFrame, cols=None) -> pd.DataFrame:
+    df = df.assign(src_ip=df["src_ip"].astype(str))
+    return df[list(df.columns if cols is None else cols)].sort_values(["src_ip", "timestamp"]).reset_index(drop=True)
+
+def _assert_same(actual: pd.DataFrame, expected: pd.DataFrame):
+    pd.testing.assert_frame_equal(_norm(actual, expected.columns), _norm(expected),
+                                  check_dtype=False, check_categorical=False)
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("logs") / "ssh.csv"
+    _synth().to_csv(path, index=False)
+    return str(path)
+
+@pytest.mark.parametrize("w", WINDOWS)
+def test_engine_fed_in_chunks_matches_batch(csv_path, w):
+    logs = load_logs(csv_path)
+    engine = SlidingWindowEngine(w)
+    for rows in np.array_split(np.arange(len(logs)), 7):
+        engine.update(logs.iloc[rows])
+    _assert_same(engine.frame(), sliding_window_features(logs, w))
+
+@pytest.mark.parametrize("w", WINDOWS)
+def test_unspilled_chunked_detection_matches_run_detection(csv_path, w):
+    _, findings, incidents = run_detection(csv_path, w)
+    chunked_findings, chunked_incidents = run_detection_chunked(csv_path, w, memory_budget_mb=64, chunk_rows=257)
+    assert "spill_dir" not in chunked_findings.attrs
+    _assert_same(chunked_findings, findings)
+    pd.testing.assert_frame_equal(chunked_incidents.reset_index(drop=True).astype({"src_ip": str}),
+                                  incidents.reset_index(drop=True).astype({"src_ip": str}), check_dtype=False)
+
+@pytest.mark.parametrize("w", WINDOWS)
+def test_sharded_features_match_across_workers_and_batch(csv_path, w):
+    # both run in spawn pools; workers only import detector, so this module's top level never runs there
+    logs = load_logs(csv_path)
+    single = sharded_features(logs, w, fail_threshold=10, workers=1, shards=1)
+    pooled = sharded_features(logs, w, fail_threshold=10, workers=2, shards=3)
+    pd.testing.assert_frame_equal(pooled, single)
+    _assert_same(pooled, rule_based_flags(sliding_window_features(logs, w), fail_threshold=10, window_minutes=w))
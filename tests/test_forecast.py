@@ -0,0 +1,52 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+from forecast import HoltForecaster, _minute_ordinals
+
+def _counts(minutes: int, ips=("10.0.0.1", "10.0.0.2", "10.0.0.3")) -> pd.DataFrame:
+    t0 = pd.Timestamp("2024-01-01", tz="UTC")
+    return pd.DataFrame([{"src_ip": ip, "minute": t0 + pd.Timedelta(minutes=m), "fails": 1 + m + i}
+                         for m in range(minutes) for i, ip in enumerate(ips)])
+
+def test_repeated_update_with_same_frame_is_idempotent():
+    counts = _counts(4)
+    once = HoltForecaster().update(counts)
+    again = HoltForecaster()
+    for _ in range(5):
+        again.update(counts)
+    assert again.t == once.t
+    np.testing.assert_allclose(again.level, once.level)
+    np.testing.assert_allclose(again.trend, once.trend)
+    assert len(again._pending) == len(once._pending) == 3
+
+def test_overlapping_updates_match_single_update():
+    full = _counts(6)
+    single = HoltForecaster().update(full)
+    grown = HoltForecaster()
+    for m in range(1, 7):
+        grown.update(full[full["minute"] < full["minute"].min() + pd.Timedelta(minutes=m)])
+        grown.update(full[full["minute"] < full["minute"].min() + pd.Timedelta(minutes=m)])
+    np.testing.assert_allclose(grown.level, single.level)
+    np.testing.assert_allclose(grown.forecast(10), single.forecast(10))
+
+def test_pending_minute_is_applied_when_a_later_minute_arrives():
+    counts = _counts(3)
+    f = HoltForecaster().update(counts[counts["minute"] == counts["minute"].min()])
+    f.update(counts)
+    np.testing.assert_allclose(f.level, HoltForecaster().update(counts).level)
+
+def test_long_sparse_history_does_not_allocate_a_dense_matrix():
+    # 1000 series over a week would be a 1000 x 10080 float64 matrix (~80 MB) if densified
+    rng = np.random.default_rng(0)
+    t0 = pd.Timestamp("2024-01-01", tz="UTC")
+    counts = pd.DataFrame({"src_ip": [f"10.0.{i // 256}.{i % 256}" for i in range(1000)],
+                           "minute": t0 + pd.to_timedelta(rng.integers(0, 7 * 1440, 1000), unit="min"),
+                           "fails": 1})
+    tracemalloc.start()
+    try:
+        f = HoltForecaster().update(counts)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert f.t == _minute_ordinals(counts["minute"]).max()
+    assert peak < 16 * 2**20
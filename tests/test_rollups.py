@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from detector import load_logs
+from logstore import write_partitions
+from rollups import LogRollup
+
+START, END = pd.Timestamp("2024-01-01", tz="UTC"), pd.Timestamp("2024-01-02", tz="UTC")
+
+def _logs(n: int, seed: int, hours=(0, 6)) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = START + pd.to_timedelta(np.sort(rng.integers(hours[0] * 3600, hours[1] * 3600, n)), unit="s")
+    return pd.DataFrame({"timestamp": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                         "src_ip": [f"10.0.0.{i}" for i in rng.integers(0, 20, n)],
+                         "user": rng.choice(["root", "admin", "alice"], n),
+                         "event": "auth",
+                         "status": rng.choice(["fail", "success"], n),
+                         "port": 22})
+
+def _top(rollup: LogRollup) -> dict:
+    top = rollup.answer({"op": "top_ips", "start": START, "end": END, "limit": 100})
+    return dict(zip(top["src_ip"].astype(str), top["events"]))
+
+def _fresh(path) -> dict:
+    rollup = LogRollup("ssh")
+    rollup.sync(str(path), load_logs(str(path)))
+    return _top(rollup)
+
+def test_csv_append_is_incremental(tmp_path):
+    path = tmp_path / "logs.csv"
+    _logs(300, 1).to_csv(path, index=False)
+    rollup = LogRollup("ssh")
+    assert rollup.sync(str(path), load_logs(str(path)))
+    _logs(200, 2, hours=(6, 8)).to_csv(path, mode="a", header=False, index=False)
+    assert not rollup.sync(str(path), load_logs(str(path)))
+    assert _top(rollup) == _fresh(path)
+
+def test_rewritten_csv_of_same_length_is_rebuilt(tmp_path):
+    path = tmp_path / "logs.csv"
+    _logs(300, 1).to_csv(path, index=False)
+    rollup = LogRollup("ssh")
+    rollup.sync(str(path), load_logs(str(path)))
+    _logs(300, 3).to_csv(path, index=False)
+    assert rollup.sync(str(path), load_logs(str(path)))
+    assert _top(rollup) == _fresh(path)
+
+def test_late_partition_in_an_earlier_hour_is_counted_once(tmp_path):
+    store = tmp_path / "store"
+    write_partitions(_logs(300, 1, hours=(4, 6)), store, name="a")
+    rollup = LogRollup("ssh")
+    rollup.sync(str(store), load_logs(str(store)))
+    write_partitions(_logs(100, 2, hours=(0, 2)), store, name="b")
+    assert not rollup.sync(str(store), load_logs(str(store)))
+    assert not rollup.sync(str(store), load_logs(str(store)))
+    assert _top(rollup) == _fresh(store)
+    assert sum(_top(rollup).values()) == 400
+
+def test_replaced_partition_rebuilds(tmp_path):
+    store = tmp_path / "store"
+    write_partitions(_logs(300, 1), store, name="a")
+    rollup = LogRollup("ssh")
+    rollup.sync(str(store), load_logs(str(store)))
+    write_partitions(_logs(300, 5), store, name="a")
+    assert rollup.sync(str(store), load_logs(str(store)))
+    assert _top(rollup) == _fresh(store)
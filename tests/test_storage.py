@@ -0,0 +1,24 @@
+import pytest
+from storage import JsonBlocklist, SqliteBlocklist, blocked_mask, subtract_blocklist
+
+@pytest.fixture(params=["blocklist.json", "blocklist.db"])
+def blocklist(request, tmp_path):
+    path = str(tmp_path / request.param)
+    return JsonBlocklist(path) if path.endswith(".json") else SqliteBlocklist(path)
+
+def test_unblock_splits_covering_cidr(blocklist):
+    blocklist.block_many(["10.0.0.0/24", "1.2.3.4"])
+    assert blocklist.unblock_many(["10.0.0.7", "10.0.0.8", "7.7.7.7"]) == 2
+    probe = ["10.0.0.7", "10.0.0.8", "10.0.0.0", "10.0.0.255", "1.2.3.4"]
+    assert blocklist.contains(probe) == {"10.0.0.0", "10.0.0.255", "1.2.3.4"}
+    assert blocked_mask(probe, blocklist.load()).tolist() == [False, False, True, True, True]
+
+def test_unblock_prefix_and_exact_entries():
+    entries, n = subtract_blocklist(["10.0.0.0/24", "1.2.3.4", "bogus"], ["10.0.0.0/25", "1.2.3.4", "bogus"])
+    assert entries == {"10.0.0.128/25"}
+    assert n == 3
+
+def test_unblock_of_unblocked_address_reports_zero(blocklist):
+    blocklist.block_many(["10.0.0.0/24"])
+    assert blocklist.unblock_many(["192.168.1.1"]) == 0
+    assert blocklist.load() == {"10.0.0.0/24"}
@@ -0,0 +1,190 @@
+import os, json, time, threading, tracemalloc
+try:
+    import resource
+except ImportError:     # Windows: spans are recorded without RSS figures
+    resource = None
+from functools import wraps
+from collections import deque
+from contextlib import contextmanager
+
+def _rows(value):
+    if value is None or isinstance(value, int):
+        return value
+    shape = getattr(value, "shape", None)
+    if shape:
+        return int(shape[0])
+    return len(value) if isinstance(value, (list, dict)) else None
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class Span:
+    __slots__ = ("name", "trace_id", "parent", "start", "seconds", "rows_in", "rows_out",
+                 "max_rss_mb", "rss_delta_mb", "alloc_peak_mb", "attrs", "exported")
+
+    def __init__(self, name: str, trace_id: int, parent, rows_in=None, **attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.attrs = attrs
+        self.start = time.time()
+        self.seconds = None
+        self.max_rss_mb = self.rss_delta_mb = self.alloc_peak_mb = None
+        self.exported = False
+
+    def output(self, value):
+        """Record the stage result's row count and return it unchanged."""
+        self.rows_out = _rows(value)
+        return value
+
+    def as_dict(self) -> dict:
+        out = {k: getattr(self, k) for k in self.__slots__ if k not in ("attrs", "exported")}
+        out.update(self.attrs)
+        return out
+
+class _NoSpan:
+    """Stands in for both the span context manager and the span when tracing is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def output(self, value):
+        return value
+
+    def __setattr__(self, name, value):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+class Tracer:
+    """Span timings, max-RSS growth and row counts per pipeline stage.
+
+    Disabled by default (TRACE=1 enables it); span() then returns a shared
+    no-op object, so instrumented code pays one attribute check. Spans nest
+    per thread; the last `max_spans` are kept in memory for the debug panel
+    and can be exported as JSON lines or Prometheus text format. With
+    tracemalloc running, spans also record the traced allocation peak.
+    """
+
+    def __init__(self, enabled: bool = None, max_spans: int = 5000):
+        self.enabled = os.environ.get("TRACE", "") not in ("", "0") if enabled is None else enabled
+        self.spans = deque(maxlen=max_spans)
+        self._local = threading.local()
+        self._next_trace = 0
+        self._lock = threading.Lock()
+        self._totals = {}       # stage -> cumulative stats for the Prometheus counters
+
+    def enable(self, on: bool = True):
+        self.enabled = on
+        return self
+
+    def span(self, name: str, rows_in=None, **attrs):
+        """Context manager timing one stage; `rows_in` is a row count or a frame/array to count."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name, rows_in, attrs)
+
+    @contextmanager
+    def _span(self, name: str, rows_in, attrs: dict):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        if stack:
+            trace_id, parent = stack[-1].trace_id, stack[-1].name
+        else:
+            with self._lock:
+                self._next_trace += 1
+                trace_id, parent = self._next_trace, None
+        s = Span(name, trace_id, parent, _rows(rows_in), **attrs)
+        rss0 = _max_rss_mb()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            traced0 = tracemalloc.get_traced_memory()[0]
+        stack.append(s)
+        t0 = time.perf_counter()
+        try:
+            yield s
+        finally:
+            s.seconds = time.perf_counter() - t0
+            stack.pop()
+            s.max_rss_mb = _max_rss_mb()
+            if rss0 is not None:
+                s.rss_delta_mb = s.max_rss_mb - rss0
+            if tracing:
+                s.alloc_peak_mb = (tracemalloc.get_traced_memory()[1] - traced0) / 2**20
+            with self._lock:
+                self.spans.append(s)
+                st = self._totals.setdefault(name, {"count": 0, "seconds": 0.0, "rows_out": 0, "max_rss_mb": None})
+                st["count"] += 1
+                st["seconds"] += s.seconds
+                if s.rows_out is not None:
+                    st["rows_out"] = s.rows_out
+                if s.max_rss_mb is not None:
+                    st["max_rss_mb"] = max(st["max_rss_mb"] or 0.0, s.max_rss_mb)
+
+    def traced(self, name: str):
+        """Decorator form of span(); the first positional argument is taken as the input."""
+        def wrap(fn):
+            @wraps(fn)
+            def inner(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.span(name, args[0] if args else None) as s:
+                    return s.output(fn(*args, **kwargs))
+            return inner
+        return wrap
+
+    def records(self, last_trace: bool = False) -> list:
+        spans = list(self.spans)
+        if last_trace and spans:
+            tid = spans[-1].trace_id
+            spans = [s for s in spans if s.trace_id == tid]
+        return [s.as_dict() for s in spans]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+            self._totals.clear()
+
+    def export_jsonl(self, path) -> int:
+        """Append spans not exported before to `path`; returns how many were written."""
+        spans = [s for s in list(self.spans) if not s.exported]
+        if spans:
+            with open(path, "a") as f:
+                for s in spans:
+                    f.write(json.dumps(s.as_dict(), default=str) + "\n")
+                    s.exported = True
+        return len(spans)
+
+    def prometheus(self) -> str:
+        with self._lock:
+            stats = {k: dict(v) for k, v in self._totals.items()}
+        lines = []
+        for metric, key, kind, help_text in (
+                ("pipeline_stage_runs_total", "count", "counter", "Spans recorded per stage"),
+                ("pipeline_stage_seconds_total", "seconds", "counter", "Wall time spent per stage"),
+                ("pipeline_stage_rows_out", "rows_out", "gauge", "Output rows of the last run of a stage"),
+                ("pipeline_stage_max_rss_megabytes", "max_rss_mb", "gauge", "Process max RSS after a stage")):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{stage="{name}"}} {st[key]:g}' for name, st in sorted(stats.items())
+                      if st[key] is not None]
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+TRACER = Tracer()
+span = TRACER.span
+traced = TRACER.traced